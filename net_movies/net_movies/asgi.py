@@ -0,0 +1,20 @@
+"""
+ASGI config for net_movies project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Requests run the WSGI application in a thread pool, the OMDb lookup of
+POST /movies is made on the event loop first when aiohttp is installed. Serve
+it with any ASGI server, e.g. ``uvicorn net_movies.asgi:application``.
+"""
+
+import os
+
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'net_movies.settings')
+
+wsgi_application = get_wsgi_application()
+
+from net_movies.movies_api.asgi import MoviesASGIApplication  # NOQA
+
+application = MoviesASGIApplication(wsgi_application)
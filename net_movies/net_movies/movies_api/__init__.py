@@ -0,0 +1 @@
+default_app_config = 'net_movies.movies_api.apps.MoviesApiConfig'
@@ -1,6 +1,22 @@
 from django.contrib import admin
 from .models import Movie, MovieComment
 
-# Register your models here.
-admin.site.register(Movie)
-admin.site.register(MovieComment)
+
+@admin.register(Movie)
+class MovieAdmin(admin.ModelAdmin):
+    list_display = ('id', 'title', 'year_of_production', 'comment_count')
+    search_fields = ('title',)
+    list_per_page = 100
+    # Counting all rows of a filtered changelist is a second full scan
+    show_full_result_count = False
+
+
+@admin.register(MovieComment)
+class MovieCommentAdmin(admin.ModelAdmin):
+    list_display = ('id', 'movie', 'comment_content', 'created_at')
+    # Titles of listed movies are joined instead of queried per row
+    list_select_related = ('movie',)
+    # A select with every movie would load the whole catalogue
+    raw_id_fields = ('movie',)
+    list_per_page = 100
+    show_full_result_count = False
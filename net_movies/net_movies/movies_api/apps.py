@@ -2,4 +2,8 @@ from django.apps import AppConfig
 
 
 class MoviesApiConfig(AppConfig):
-    name = 'movies_api'
+    name = 'net_movies.movies_api'
+    label = 'movies_api'
+
+    def ready(self):
+        from . import signals  # NOQA
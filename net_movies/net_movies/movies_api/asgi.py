@@ -0,0 +1,274 @@
+import asyncio
+import io
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import parse_qs
+from django.conf import settings
+from django.db import close_old_connections
+from .lookup_cache import get_lookup_cache
+from .omdb import OMDbError
+from .omdb_async import aiohttp, close_async_client, get_async_client
+from .titles import normalize_title
+
+DEFAULTS = {
+    'CACHE_THREADS': 4,
+    'WSGI_THREADS': 10,
+}
+
+MOVIES_PATHS = ('/movies', '/movies/')
+FORM_TYPES = ('application/json', 'application/x-www-form-urlencoded')
+
+# WSGI environ key of the OMDb lookup made for POST /movies on the event
+# loop, {normalised title: (data, error)}. Only the server sets environ
+# keys without the HTTP_ prefix, so clients can not pass one
+PREFETCHED_OMDB = 'movies_api.prefetched_omdb'
+
+
+def get_config():
+    return dict(DEFAULTS, **getattr(settings, 'ASGI', {}))
+
+
+def call_with_connections(func, *args, **kwargs):
+    # Method that runs func in a worker thread and then closes database
+    # connections that are broken or older than CONN_MAX_AGE, like Django
+    # does at the end of a request
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+def header(scope, name):
+    for key, value in scope['headers']:
+        if key.decode('latin1').lower() == name:
+            return value.decode('latin1')
+
+    return ''
+
+
+def wsgi_environ(scope, body):
+    # Method that builds a WSGI environ for an ASGI HTTP scope
+    server = scope.get('server', None) or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'].encode('utf8').decode('latin1'),
+        'QUERY_STRING': scope['query_string'].decode('latin1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': 'HTTP/{0}'.format(
+            scope.get('http_version', '1.1')),
+        'REMOTE_ADDR': (scope.get('client', None) or ('', 0))[0],
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+
+    for key, value in scope['headers']:
+        key = key.decode('latin1').upper().replace('-', '_')
+        value = value.decode('latin1')
+
+        if key == 'CONTENT_LENGTH':
+            continue
+
+        if key != 'CONTENT_TYPE':
+            key = 'HTTP_' + key
+
+        environ[key] = '{0},{1}'.format(environ[key], value)\
+            if key in environ else value
+
+    return environ
+
+
+def request_title(scope, body):
+    # Method that reads the title field of a JSON or form encoded body
+    content_type = header(scope, 'content-type').split(';')[0].strip()
+
+    try:
+        if content_type == 'application/json':
+            data = json.loads(body.decode() or '{}')
+            return data.get('title', None) if isinstance(data, dict) \
+                else None
+
+        return (parse_qs(body.decode()).get('title', None) or [None])[-1]
+    except ValueError:
+        return None
+
+
+class MoviesASGIApplication(object):
+    # ASGI application running the WSGI application on a thread pool. The
+    # OMDb lookup of POST /movies is made first with the asyncio client,
+    # so one process keeps many lookups in flight without holding a
+    # thread for each. The request then goes through the usual middleware
+    # and views.Movies.post, which takes the looked up data from the
+    # environ. Without aiohttp every request goes straight to WSGI
+    def __init__(self, wsgi_application):
+        config = get_config()
+        self.wsgi_application = wsgi_application
+        self.cache_executor = ThreadPoolExecutor(config['CACHE_THREADS'])
+        self.wsgi_executor = ThreadPoolExecutor(config['WSGI_THREADS'])
+        self.lookups = {}
+
+    def run_sync(self, func, *args, **kwargs):
+        # Coroutine running a blocking lookup cache call, caches may be
+        # backed by the database
+        return asyncio.get_event_loop().run_in_executor(
+            self.cache_executor,
+            partial(call_with_connections, func, *args, **kwargs))
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+
+        if scope['type'] != 'http':
+            raise ValueError(
+                'Unsupported ASGI scope type {0}'.format(scope['type']))
+
+        body = await self.read_body(receive)
+        environ = wsgi_environ(scope, body)
+
+        if self.is_async_request(scope):
+            title = request_title(scope, body)
+
+            if title and isinstance(title, str):
+                environ[PREFETCHED_OMDB] = {
+                    normalize_title(title): await self.prefetch(title)}
+
+        return await self.call_wsgi(environ, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await close_async_client()
+                self.cache_executor.shutdown(wait=False)
+                self.wsgi_executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, receive):
+        body = b''
+
+        while True:
+            message = await receive()
+            body += message.get('body', b'')
+
+            if not message.get('more_body', False):
+                return body
+
+    def is_async_request(self, scope):
+        content_type = header(scope, 'content-type').split(';')[0].strip()
+
+        return aiohttp is not None and \
+            scope['method'] == 'POST' and \
+            scope['path'] in MOVIES_PATHS and \
+            content_type in FORM_TYPES
+
+    async def fetch_and_set(self, title):
+        lookup_cache = get_lookup_cache()
+        lookup_cache.count('fetches')
+        data = await get_async_client().fetch(title)
+        await self.run_sync(lookup_cache.set, title, data)
+        return data
+
+    async def fetch_title(self, title):
+        # Coroutine version of OMDbLookupCache.get_or_fetch and
+        # fetch_shared, it waits for another process fetching the same title
+        # without holding a thread
+        lookup_cache = get_lookup_cache()
+        hit, data = await self.run_sync(lookup_cache.get, title)
+
+        if hit:
+            return data
+
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + lookup_cache.lock_wait
+
+        while True:
+            if await self.run_sync(lookup_cache.lock_title, title):
+                try:
+                    hit, data = await self.run_sync(
+                        lookup_cache.get_shared, title)
+                    return data if hit else await self.fetch_and_set(title)
+                finally:
+                    await self.run_sync(lookup_cache.unlock_title, title)
+
+            if loop.time() >= deadline:
+                return await self.fetch_and_set(title)
+
+            await asyncio.sleep(lookup_cache.poll_interval)
+            hit, data = await self.run_sync(lookup_cache.get_shared, title)
+
+            if hit:
+                lookup_cache.count('coalesced')
+                return data
+
+    async def lookup(self, title):
+        # Coroutine that returns OMDb data for title, concurrent requests
+        # for the same normalised title share one fetch
+        key = normalize_title(title)
+        task = self.lookups.get(key, None)
+
+        if task is None:
+            task = self.lookups[key] = asyncio.ensure_future(
+                self.fetch_title(title))
+            task.add_done_callback(lambda task: self.lookups.pop(key, None))
+        else:
+            get_lookup_cache().count('coalesced')
+
+        return await asyncio.shield(task)
+
+    async def prefetch(self, title):
+        # Coroutine that returns a (data, error) tuple of the OMDb lookup
+        # of title
+        try:
+            return await self.lookup(title), None
+        except OMDbError as error:
+            return None, error
+
+    async def call_wsgi(self, environ, send):
+        loop = asyncio.get_event_loop()
+
+        await loop.run_in_executor(
+            self.wsgi_executor, self.run_wsgi, environ, send, loop)
+
+    def run_wsgi(self, environ, send, loop):
+        # Method that runs the WSGI application in a worker thread and
+        # passes its response to send chunk by chunk, so streamed responses
+        # are not buffered
+        def send_message(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        def start_response(status, headers, exc_info=None):
+            send_message({
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [
+                    (name.lower().encode('latin1'), value.encode('latin1'))
+                    for name, value in headers],
+            })
+
+        response = self.wsgi_application(environ, start_response)
+
+        try:
+            for chunk in response:
+                if chunk:
+                    send_message({
+                        'type': 'http.response.body',
+                        'body': chunk,
+                        'more_body': True})
+
+            send_message({'type': 'http.response.body', 'body': b''})
+        finally:
+            if hasattr(response, 'close'):
+                response.close()
@@ -0,0 +1,21 @@
+from . import (
+    comment_ingest,
+    endpoints,
+    movie_burst,
+    response_encoding,
+    serializers,
+    sqlite_concurrency,
+    title_search,
+    top,
+)
+
+BENCHMARKS = {
+    'comment_ingest': comment_ingest.run,
+    'endpoints': endpoints.run,
+    'movie_burst': movie_burst.run,
+    'response_encoding': response_encoding.run,
+    'serializers': serializers.run,
+    'sqlite_concurrency': sqlite_concurrency.run,
+    'title_search': title_search.run,
+    'top': top.run,
+}
@@ -0,0 +1,79 @@
+import math
+import time
+import tracemalloc
+from contextlib import contextmanager
+from django.db import connection, reset_queries, transaction
+from django.test.utils import CaptureQueriesContext
+
+
+class Rollback(Exception):
+    pass
+
+
+@contextmanager
+def rolled_back():
+    # Context manager that discards everything written inside it, so
+    # benchmarks never leave synthetic data behind
+    try:
+        with transaction.atomic():
+            yield
+            raise Rollback()
+    except Rollback:
+        pass
+
+
+def measure(func, *args, **kwargs):
+    # Method that runs func once and returns its result, wall time in
+    # seconds and number of executed queries
+    reset_queries()
+
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+
+    return result, elapsed, len(queries)
+
+
+def percentile(values, share):
+    # Nearest-rank percentile of values, share between 0 and 100
+    values = sorted(values)
+    return values[max(0, math.ceil(share / 100 * len(values)) - 1)]
+
+
+def latency_stats(func, calls):
+    # Method that calls func(i) for i in range(calls) and returns latency
+    # percentiles in milliseconds, throughput, mean query count and peak
+    # memory of one extra traced call. func returns an HTTP status
+    latencies, queries, errors = [], 0, 0
+    start = time.perf_counter()
+
+    for i in range(calls):
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            status = func(i)
+            latencies.append(time.perf_counter() - started)
+
+        queries += len(captured)
+        errors += status >= 400
+
+    elapsed = time.perf_counter() - start
+    reset_queries()
+    tracemalloc.start()
+
+    try:
+        func(calls)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p90_ms': round(percentile(latencies, 90) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'max_ms': round(max(latencies) * 1000, 2),
+        'per_second': round(calls / elapsed, 1),
+        'queries': round(queries / calls, 1),
+        'peak_kb': round(peak / 1024, 1),
+        'errors': errors,
+    }
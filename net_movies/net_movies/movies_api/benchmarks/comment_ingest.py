@@ -0,0 +1,57 @@
+import json
+from rest_framework.test import APIClient
+from ..models import Movie
+from .base import measure, rolled_back
+
+BATCH_SIZES = [1000, 5000]
+MOVIE_COUNT = 100
+COMMENTS_URL = '/comments'
+
+
+def seed():
+    Movie.objects.bulk_create(
+        Movie(title='Movie {0}'.format(i), year_of_production=2000)
+        for i in range(MOVIE_COUNT))
+
+    return list(Movie.objects.values_list('id', flat=True))
+
+
+def comments(movie_ids, size):
+    return [
+        {'movie': movie_ids[i % len(movie_ids)],
+         'comment_content': 'comment {0}'.format(i)}
+        for i in range(size)]
+
+
+def post_one_by_one(api, items):
+    return [api.post(COMMENTS_URL, item).status_code for item in items]
+
+
+def post_ndjson(api, items):
+    return api.post(
+        COMMENTS_URL,
+        '\n'.join(json.dumps(item) for item in items),
+        content_type='application/x-ndjson').status_code
+
+
+def run(sizes=None):
+    api = APIClient()
+    results = []
+
+    for size in sizes or BATCH_SIZES:
+        with rolled_back():
+            items = comments(seed(), size)
+            _, single_seconds, _ = measure(post_one_by_one, api, items)
+        with rolled_back():
+            items = comments(seed(), size)
+            status, bulk_seconds, bulk_queries = measure(
+                post_ndjson, api, items)
+
+        results.append({
+            'comments': size,
+            'single_per_second': round(size / single_seconds),
+            'bulk_per_second': round(size / bulk_seconds),
+            'bulk_queries': bulk_queries,
+            'bulk_status': status})
+
+    return results
@@ -0,0 +1,62 @@
+import random
+from datetime import timedelta
+from itertools import accumulate
+from django.db.models import Max
+from django.utils import timezone
+from ..models import Movie, MovieComment
+from ..omdb_stub import OMDbStub
+
+WORDS = [
+    'alien', 'avatar', 'blade', 'city', 'dark', 'dawn', 'empire', 'fire',
+    'ghost', 'house', 'island', 'karate', 'kid', 'king', 'last', 'love',
+    'matrix', 'night', 'ocean', 'planet', 'queen', 'river', 'runner',
+    'shadow', 'star', 'storm', 'summer', 'war', 'winter', 'wolf']
+
+
+def zipf_weights(count, skew):
+    # Weight of the i-th most popular item is 1 / i ** skew
+    return list(accumulate(1 / (i ** skew) for i in range(1, count + 1)))
+
+
+def seed(movies, comments, skew=1.1, days=90, seed=0, batch_size=5000):
+    # Method that creates movies with OMDb data and comments spread over
+    # the last days, a few movies get most comments (Zipf distribution
+    # with given skew). The same arguments always give the same data.
+    # Returns ids of created movies, most commented first
+    generator = random.Random(seed)
+    omdb = OMDbStub(generate=True)
+    titles = [
+        '{0} {1} {2}'.format(
+            generator.choice(WORDS).title(), generator.choice(WORDS), i)
+        for i in range(movies)]
+
+    last_id = Movie.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+
+    for start in range(0, movies, batch_size):
+        batch = []
+
+        for i, title in enumerate(titles[start:start + batch_size], start):
+            movie = Movie(title=title, year_of_production=1950 + i % 70)
+            movie.omdb_data = omdb.movie(title)
+            batch.append(movie)
+
+        Movie.objects.bulk_create(batch)
+
+    ids = list(Movie.objects.filter(id__gt=last_id).order_by('id')
+               .values_list('id', flat=True))
+    generator.shuffle(ids)
+    weights = zipf_weights(len(ids), skew)
+    now = timezone.now()
+
+    for start in range(0, comments, batch_size):
+        size = min(batch_size, comments - start)
+        MovieComment.objects.bulk_create(
+            MovieComment(
+                movie_id=movie_id,
+                comment_content='Comment {0}'.format(start + i),
+                created_at=now - timedelta(
+                    seconds=generator.randrange(days * 24 * 60 * 60)))
+            for i, movie_id in enumerate(
+                generator.choices(ids, cum_weights=weights, k=size)))
+
+    return ids
@@ -0,0 +1,93 @@
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from ..models import Movie, MovieComment
+from ..omdb_stub import OMDbStub
+from ..pagination import encode_cursor
+from . import data
+from .base import latency_stats, rolled_back
+
+# Movies per run, each run also gets COMMENTS_PER_MOVIE times more comments
+CATALOGUE_SIZES = [1000, 10000]
+COMMENTS_PER_MOVIE = 10
+CALLS = 50
+
+
+def scenarios(api, ids, run_id):
+    # Method that returns (name, func) pairs, func(i) sends the i-th
+    # request of a scenario and returns its status. Deletes start from the
+    # least commented movies and the newest comments
+    titles = dict(Movie.objects.filter(id__in=ids[-CALLS - 1:])
+                  .values_list('id', 'title'))
+    comment_ids = list(MovieComment.objects.order_by('-id')
+                       .values_list('id', flat=True)[:CALLS + 1])
+    week_ago = (timezone.localdate() - timedelta(days=7)).isoformat()
+    # Cursor of the page in the middle of the most commented list
+    middle = list(Movie.objects.order_by('-comment_count', '-id')
+                  .values_list('comment_count', 'id')[len(ids) // 2])
+
+    def get(path, params=None):
+        return lambda i: api.get(path, params).status_code
+
+    return [
+        ('movies_list', get('/movies')),
+        ('movies_page', get('/movies', {'page_size': 100})),
+        ('movies_year', get('/movies', {'year': 1990})),
+        ('movies_title', get('/movies', {'title': 'star'})),
+        ('movies_by_comments',
+         get('/movies', {'ordering': '-comments', 'page_size': 100})),
+        ('movies_by_comments_middle_page', get('/movies', {
+            'ordering': '-comments', 'page_size': 100,
+            'cursor': encode_cursor(middle)})),
+        ('movies_type_by_rating', get('/movies', {
+            'type': 'movie', 'ordering': '-rating', 'page_size': 100})),
+        ('movies_genre',
+         get('/movies', {'genre': 'comedy', 'page_size': 100})),
+        ('movies_decade_by_comments', get('/movies', {
+            'year_from': 1990, 'year_to': 1999, 'ordering': '-comments',
+            'page_size': 100})),
+        ('movie_post', lambda i: api.post(
+            '/movies',
+            {'title': 'Benchmark {0} {1}'.format(run_id, i)}).status_code),
+        ('movie_delete', lambda i: api.delete(
+            '/movies', {'title': titles[ids[-i - 1]]},
+            format='json').status_code),
+        ('comments_popular_movie', get('/comments', {'movie': ids[0]})),
+        ('comments_page', get('/comments', {'page_size': 100})),
+        ('comment_post', lambda i: api.post(
+            '/comments',
+            {'movie': ids[i % len(ids)],
+             'comment_content': 'Benchmark'}).status_code),
+        ('comment_delete', lambda i: api.delete(
+            '/comments', {'id': comment_ids[i]}, format='json').status_code),
+        ('top', get('/top')),
+        ('top_limit', get('/top', {'limit': 10})),
+        ('top_last_week', get('/top', {'date_from': week_ago})),
+    ]
+
+
+def run(sizes=None):
+    # Times every endpoint on Zipf distributed synthetic data, POST /movies
+    # asks a local OMDb stub
+    api = APIClient()
+    results = []
+
+    with OMDbStub(generate=True) as stub, \
+            override_settings(OMDB_CLIENT=dict(
+                getattr(settings, 'OMDB_CLIENT', {}), URL=stub.url)):
+        for size in sizes or CATALOGUE_SIZES:
+            with rolled_back():
+                ids = data.seed(size, size * COMMENTS_PER_MOVIE)
+
+                for name, func in scenarios(
+                        api, ids, int(time.time() * 1000)):
+                    results.append(dict(
+                        {'movies': size,
+                         'comments': size * COMMENTS_PER_MOVIE,
+                         'scenario': name},
+                        **latency_stats(func, CALLS)))
+
+    return results
@@ -0,0 +1,124 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+from django.test import override_settings
+from ..asgi import MoviesASGIApplication, wsgi_environ
+from ..lookup_cache import get_lookup_cache
+from ..models import Movie
+from ..omdb_async import aiohttp, close_async_client
+from ..omdb_stub import OMDbStub
+
+BURST_SIZES = [50, 200]
+WSGI_WORKERS = 8
+OMDB_LATENCY = 0.2
+
+
+def post_scope(title):
+    body = json.dumps({'title': title}).encode()
+    scope = {
+        'type': 'http',
+        'method': 'POST',
+        'path': '/movies',
+        'query_string': b'',
+        'headers': [(b'content-type', b'application/json')],
+    }
+    return scope, body
+
+
+def wsgi_burst(application, titles):
+    # Method that posts titles from WSGI_WORKERS threads, each of them
+    # standing for a blocking worker process, returns response statuses
+    def post(title):
+        statuses = []
+        application(
+            wsgi_environ(*post_scope(title)),
+            lambda status, headers: statuses.append(int(status[:3])))
+        return statuses[0]
+
+    with ThreadPoolExecutor(WSGI_WORKERS) as executor:
+        return list(executor.map(post, titles))
+
+
+def asgi_burst(application, titles):
+    # Method that posts all titles at once to one ASGI application
+    async def post(title):
+        scope, body = post_scope(title)
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': body}
+
+        async def send(message):
+            messages.append(message)
+
+        await application(scope, receive, send)
+        return messages[0]['status']
+
+    async def post_all():
+        try:
+            return await asyncio.gather(*(post(title) for title in titles))
+        finally:
+            await close_async_client()
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    try:
+        return loop.run_until_complete(post_all())
+    finally:
+        loop.close()
+
+
+def measure_burst(burst, application, titles):
+    # Movies are written from worker threads, so instead of rolling back
+    # a transaction they are deleted afterwards
+    start = time.perf_counter()
+
+    try:
+        statuses = burst(application, titles)
+        return time.perf_counter() - start, statuses
+    finally:
+        Movie.objects.filter(title__in=titles).delete()
+
+        for title in titles:
+            get_lookup_cache().invalidate(title)
+
+
+def run(sizes=None):
+    # Load test of POST /movies against a local OMDb stub answering after
+    # OMDB_LATENCY seconds, every request asks for a title not seen before
+    if aiohttp is None:
+        return [{'skipped': 'aiohttp is not installed'}]
+
+    results = []
+    wsgi_application = get_wsgi_application()
+
+    with OMDbStub(generate=True, delay=OMDB_LATENCY) as stub, \
+            override_settings(OMDB_CLIENT=dict(
+                getattr(settings, 'OMDB_CLIENT', {}), URL=stub.url)):
+        asgi_application = MoviesASGIApplication(wsgi_application)
+
+        for size in sizes or BURST_SIZES:
+            run_id = int(time.time() * 1000)
+            titles = {
+                mode: ['Burst {0} {1} {2}'.format(run_id, mode, i)
+                       for i in range(size)]
+                for mode in ('wsgi', 'asgi')}
+
+            wsgi_seconds, wsgi_statuses = measure_burst(
+                wsgi_burst, wsgi_application, titles['wsgi'])
+            asgi_seconds, asgi_statuses = measure_burst(
+                asgi_burst, asgi_application, titles['asgi'])
+
+            results.append({
+                'requests': size,
+                'wsgi_workers': WSGI_WORKERS,
+                'wsgi_rps': round(size / wsgi_seconds, 1),
+                'asgi_rps': round(size / asgi_seconds, 1),
+                'wsgi_created': wsgi_statuses.count(201),
+                'asgi_created': asgi_statuses.count(201)})
+
+    return results
@@ -0,0 +1,69 @@
+import json
+import platform
+import subprocess
+import django
+from django.utils import timezone
+
+# Result keys ending like these are measurements, other keys identify a row
+METRIC_SUFFIXES = (
+    '_ms', 'seconds', 'per_second', '_rps', 'queries', 'peak_kb',
+    'errors')
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL)\
+            .decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save(path, results):
+    # Method that writes results of benchmark runs, keyed by benchmark
+    # name, to a JSON file together with where they were measured
+    with open(path, 'w') as output:
+        json.dump({
+            'commit': git_commit(),
+            'created_at': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'results': results,
+        }, output, indent=2, sort_keys=True)
+
+
+def load(path):
+    with open(path) as source:
+        return json.load(source)['results']
+
+
+def is_metric(key, value):
+    return key.endswith(METRIC_SUFFIXES) and \
+        isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def identity(row):
+    return tuple(sorted(
+        (key, value) for key, value in row.items()
+        if not is_metric(key, value) and not isinstance(value, (dict, list))))
+
+
+def compare(previous, current, threshold=10):
+    # Method that yields (benchmark, row identity, metric, before, after,
+    # change in percent) for metrics of matching rows that changed by more
+    # than threshold percent
+    for name, rows in sorted(current.items()):
+        before = {identity(row): row for row in previous.get(name, [])}
+
+        for row in rows:
+            old = before.get(identity(row), {})
+
+            for key, value in sorted(row.items()):
+                if not is_metric(key, value) or not \
+                        is_metric(key, old.get(key, None)) or not old[key]:
+                    continue
+
+                change = (value - old[key]) / old[key] * 100
+
+                if abs(change) > threshold:
+                    yield name, identity(row), key, old[key], value, change
@@ -0,0 +1,66 @@
+from django.test import override_settings
+from rest_framework.test import APIClient
+from .. import compression, rendering
+from . import data
+from .base import latency_stats, rolled_back
+
+# Movies per run, each run also gets COMMENTS_PER_MOVIE times more comments
+CATALOGUE_SIZES = [1000, 10000]
+COMMENTS_PER_MOVIE = 10
+CALLS = 20
+LISTS = [
+    ('movies', '/movies', {}),
+    ('comments', '/comments', {}),
+    ('comments_stream', '/comments', {'stream': 'ndjson'}),
+    ('top', '/top', {}),
+]
+
+
+def variants():
+    # (name, request headers) of every encoding available here
+    found = [('json', {}), ('json_gzip', {'HTTP_ACCEPT_ENCODING': 'gzip'})]
+
+    if compression.brotli is not None:
+        found.append(('json_br', {'HTTP_ACCEPT_ENCODING': 'br'}))
+
+    if rendering.msgpack is not None:
+        found.extend([
+            ('msgpack', {'HTTP_ACCEPT': 'application/msgpack'}),
+            ('msgpack_gzip', {
+                'HTTP_ACCEPT': 'application/msgpack',
+                'HTTP_ACCEPT_ENCODING': 'gzip'})])
+
+    return found
+
+
+def body_size(response):
+    return len(b''.join(response.streaming_content)) if response.streaming \
+        else len(response.content)
+
+
+def run(sizes=None):
+    # Full list bodies with every available encoding: bytes on the wire
+    # and latency, with the response cache off so every call encodes
+    api = APIClient()
+    results = []
+
+    with override_settings(RESPONSE_CACHE={'ENABLED': False}):
+        for size in sizes or CATALOGUE_SIZES:
+            with rolled_back():
+                data.seed(size, size * COMMENTS_PER_MOVIE)
+
+                for name, path, params in LISTS:
+                    for variant, headers in variants():
+                        def call(i):
+                            response = api.get(path, params, **headers)
+                            body_size(response)
+                            return response.status_code
+
+                        results.append(dict(
+                            {'movies': size, 'list': name,
+                             'encoding': variant,
+                             'bytes': body_size(
+                                 api.get(path, params, **headers))},
+                            **latency_stats(call, CALLS)))
+
+    return results
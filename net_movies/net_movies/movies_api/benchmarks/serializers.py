@@ -0,0 +1,43 @@
+from rest_framework.renderers import JSONRenderer
+from ..models import Movie
+from ..rendering import dumps, values_rows
+from ..utils import MovieSerializer
+from .base import measure, rolled_back
+
+ROW_COUNTS = [1000, 100000]
+FIELDS = ['id', 'title', 'year_of_production']
+
+
+def seed(size, batch_size=10000):
+    for start in range(0, size, batch_size):
+        Movie.objects.bulk_create(
+            Movie(title='Movie {0}'.format(i), year_of_production=2000)
+            for i in range(start, min(size, start + batch_size)))
+
+
+def model_serializer():
+    return JSONRenderer().render(
+        MovieSerializer(Movie.objects.all(), many=True).data)
+
+
+def values_list_dumps():
+    return dumps(values_rows(Movie.objects.all(), FIELDS))
+
+
+def run(sizes=None):
+    results = []
+
+    for size in sizes or ROW_COUNTS:
+        with rolled_back():
+            seed(size)
+            old, old_seconds, _ = measure(model_serializer)
+            new, new_seconds, _ = measure(values_list_dumps)
+
+        results.append({
+            'rows': size,
+            'serializer_seconds': round(old_seconds, 4),
+            'fast_path_seconds': round(new_seconds, 4),
+            'speedup': round(old_seconds / new_seconds, 1),
+            'same_output': old == new})
+
+    return results
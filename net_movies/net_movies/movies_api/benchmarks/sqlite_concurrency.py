@@ -0,0 +1,188 @@
+import json
+import logging
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from django.conf import settings
+from django.core.management import call_command
+from django.core.wsgi import get_wsgi_application
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.utils import load_backend
+from django.test import override_settings
+from ..asgi import wsgi_environ
+from . import data
+from .base import percentile
+
+# Worker processes sending requests at once, like WSGI server workers. A
+# quarter of them (at least one) post comments while the others read
+WORKER_COUNTS = [4, 16]
+WRITE_SHARE = 0.25
+DURATION = 5
+# GET /top may serve a stale ranking, as with manage.py refresh_top_snapshot
+# running, otherwise every /top after a comment rewrites the snapshot and
+# readers of /top become writers
+TOP_STALENESS = 60
+MOVIES = 1000
+COMMENTS = 10000
+
+
+@contextmanager
+def database_file(path):
+    # Context manager pointing the default connection of this thread at
+    # another SQLite file, so views and signals run against it
+    previous = connections[DEFAULT_DB_ALIAS]
+    settings_dict = dict(previous.settings_dict, NAME=path)
+    connections[DEFAULT_DB_ALIAS] = load_backend(settings_dict['ENGINE'])\
+        .DatabaseWrapper(settings_dict, DEFAULT_DB_ALIAS)
+
+    try:
+        yield
+    finally:
+        connections[DEFAULT_DB_ALIAS].close()
+        connections[DEFAULT_DB_ALIAS] = previous
+
+
+def build_database(path):
+    # Method that migrates a new SQLite file and fills it with synthetic
+    # data, returns the movie ids
+    with database_file(path):
+        call_command('migrate', verbosity=0, interactive=False)
+        return data.seed(MOVIES, COMMENTS)
+
+
+def request(application, method, path, query='', body=b''):
+    statuses = []
+    environ = wsgi_environ({
+        'method': method,
+        'path': path,
+        'query_string': query.encode(),
+        'headers': [(b'content-type', b'application/json')],
+    }, body)
+    response = application(
+        environ, lambda status, headers: statuses.append(int(status[:3])))
+
+    try:
+        b''.join(response)
+    finally:
+        response.close()
+
+    return statuses[0]
+
+
+def reader(application, ids, generator):
+    return [
+        lambda: request(application, 'GET', '/movies', 'page_size=100'),
+        lambda: request(
+            application, 'GET', '/comments',
+            'movie={0}'.format(generator.choice(ids))),
+        lambda: request(application, 'GET', '/top', 'limit=10'),
+    ][generator.randrange(3)]()
+
+
+def writer(application, ids, generator):
+    return request(application, 'POST', '/comments', body=json.dumps({
+        'movie': str(generator.choice(ids)),
+        'comment_content': 'Concurrent comment'}).encode())
+
+
+def worker(path, role, application, ids, deadline, seed, results):
+    send = writer if role == 'write' else reader
+    generator = random.Random(seed)
+    latencies, errors = [], 0
+
+    with database_file(path):
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            status = send(application, ids, generator)
+            latencies.append(time.perf_counter() - started)
+            errors += status >= 400
+
+    results.put((role, latencies, errors))
+
+
+def load(path, application, ids, count):
+    # Method that runs forked readers and writers against path for DURATION
+    # seconds and returns their throughput, latency and error counts
+    context = multiprocessing.get_context('fork')
+    writers = max(1, int(count * WRITE_SHARE))
+    deadline = time.perf_counter() + DURATION
+    queue = context.Queue()
+    workers = [
+        context.Process(target=worker, args=(
+            path, 'write' if i < writers else 'read', application, ids,
+            deadline, i, queue))
+        for i in range(count)]
+    # Forked workers must not share the connections of this process
+    connections.close_all()
+
+    for process in workers:
+        process.start()
+
+    results = [queue.get() for _ in workers]
+
+    for process in workers:
+        process.join()
+
+    row = {'readers': count - writers, 'writers': writers}
+
+    for role in ('read', 'write'):
+        latencies = [latency for name, values, _ in results if name == role
+                     for latency in values]
+        row.update({
+            '{0}_per_second'.format(role): round(
+                len(latencies) / DURATION, 1),
+            '{0}_p99_ms'.format(role): round(
+                percentile(latencies, 99) * 1000, 2) if latencies else None})
+
+    row['errors'] = sum(errors for _, _, errors in results)
+
+    return row
+
+
+def run(sizes=None):
+    # Mixed readers and writers on a file database, with SQLite defaults
+    # and with SQLITE_PROFILE. Every run starts from a fresh copy of the
+    # same data, since journal_mode=WAL stays in the file
+    if connections[DEFAULT_DB_ALIAS].vendor != 'sqlite':
+        return [{'skipped': 'the default database is not SQLite'}]
+
+    directory = tempfile.mkdtemp()
+    seeded = os.path.join(directory, 'seeded.sqlite3')
+    request_logger = logging.getLogger('django.request')
+    level = request_logger.level
+    results = []
+
+    try:
+        with override_settings(SQLITE_PROFILE={'ENABLED': False}):
+            ids = build_database(seeded)
+
+        application = get_wsgi_application()
+        # Locked database errors are counted, not logged
+        request_logger.setLevel(logging.CRITICAL)
+
+        for count in sizes or WORKER_COUNTS:
+            for profile in ('default', 'tuned'):
+                path = os.path.join(directory, '{0}.sqlite3'.format(profile))
+                shutil.copy(seeded, path)
+
+                with override_settings(
+                        SQLITE_PROFILE={'ENABLED': profile == 'tuned'},
+                        TOP_SNAPSHOT=dict(
+                            getattr(settings, 'TOP_SNAPSHOT', {}),
+                            MAX_STALENESS=TOP_STALENESS)):
+                    results.append(dict(
+                        {'workers': count, 'profile': profile},
+                        **load(path, application, ids, count)))
+
+                for name in os.listdir(directory):
+                    if name.startswith(profile):
+                        os.remove(os.path.join(directory, name))
+    finally:
+        request_logger.setLevel(level)
+        shutil.rmtree(directory)
+
+    return results
@@ -0,0 +1,59 @@
+import random
+from ..models import Movie
+from ..search import filter_title
+from .base import measure, rolled_back
+
+CATALOGUE_SIZES = [10000, 100000, 1000000]
+WORDS = [
+    'alien', 'avatar', 'blade', 'city', 'dark', 'dawn', 'empire', 'fire',
+    'ghost', 'house', 'island', 'karate', 'kid', 'king', 'last', 'love',
+    'matrix', 'night', 'ocean', 'planet', 'queen', 'river', 'runner',
+    'shadow', 'star', 'storm', 'summer', 'war', 'winter', 'wolf']
+TERMS = ['karate kid', 'tar', 'runner 42', 'no such title']
+
+
+def seed(size, batch_size=10000):
+    # Method that creates size movies with titles made of random words
+    words = random.Random(size)
+
+    for start in range(0, size, batch_size):
+        Movie.objects.bulk_create(
+            Movie(
+                title='{0} {1} {2}'.format(
+                    words.choice(WORDS).title(),
+                    words.choice(WORDS),
+                    i),
+                year_of_production=1950 + i % 70)
+            for i in range(start, min(size, start + batch_size)))
+
+
+def search_ids(text):
+    return list(filter_title(Movie.objects.all(), text)
+                .values_list('id', flat=True))
+
+
+def scan_ids(text):
+    return list(Movie.objects.filter(title__icontains=text)
+                .values_list('id', flat=True))
+
+
+def run(sizes=None):
+    results = []
+
+    for size in sizes or CATALOGUE_SIZES:
+        with rolled_back():
+            seed(size)
+
+            for term in TERMS:
+                found, index_seconds, _ = measure(search_ids, term)
+                scanned, scan_seconds, _ = measure(scan_ids, term)
+
+                results.append({
+                    'movies': size,
+                    'term': term,
+                    'matches': len(found),
+                    'index_seconds': round(index_seconds, 4),
+                    'scan_seconds': round(scan_seconds, 4),
+                    'same_result': sorted(found) == sorted(scanned)})
+
+    return results
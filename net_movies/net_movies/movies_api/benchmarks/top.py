@@ -0,0 +1,50 @@
+from django.db.models import Count
+from ..models import Movie, MovieComment
+from .. import top_snapshot
+from ..ranking import rank_movies
+from .base import measure, rolled_back
+
+CATALOGUE_SIZES = [10, 100, 1000, 10000]
+DISTINCT_COUNTS = 25
+
+
+def seed(size):
+    # Method that creates size movies where movie i has
+    # i % DISTINCT_COUNTS comments
+    Movie.objects.bulk_create(
+        Movie(
+            title='Movie {0}'.format(i),
+            year_of_production=2000)
+        for i in range(size))
+
+    MovieComment.objects.bulk_create(
+        MovieComment(movie_id=movie_id, comment_content='comment')
+        for i, movie_id in enumerate(
+            Movie.objects.order_by('id').values_list('id', flat=True))
+        for _ in range(i % DISTINCT_COUNTS))
+
+
+def run(sizes=None):
+    results = []
+
+    for size in sizes or CATALOGUE_SIZES:
+        with rolled_back():
+            seed(size)
+            ranking, elapsed, queries = measure(
+                rank_movies, Movie.objects.all())
+            _, aggregated, _ = measure(
+                rank_movies, Movie.objects.all(), Count('comments'))
+            top_snapshot.refresh()
+            _, snapshot, _ = measure(top_snapshot.get_ranking)
+            _, first_page, _ = measure(top_snapshot.get_ranking, size=10)
+
+        results.append({
+            'movies': size,
+            'ranked': len(ranking),
+            'queries': queries,
+            'seconds': round(elapsed, 4),
+            'aggregate_seconds': round(aggregated, 4),
+            'snapshot_seconds': round(snapshot, 4),
+            'first_page_seconds': round(first_page, 4)})
+
+    return results
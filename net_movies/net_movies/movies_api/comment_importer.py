@@ -0,0 +1,165 @@
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Q
+from django.utils import timezone
+from . import response_cache
+from .importer import batches
+from .models import Movie, MovieComment
+from .titles import normalize_title
+
+DEFAULTS = {
+    'BATCH_SIZE': 500,
+    'MAX_ITEMS': 10000,
+}
+
+REQUIRED = 'This field is required.'
+NOT_A_STRING = 'Not a valid string.'
+NOT_AN_OBJECT = 'Expected an object with movie and comment_content.'
+UNKNOWN_MOVIE = 'Movie "{0}" does not exist.'
+
+# Movie ids have to fit a 64-bit integer column
+MAX_ID = 2 ** 63 - 1
+
+
+def get_config():
+    return dict(DEFAULTS, **getattr(settings, 'BULK_COMMENTS', {}))
+
+
+def movie_reference(value):
+    # Method that turns the movie field of an item into an ('id', int) or
+    # ('title', normalised title) tuple, or None when it is not usable.
+    # Strings of decimal digits are ids, isdigit() would also accept
+    # characters like '²' that int() rejects
+    if isinstance(value, str) and value.strip():
+        if not value.isdecimal():
+            return 'title', normalize_title(value)
+
+        value = int(value)
+
+    if isinstance(value, bool) or not isinstance(value, int):
+        return None
+
+    return ('id', value) if 0 < value <= MAX_ID else None
+
+
+def validate(item):
+    # Method that checks the shape of an item without touching the database,
+    # returns (movie reference, comment content, errors)
+    if not isinstance(item, dict):
+        return None, None, {'non_field_errors': [NOT_AN_OBJECT]}
+
+    errors = {}
+    reference = movie_reference(item.get('movie', None))
+    content = item.get('comment_content', None)
+
+    if item.get('movie', None) in (None, ''):
+        errors['movie'] = [REQUIRED]
+    elif reference is None:
+        errors['movie'] = [UNKNOWN_MOVIE.format(item['movie'])]
+
+    if content in (None, ''):
+        errors['comment_content'] = [REQUIRED]
+    elif not isinstance(content, str):
+        errors['comment_content'] = [NOT_A_STRING]
+
+    return reference, content, errors
+
+
+def resolve_movies(references, batch_size):
+    # Method that maps movie references to ids of stored movies with one
+    # query per batch
+    resolved = {}
+
+    for batch in batches(sorted(references), batch_size):
+        ids = [value for kind, value in batch if kind == 'id']
+        titles = [value for kind, value in batch if kind == 'title']
+
+        for movie_id, title in Movie.objects\
+                .filter(Q(id__in=ids) | Q(title_normalized__in=titles))\
+                .values_list('id', 'title_normalized'):
+            resolved[('id', movie_id)] = movie_id
+            resolved[('title', title)] = movie_id
+
+    return resolved
+
+
+class UnknownIds(RuntimeError):
+    pass
+
+
+def assign_ids(comments):
+    # SQLite does not return ids of bulk inserted rows. Its first INSERT
+    # takes the database write lock, held until commit, so inside the
+    # inserting transaction the newest rows are the given comments, in
+    # insertion order, unless something else in the same transaction
+    # inserted comments after them. The rows read back have to carry
+    # consecutive ids and the movie, date and content of the comments, the
+    # transaction is rolled back with UnknownIds otherwise. That only holds
+    # for SQLite, comments saved to other backends keep the ids they
+    # returned, or none
+    if not comments or comments[0].pk is not None:
+        return
+
+    using = router.db_for_write(MovieComment)
+
+    if connections[using].vendor != 'sqlite':
+        return
+
+    rows = list(MovieComment.objects.using(using).select_related(None)
+                .order_by('-id')
+                .values_list('id', 'movie_id', 'created_at', 'comment_content')
+                [:len(comments)])[::-1]
+
+    if len(rows) != len(comments) or \
+            rows[-1][0] - rows[0][0] != len(rows) - 1 or \
+            any(row[1:] != (
+                comment.movie_id, comment.created_at,
+                comment.comment_content)
+                for row, comment in zip(rows, comments)):
+        raise UnknownIds('Ids of inserted comments could not be read back')
+
+    for comment, row in zip(comments, rows):
+        comment.pk = row[0]
+
+
+def import_comments(items, batch_size=None):
+    # Method that stores valid items as comments in one transaction and
+    # returns a list with the stored comment or the errors of every item,
+    # in input order
+    batch_size = batch_size or get_config()['BATCH_SIZE']
+    checked = [validate(item) for item in items]
+    movies = resolve_movies(
+        {reference for reference, _, errors in checked if not errors},
+        batch_size)
+
+    report = []
+    comments = []
+    now = timezone.now()
+
+    for item, (reference, content, errors) in zip(items, checked):
+        if not errors and reference not in movies:
+            errors = {'movie': [UNKNOWN_MOVIE.format(item['movie'])]}
+
+        if errors:
+            report.append({'errors': errors})
+            continue
+
+        comment = MovieComment(
+            movie_id=movies[reference], comment_content=content,
+            created_at=now)
+        comments.append(comment)
+        report.append(comment)
+
+    with transaction.atomic():
+        MovieComment.objects.bulk_create(comments, batch_size=batch_size)
+        assign_ids(comments)
+
+    if comments:
+        response_cache.bump(response_cache.COMMENTS, response_cache.TOP)
+
+    return [
+        result if isinstance(result, dict) else {
+            'id': result.pk,
+            'movie': result.movie_id,
+            'comment_content': result.comment_content}
+        for result in report]
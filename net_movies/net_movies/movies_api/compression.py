@@ -0,0 +1,168 @@
+import zlib
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from .encoded_cache import get_or_encode
+from .instrumentation import timer
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DEFAULTS = {
+    'ENABLED': True,
+    'MIN_SIZE': 1024,
+    'GZIP_LEVEL': 1,
+    'BROTLI_QUALITY': 5,
+    # HTML is left out: admin and browsable API pages carry CSRF tokens,
+    # which compression would expose to BREACH
+    'CONTENT_TYPES': [
+        'application/json', 'application/x-ndjson', 'application/msgpack',
+        'text/plain'],
+}
+
+
+def get_config():
+    return dict(DEFAULTS, **getattr(settings, 'COMPRESSION', {}))
+
+
+def available_encodings():
+    # Preferred first
+    return (['br'] if brotli is not None else []) + ['gzip']
+
+
+def accepted_encodings(header):
+    # Method that parses Accept-Encoding into {coding: quality}
+    accepted = {}
+
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = 1.0
+
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+
+            if name == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+
+        if coding:
+            accepted[coding.strip().lower()] = quality
+
+    return accepted
+
+
+def negotiate(request):
+    # Method that returns the content coding to use for the response to
+    # request, None when it has to be sent as it is
+    accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    quality = {
+        coding: accepted.get(coding, accepted.get('*', 0))
+        for coding in available_encodings()}
+    codings = [coding for coding in quality if quality[coding] > 0]
+
+    return max(codings, key=quality.get) if codings else None
+
+
+class Compressor(object):
+    # Incremental gzip or brotli encoder. Every chunk is flushed, so a
+    # streamed list reaches the client as it is produced
+    def __init__(self, coding, config):
+        self.coding = coding
+
+        if coding == 'br':
+            self.encoder = brotli.Compressor(quality=config['BROTLI_QUALITY'])
+        else:
+            # wbits 31 writes a gzip header with mtime 0
+            self.encoder = zlib.compressobj(
+                config['GZIP_LEVEL'], zlib.DEFLATED, 31)
+
+    def chunk(self, data):
+        if self.coding == 'br':
+            return self.encoder.process(data) + self.encoder.flush()
+
+        return self.encoder.compress(data) + \
+            self.encoder.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.coding == 'br':
+            return self.encoder.finish()
+
+        return self.encoder.flush()
+
+
+def compress(data, coding, config):
+    with timer('compress'):
+        compressor = Compressor(coding, config)
+        return compressor.chunk(data) + compressor.finish()
+
+
+def compress_stream(chunks, coding, config):
+    compressor = Compressor(coding, config)
+
+    for chunk in chunks:
+        if chunk:
+            yield compressor.chunk(chunk)
+
+    yield compressor.finish()
+
+
+def compressible(response, config):
+    content_type = response.get('Content-Type', '').split(';')[0].strip()
+
+    return response.status_code == 200 \
+        and not response.has_header('Content-Encoding') \
+        and any(content_type.startswith(prefix)
+                for prefix in config['CONTENT_TYPES']) \
+        and (response.streaming or len(response.content) >= config['MIN_SIZE'])
+
+
+class CompressionMiddleware(object):
+    # Compresses responses of at least MIN_SIZE bytes and every streamed
+    # response with brotli (when installed) or gzip, as the client's
+    # Accept-Encoding allows. Compressed bytes of pre-encoded payloads are
+    # kept in the encoded cache, see movies_api.encoded_cache
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        config = get_config()
+
+        if not config['ENABLED'] or not compressible(response, config):
+            return response
+
+        patch_vary_headers(response, ['Accept-Encoding'])
+        coding = negotiate(request)
+
+        if coding is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = compress_stream(
+                response.streaming_content, coding, config)
+            del response['Content-Length']
+        else:
+            key = getattr(response, 'encoded_key', None)
+            content = get_or_encode(
+                '{0}:{1}'.format(key, coding),
+                lambda: compress(response.content, coding, config)) \
+                if key else compress(response.content, coding, config)
+
+            if len(content) >= len(response.content):
+                return response
+
+            response.content = content
+            response['Content-Length'] = str(len(content))
+
+        etag = response.get('ETag', '')
+
+        if etag.startswith('"'):
+            # The compressed body is not byte for byte the tagged one
+            response['ETag'] = 'W/' + etag
+
+        response['Content-Encoding'] = coding
+
+        return response
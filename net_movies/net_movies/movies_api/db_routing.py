@@ -0,0 +1,171 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+DEFAULTS = {
+    'REPLICAS': [],
+    'STICKY_SECONDS': 5,
+    'COOKIE': 'primary_until',
+    'HEALTH_CHECKS': True,
+    # Seconds a connection has to be idle before it is checked again
+    'HEALTH_CHECK_IDLE': 5,
+}
+
+_local = threading.local()
+
+
+def get_config():
+    return dict(DEFAULTS, **getattr(settings, 'DATABASE_ROUTING', {}))
+
+
+def current_replica():
+    # Alias reads of this thread go to, None when they go to the primary
+    return getattr(_local, 'replica', None)
+
+
+@contextmanager
+def reading_from(alias):
+    previous = current_replica()
+    _local.replica = alias
+
+    try:
+        yield
+    finally:
+        _local.replica = previous
+
+
+def primary():
+    # Context manager sending reads inside it to the primary, for reads
+    # that must see what the same request writes
+    return reading_from(None)
+
+
+def pinned(request, config):
+    # Clients that wrote less than STICKY_SECONDS ago read from the
+    # primary, so they see their own writes despite replication lag
+    try:
+        return float(request.COOKIES[config['COOKIE']]) > time.time()
+    except (KeyError, ValueError):
+        return False
+
+
+def pinned_to_primary(request):
+    # Whether reads of request go to the primary because its client wrote
+    # recently. Their responses must not be served from or stored in the
+    # response cache, which holds bodies read from lagging replicas
+    config = get_config()
+    return bool(config['REPLICAS']) and pinned(request, config)
+
+
+def streamed_from(alias, chunks):
+    # Streamed responses run their query while the server reads them,
+    # after the handler returned, so every chunk is read from alias too
+    chunks = iter(chunks)
+
+    while True:
+        with reading_from(alias):
+            chunk = next(chunks, None)
+
+        if chunk is None:
+            return
+
+        yield chunk
+
+
+def replica_reads(handler):
+    # Decorator for APIView.get handlers that sends their reads to one
+    # replica, picked per request, unless the client is pinned to the
+    # primary or no replicas are configured
+    @wraps(handler)
+    def wrapper(view, request, *args, **kwargs):
+        config = get_config()
+
+        if not config['REPLICAS'] or pinned(request, config):
+            return handler(view, request, *args, **kwargs)
+
+        alias = random.choice(config['REPLICAS'])
+
+        with reading_from(alias):
+            response = handler(view, request, *args, **kwargs)
+
+        if response.streaming:
+            response.streaming_content = streamed_from(
+                alias, response.streaming_content)
+
+        return response
+    return wrapper
+
+
+class PrimaryReplicaRouter(object):
+    # Writes always go to the primary, reads go to the replica chosen by
+    # replica_reads. Replicas are kept up to date by the database, so
+    # migrations only run on the primary
+    def db_for_read(self, model, **hints):
+        return current_replica() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = [DEFAULT_DB_ALIAS] + get_config()['REPLICAS']
+
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in get_config()['REPLICAS']
+
+
+class PrimaryPinningMiddleware(object):
+    # Sets a cookie pinning the client to the primary for STICKY_SECONDS
+    # after every successful write
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        config = get_config()
+
+        if config['REPLICAS'] and config['STICKY_SECONDS'] and \
+                request.method not in ('GET', 'HEAD', 'OPTIONS') and \
+                response.status_code < 400:
+            response.set_cookie(
+                config['COOKIE'],
+                str(time.time() + config['STICKY_SECONDS']),
+                max_age=config['STICKY_SECONDS'], httponly=True)
+
+        return response
+
+
+def check_connections():
+    # Method that closes persistent connections the server dropped since
+    # the previous request, so the next query reconnects instead of failing.
+    # Checking costs a round trip, so only connections idle for at least
+    # HEALTH_CHECK_IDLE seconds are checked, busy ones were just used
+    config = get_config()
+
+    if not config['HEALTH_CHECKS']:
+        return
+
+    idle_since = getattr(_local, 'idle_since', {})
+    checked_before = time.monotonic() - config['HEALTH_CHECK_IDLE']
+
+    for connection in connections.all():
+        if connection.connection is not None and \
+                not connection.in_atomic_block and \
+                idle_since.get(connection.alias, 0) <= checked_before and \
+                not connection.is_usable():
+            connection.close()
+
+
+def mark_connections_idle():
+    # Method that records when open connections were last used, called at
+    # the end of every request
+    now = time.monotonic()
+    _local.idle_since = {
+        connection.alias: now for connection in connections.all()
+        if connection.connection is not None}
@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.core.cache import caches
+
+DEFAULTS = {
+    'ENABLED': True,
+    'CACHE': 'default',
+    'TIMEOUT': 24 * 60 * 60,
+}
+
+
+class Encoded(object):
+    # Response data whose encoded bytes never change for key, e.g. a stored
+    # OMDb payload keyed by movie and fetch time. Renderers take the bytes
+    # from the cache and call load only to encode a missing entry
+    def __init__(self, key, load):
+        self.key = key
+        self.load = load
+
+
+def get_config():
+    return dict(DEFAULTS, **getattr(settings, 'ENCODED_CACHE', {}))
+
+
+def cache_key(key):
+    return 'encoded:{0}'.format(key)
+
+
+def get_or_encode(key, encode):
+    # Method that returns bytes stored for key, or stores what encode()
+    # returns. Keys have to change whenever the encoded data does
+    config = get_config()
+
+    if not config['ENABLED']:
+        return encode()
+
+    cache = caches[config['CACHE']]
+    content = cache.get(cache_key(key))
+
+    if content is None:
+        content = encode()
+        cache.set(cache_key(key), content, config['TIMEOUT'])
+
+    return content
@@ -0,0 +1,80 @@
+from . import search
+from .models import genre_names
+
+MIN_RATING = 0
+MAX_RATING = 10
+
+
+class InvalidFilter(ValueError):
+    pass
+
+
+def bounds(params, name, parse):
+    # Method that returns (low, high) given as <name>_from and <name>_to,
+    # either may be None. Raises InvalidFilter for values parse rejects or
+    # an empty range
+    try:
+        low, high = [
+            parse(params[key]) if params.get(key, '') else None
+            for key in (name + '_from', name + '_to')]
+    except ValueError:
+        raise InvalidFilter('Invalid {0} range'.format(name))
+
+    if low is not None and high is not None and low > high:
+        raise InvalidFilter('Invalid {0} range'.format(name))
+
+    return low, high
+
+
+def parse_year(value):
+    if not value.isdigit():
+        raise ValueError(value)
+
+    return int(value)
+
+
+def parse_rating(value):
+    rating = float(value)
+
+    if not MIN_RATING <= rating <= MAX_RATING:
+        raise ValueError(value)
+
+    return rating
+
+
+def filter_movies(movies, params):
+    # Method that applies GET /movies filters to movies. Every filter is an
+    # indexed lookup, type also has composite indexes with each ordering
+    # column, see Movie.Meta.indexes
+    year = params.get('year', None)
+    title = params.get('title', None)
+    genre = genre_names(params.get('genre', ''))
+    kind = params.get('type', '').strip().casefold()
+    ranges = {
+        'year_of_production': bounds(params, 'year', parse_year),
+        'imdb_rating': bounds(params, 'rating', parse_rating),
+    }
+
+    if year and year.isdigit():
+        movies = movies.filter(year_of_production=year)
+
+    for column, (low, high) in ranges.items():
+        if low is not None:
+            movies = movies.filter(**{column + '__gte': low})
+
+        if high is not None:
+            movies = movies.filter(**{column + '__lte': high})
+
+    if len(genre) > 1:
+        raise InvalidFilter('Only one genre can be given')
+
+    if genre:
+        movies = movies.filter(genres__genre=genre[0])
+
+    if kind:
+        movies = movies.filter(type=kind)
+
+    if title:
+        movies = search.filter_title(movies, title)
+
+    return movies
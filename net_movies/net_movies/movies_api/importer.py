@@ -0,0 +1,149 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from . import response_cache
+from .lookup_cache import get_lookup_cache
+from .models import Movie
+from .omdb import OMDbError, get_client
+from .titles import normalize_title
+from .utils import year_of_production
+
+CREATED = 'created'
+EXISTS = 'exists'
+DUPLICATE = 'duplicate'
+NOT_FOUND = 'not_found'
+FAILED = 'failed'
+
+# Tries of the existence check and insert, a concurrent import of the same
+# titles can insert them in between
+SAVE_ATTEMPTS = 3
+
+DEFAULTS = {
+    'WORKERS': 8,
+    'BATCH_SIZE': 500,
+    'MAX_TITLES': 1000,
+}
+
+
+def get_config():
+    return dict(DEFAULTS, **getattr(settings, 'BULK_IMPORT', {}))
+
+
+def fetch_all(titles, workers):
+    # Method that looks titles up in OMDb concurrently and yields
+    # (title, data, error) tuples in input order
+    lookup_cache = get_lookup_cache()
+    client = get_client()
+
+    def fetch(title):
+        try:
+            return title, lookup_cache.get_or_fetch(title, client.fetch), None
+        except OMDbError as error:
+            return title, None, str(error)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(fetch, titles)
+
+
+def batches(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def existing_movies(keys, batch_size):
+    # Method that maps normalised titles of stored movies to their ids
+    found = {}
+
+    for batch in batches(sorted(keys), batch_size):
+        found.update(
+            Movie.objects
+            .filter(title_normalized__in=batch)
+            .values_list('title_normalized', 'id'))
+
+    return found
+
+
+def save_movies(new_movies, batch_size):
+    # Method that inserts movies whose normalised titles are not stored,
+    # returns ids of stored and of created movies by normalised title
+    for attempt in range(1, SAVE_ATTEMPTS + 1):
+        try:
+            with transaction.atomic():
+                ids = existing_movies(new_movies, batch_size)
+                created = OrderedDict(
+                    (key, movie) for key, movie in new_movies.items()
+                    if key not in ids)
+                Movie.objects.bulk_create(
+                    created.values(), batch_size=batch_size)
+
+                return ids, {key: movie.pk for key, movie in created.items()}
+        except IntegrityError:
+            if attempt == SAVE_ATTEMPTS:
+                raise
+
+            # Ids some backends set on rolled back rows
+            for movie in new_movies.values():
+                movie.pk = None
+
+
+def import_titles(titles, workers=None, batch_size=None):
+    # Method that imports movies for given titles, returns a list of
+    # {'title', 'status', 'movie_id'} dicts in input order
+    config = get_config()
+    workers = workers or config['WORKERS']
+    batch_size = batch_size or config['BATCH_SIZE']
+
+    unique = OrderedDict()
+    for title in titles:
+        unique.setdefault(normalize_title(title), title)
+
+    results = {}
+    new_movies = OrderedDict()
+
+    for title, data, error in fetch_all(list(unique.values()), workers):
+        if error:
+            results[title] = {'status': FAILED, 'error': error}
+        elif not data:
+            results[title] = {'status': NOT_FOUND}
+        else:
+            key = normalize_title(data['Title'])
+            year = year_of_production(data)
+
+            if not year:
+                results[title] = {
+                    'status': FAILED,
+                    'error': 'OMDb data has no year of production'}
+            elif key in new_movies:
+                results[title] = {'status': DUPLICATE, 'key': key}
+            else:
+                results[title] = {'status': CREATED, 'key': key}
+                new_movies[key] = Movie(
+                    title=data['Title'],
+                    year_of_production=int(year),
+                    omdb_data=data)
+
+    ids, created = save_movies(new_movies, batch_size)
+
+    if created:
+        response_cache.bump(
+            response_cache.MOVIES, response_cache.COMMENTS, response_cache.TOP)
+
+    ids.update(created)
+    report = []
+    seen = set()
+
+    for title in titles:
+        normalized = normalize_title(title)
+        result = dict(results[unique[normalized]])
+        key = result.pop('key', None)
+
+        if normalized in seen:
+            result['status'] = DUPLICATE
+        elif result['status'] == CREATED and key not in created:
+            result['status'] = EXISTS
+
+        seen.add(normalized)
+        report.append(dict(result, title=title, movie_id=ids.get(key, None)))
+
+    return report
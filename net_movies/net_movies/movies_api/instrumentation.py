@@ -0,0 +1,271 @@
+import hmac
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from django.conf import settings
+from django.db import connections
+
+DEFAULTS = {
+    'ENABLED': True,
+    'QUERY_THRESHOLD': 50,
+    'SECONDS_BUCKETS': [
+        0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10],
+    'QUERY_BUCKETS': [1, 2, 5, 10, 20, 50, 100, 200, 500],
+    'BYTES_BUCKETS': [
+        256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304],
+    # /metrics answers requests from these addresses, or carrying
+    # "Authorization: Bearer <METRICS_TOKEN>", with 404 otherwise
+    'METRICS_ALLOWED_IPS': ['127.0.0.1', '::1'],
+    'METRICS_TOKEN': None,
+}
+
+# Request methods used as metric labels, any other one is counted as
+# "other" so clients can not add series
+METHODS = {
+    'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS', 'TRACE',
+    'CONNECT'}
+
+# Parts of a request timed separately, reported in Server-Timing, the log
+# line and the metrics
+TIMED = ['db', 'serialize', 'compress', 'omdb']
+
+logger = logging.getLogger(__name__)
+_local = threading.local()
+
+
+def get_config():
+    return dict(DEFAULTS, **getattr(settings, 'INSTRUMENTATION', {}))
+
+
+class RequestStats(object):
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.seconds = dict.fromkeys(TIMED, 0)
+        self.statements = Counter()
+
+
+def current():
+    # Stats of the request handled by this thread, None outside requests
+    return getattr(_local, 'stats', None)
+
+
+@contextmanager
+def timer(name):
+    # Context manager adding time spent inside it to the current request
+    stats = current()
+    start = time.perf_counter()
+
+    try:
+        yield
+    finally:
+        if stats is not None:
+            stats.seconds[name] += time.perf_counter() - start
+
+
+def record_query(execute, sql, params, many, context):
+    # Database execute wrapper counting queries of the current request.
+    # Statements are counted by their SQL with placeholders, so a query
+    # repeated with different parameters shows up as one statement
+    stats = current()
+
+    if stats is None:
+        return execute(sql, params, many, context)
+
+    stats.queries += 1
+    stats.statements[sql] += 1
+
+    with timer('db'):
+        return execute(sql, params, many, context)
+
+
+class Metrics(object):
+    # Process wide histograms rendered in Prometheus text format. Every
+    # worker process keeps its own, scrape them all
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.collectors = []
+
+    def register(self, collector):
+        # Adds a function returning (name, type, help, value) tuples of
+        # counters and gauges kept elsewhere, read on every render
+        self.collectors.append(collector)
+
+    def observe(self, name, help_text, buckets, labels, value):
+        with self.lock:
+            histogram = self.histograms.setdefault(
+                name, {'help': help_text, 'buckets': buckets, 'series': {}})
+            series = histogram['series'].setdefault(
+                labels, {'buckets': [0] * len(buckets), 'sum': 0,
+                         'count': 0})
+
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    series['buckets'][i] += 1
+
+            series['sum'] += value
+            series['count'] += 1
+
+    def render(self):
+        lines = []
+
+        with self.lock:
+            for name, histogram in sorted(self.histograms.items()):
+                lines.append('# HELP {0} {1}'.format(name, histogram['help']))
+                lines.append('# TYPE {0} histogram'.format(name))
+
+                for labels, series in sorted(histogram['series'].items()):
+                    bounds = [str(bound) for bound in histogram['buckets']]
+
+                    for bound, count in zip(
+                            bounds + ['+Inf'],
+                            series['buckets'] + [series['count']]):
+                        lines.append('{0}_bucket{1} {2}'.format(
+                            name, format_labels(labels + (('le', bound),)),
+                            count))
+
+                    lines.append('{0}_sum{1} {2}'.format(
+                        name, format_labels(labels), series['sum']))
+                    lines.append('{0}_count{1} {2}'.format(
+                        name, format_labels(labels), series['count']))
+
+        for collector in self.collectors:
+            for name, kind, help_text, value in collector():
+                lines.append('# HELP {0} {1}'.format(name, help_text))
+                lines.append('# TYPE {0} {1}'.format(name, kind))
+                lines.append('{0} {1}'.format(name, value))
+
+        return '\n'.join(lines) + '\n'
+
+    def clear(self):
+        with self.lock:
+            self.histograms.clear()
+
+
+def format_labels(labels):
+    return '{' + ','.join(
+        '{0}="{1}"'.format(
+            name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+        for name, value in labels) + '}'
+
+
+metrics = Metrics()
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return getattr(match.func, '__name__', 'unknown') if match else 'unknown'
+
+
+def method_label(request):
+    return request.method if request.method in METHODS else 'other'
+
+
+def metrics_allowed(request, config=None):
+    # Method that tells whether request may read /metrics
+    config = config or get_config()
+    token = config['METRICS_TOKEN']
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+
+    if token and hmac.compare_digest(
+            authorization.encode(), 'Bearer {0}'.format(token).encode()):
+        return True
+
+    return request.META.get('REMOTE_ADDR', None) in \
+        config['METRICS_ALLOWED_IPS']
+
+
+def server_timing(stats, total):
+    parts = ['{0};dur={1:.1f}'.format(name, stats.seconds[name] * 1000)
+             for name in TIMED]
+    parts[0] += ';desc="{0} queries"'.format(stats.queries)
+
+    return ', '.join(parts + ['total;dur={0:.1f}'.format(total * 1000)])
+
+
+def observe(stats, labels, total, size, config):
+    seconds = config['SECONDS_BUCKETS']
+    metrics.observe(
+        'http_request_duration_seconds', 'Wall time of requests',
+        seconds, labels, total)
+    metrics.observe(
+        'http_request_db_queries', 'Database queries per request',
+        config['QUERY_BUCKETS'], labels, stats.queries)
+
+    for name in TIMED:
+        metrics.observe(
+            'http_request_{0}_seconds'.format(name),
+            'Time spent in {0} per request'.format(name),
+            seconds, labels, stats.seconds[name])
+
+    if size is not None:
+        metrics.observe(
+            'http_response_size_bytes', 'Size of response bodies',
+            config['BYTES_BUCKETS'], labels, size)
+
+
+class InstrumentationMiddleware(object):
+    # Measures wall time, database queries and time, serialization and
+    # compression time, OMDb time and response size of every request. Adds
+    # a Server-Timing header, logs one JSON line per request and feeds the
+    # /metrics histograms. Requests with more than QUERY_THRESHOLD queries are
+    # logged as warnings with their most repeated statement
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        config = get_config()
+
+        if not config['ENABLED']:
+            return self.get_response(request)
+
+        stats = _local.stats = RequestStats()
+
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(record_query))
+
+                response = self.get_response(request)
+        finally:
+            _local.stats = None
+
+        total = time.perf_counter() - stats.started
+        size = None if response.streaming else len(response.content)
+        view = view_name(request)
+        response['Server-Timing'] = server_timing(stats, total)
+        observe(
+            stats, (('method', method_label(request)), ('view', view)), total,
+            size, config)
+        self.log(request, response, stats, total, size, view, config)
+
+        return response
+
+    def log(self, request, response, stats, total, size, view, config):
+        line = {
+            'method': request.method,
+            'path': request.path,
+            'view': view,
+            'status': response.status_code,
+            'duration_ms': round(total * 1000, 2),
+            'db_queries': stats.queries,
+            'response_bytes': size,
+        }
+        line.update(
+            ('{0}_ms'.format(name), round(stats.seconds[name] * 1000, 2))
+            for name in TIMED)
+
+        if stats.queries > config['QUERY_THRESHOLD']:
+            statement, repeated = stats.statements.most_common(1)[0]
+            line.update({
+                'query_threshold_exceeded': True,
+                'most_repeated_sql': statement,
+                'most_repeated_count': repeated})
+            logger.warning(json.dumps(line, sort_keys=True))
+        else:
+            logger.info(json.dumps(line, sort_keys=True))
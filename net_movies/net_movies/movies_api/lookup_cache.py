@@ -0,0 +1,258 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from .titles import normalize_title
+
+DEFAULTS = {
+    'CACHE': 'default',
+    'TTL': 7 * 24 * 60 * 60,
+    'NEGATIVE_TTL': 60 * 60,
+    'LOCAL_SIZE': 1024,
+    'LOCAL_TTL': 5 * 60,
+    'LOCK_TIMEOUT': 60,
+    # Seconds a request waits for another process's lookup before querying
+    # OMDb itself. A WSGI worker is blocked meanwhile, so it stays around
+    # the OMDb client's CONNECT_TIMEOUT
+    'LOCK_WAIT': 3,
+    'POLL_INTERVAL': 0.05,
+}
+
+
+class OMDbLookupCache(object):
+    # Two tier cache of OMDb answers keyed by normalised title. Found
+    # movies are kept for ttl and unknown titles for negative_ttl. The
+    # in-process LRU tier keeps entries for at most local_ttl, which bounds
+    # how long an invalidation takes to reach other processes.
+    # Concurrent misses for one title share a single fetch: within the
+    # process through a future, across processes through a lock entry in
+    # the shared tier that others poll for up to lock_wait seconds
+    def __init__(self, cache_alias, ttl, negative_ttl, local_size, local_ttl,
+                 lock_timeout=DEFAULTS['LOCK_TIMEOUT'],
+                 lock_wait=DEFAULTS['LOCK_WAIT'],
+                 poll_interval=DEFAULTS['POLL_INTERVAL']):
+        self.cache_alias = cache_alias
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.local_size = local_size
+        self.local_ttl = local_ttl
+        self.lock_timeout = lock_timeout
+        self.lock_wait = lock_wait
+        self.poll_interval = poll_interval
+        self.local = OrderedDict()
+        self.lock = threading.Lock()
+        self.flights = {}
+        self.counters = {
+            'local_hits': 0, 'shared_hits': 0, 'misses': 0, 'fetches': 0,
+            'coalesced': 0}
+
+    @property
+    def shared(self):
+        return caches[self.cache_alias]
+
+    def key(self, title):
+        return 'omdb-lookup:{0}'.format(hashlib.md5(
+            normalize_title(title).encode()).hexdigest())
+
+    def count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def get_local(self, key):
+        with self.lock:
+            entry = self.local.get(key, None)
+
+            if entry is None:
+                return None
+
+            if entry[0] <= time.time():
+                del self.local[key]
+                return None
+
+            self.local.move_to_end(key)
+            return entry
+
+    def set_local(self, key, expires_at, data):
+        with self.lock:
+            self.local[key] = (
+                min(expires_at, time.time() + self.local_ttl), data)
+            self.local.move_to_end(key)
+
+            while len(self.local) > self.local_size:
+                self.local.popitem(last=False)
+
+    def get(self, title):
+        # Method that returns a (hit, data) tuple, data is None for titles
+        # OMDb does not know
+        key = self.key(title)
+        entry = self.get_local(key)
+
+        if entry is not None:
+            self.count('local_hits')
+            return True, entry[1]
+
+        entry = self.shared.get(key)
+
+        if entry is not None:
+            self.count('shared_hits')
+            self.set_local(key, *entry)
+            return True, entry[1]
+
+        self.count('misses')
+        return False, None
+
+    def set(self, title, data):
+        key = self.key(title)
+        ttl = self.ttl if data else self.negative_ttl
+        entry = (time.time() + ttl, data)
+
+        self.shared.set(key, entry, ttl)
+        self.set_local(key, *entry)
+
+    def get_shared(self, title):
+        # Method that returns a (hit, data) tuple from the shared tier
+        # without counting the lookup
+        key = self.key(title)
+        entry = self.shared.get(key)
+
+        if entry is None:
+            return False, None
+
+        self.set_local(key, *entry)
+        return True, entry[1]
+
+    def lock_title(self, title):
+        return self.shared.add(
+            self.key(title) + ':lock', 1, self.lock_timeout)
+
+    def unlock_title(self, title):
+        self.shared.delete(self.key(title) + ':lock')
+
+    def fetch_and_set(self, title, fetch):
+        self.count('fetches')
+        data = fetch(title)
+        self.set(title, data)
+        return data
+
+    def fetch_shared(self, title, fetch):
+        # Method that fetches title unless another process already does,
+        # in which case it waits for that result. A process that fails
+        # releases the lock so the next waiter takes over
+        deadline = time.monotonic() + self.lock_wait
+
+        while True:
+            if self.lock_title(title):
+                try:
+                    hit, data = self.get_shared(title)
+                    return data if hit else self.fetch_and_set(title, fetch)
+                finally:
+                    self.unlock_title(title)
+
+            if time.monotonic() >= deadline:
+                return self.fetch_and_set(title, fetch)
+
+            time.sleep(self.poll_interval)
+            hit, data = self.get_shared(title)
+
+            if hit:
+                self.count('coalesced')
+                return data
+
+    def get_or_fetch(self, title, fetch):
+        # Method that returns cached data for title or fetches it, calls
+        # made for the same title at the same time share one fetch. Errors
+        # raised by fetch reach every caller waiting for it
+        hit, data = self.get(title)
+
+        if hit:
+            return data
+
+        key = self.key(title)
+
+        with self.lock:
+            flight = self.flights.get(key, None)
+            leader = flight is None
+
+            if leader:
+                flight = self.flights[key] = Future()
+
+        if not leader:
+            try:
+                data = flight.result(timeout=self.lock_wait)
+                self.count('coalesced')
+                return data
+            except TimeoutError:
+                return self.fetch_and_set(title, fetch)
+
+        try:
+            data = self.fetch_shared(title, fetch)
+            flight.set_result(data)
+            return data
+        except Exception as error:
+            flight.set_exception(error)
+            raise
+        finally:
+            with self.lock:
+                self.flights.pop(key, None)
+
+    def invalidate(self, title):
+        key = self.key(title)
+        self.shared.delete(key)
+
+        with self.lock:
+            self.local.pop(key, None)
+
+    def clear(self):
+        # Method that empties the in-process tier only
+        with self.lock:
+            self.local.clear()
+
+    def stats(self):
+        with self.lock:
+            counters = dict(self.counters)
+
+        lookups = counters['local_hits'] + counters['shared_hits'] + \
+            counters['misses']
+        hits = counters['local_hits'] + counters['shared_hits']
+
+        return dict(
+            counters,
+            hit_ratio=round(hits / lookups, 4) if lookups else 0.0)
+
+
+_lookup_cache = None
+_lookup_cache_lock = threading.Lock()
+
+
+def get_lookup_cache():
+    global _lookup_cache
+
+    if _lookup_cache is None:
+        with _lookup_cache_lock:
+            if _lookup_cache is None:
+                options = dict(
+                    DEFAULTS, **getattr(settings, 'OMDB_LOOKUP_CACHE', {}))
+                _lookup_cache = OMDbLookupCache(
+                    options['CACHE'],
+                    options['TTL'],
+                    options['NEGATIVE_TTL'],
+                    options['LOCAL_SIZE'],
+                    options['LOCAL_TTL'],
+                    options['LOCK_TIMEOUT'],
+                    options['LOCK_WAIT'],
+                    options['POLL_INTERVAL'])
+
+    return _lookup_cache
+
+
+@receiver(setting_changed)
+def reset_lookup_cache(setting, **kwargs):
+    global _lookup_cache
+
+    if setting == 'OMDB_LOOKUP_CACHE':
+        _lookup_cache = None
@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand, CommandError
+from ...benchmarks import BENCHMARKS, report
+
+
+class Command(BaseCommand):
+    help = 'Runs performance benchmarks on synthetic data that is ' \
+        'rolled back afterwards'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'names', nargs='*',
+            help='Benchmarks to run, one of: {0} (all by default)'.format(
+                ', '.join(sorted(BENCHMARKS))))
+        parser.add_argument(
+            '--sizes', nargs='+', type=int,
+            help='Override the data sizes used by the benchmarks')
+        parser.add_argument(
+            '--output',
+            help='Save results with the current commit to a JSON file')
+        parser.add_argument(
+            '--compare',
+            help='Report metrics that changed against a saved JSON file')
+        parser.add_argument(
+            '--threshold', type=float, default=10,
+            help='Smallest change in percent reported by --compare')
+
+    def handle(self, *args, **options):
+        unknown = set(options['names']) - set(BENCHMARKS)
+
+        if unknown:
+            raise CommandError(
+                'Unknown benchmarks: {0}'.format(', '.join(sorted(unknown))))
+
+        previous = report.load(options['compare']) \
+            if options['compare'] else None
+        results = {}
+
+        for name in options['names'] or sorted(BENCHMARKS):
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            results[name] = BENCHMARKS[name](sizes=options['sizes'])
+
+            for result in results[name]:
+                self.stdout.write('  ' + '  '.join(
+                    '{0}={1}'.format(key, value)
+                    for key, value in result.items()))
+
+        if options['output']:
+            report.save(options['output'], results)
+
+        if previous is not None:
+            self.write_changes(previous, results, options['threshold'])
+
+    def write_changes(self, previous, results, threshold):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            'Changes above {0}%'.format(threshold)))
+
+        for name, row, key, before, after, change in report.compare(
+                previous, results, threshold):
+            self.stdout.write('  {0} {1} {2}: {3} -> {4} ({5:+.1f}%)'.format(
+                name, ' '.join('{0}={1}'.format(*item) for item in row),
+                key, before, after, change))
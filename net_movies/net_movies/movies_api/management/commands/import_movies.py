@@ -0,0 +1,49 @@
+import sys
+from collections import Counter
+from django.core.management.base import BaseCommand
+from ... import importer
+
+
+class Command(BaseCommand):
+    help = 'Imports movies from OMDb for titles listed one per line in ' \
+        'given file ("-" reads standard input)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file')
+        parser.add_argument(
+            '--workers', type=int,
+            help='Number of concurrent OMDb lookups')
+        parser.add_argument(
+            '--batch-size', type=int,
+            help='Number of movies inserted per query')
+
+    def handle(self, *args, **options):
+        if options['file'] == '-':
+            titles = self.read_titles(sys.stdin)
+        else:
+            with open(options['file']) as titles_file:
+                titles = self.read_titles(titles_file)
+
+        report = importer.import_titles(
+            titles,
+            workers=options['workers'],
+            batch_size=options['batch_size'])
+
+        if options['verbosity'] > 1:
+            for result in report:
+                self.stdout.write('{0}: {1}{2}'.format(
+                    result['title'],
+                    result['status'],
+                    ' ({0})'.format(result['error'])
+                    if 'error' in result else ''))
+
+        self.stdout.write(self.style.SUCCESS(', '.join(
+            '{0} {1}'.format(count, status)
+            for status, count in sorted(
+                Counter(result['status'] for result in report).items()))
+            or 'Nothing to import'))
+
+    def read_titles(self, lines):
+        return [
+            line.strip() for line in lines
+            if line.strip() and not line.startswith('#')]
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from ...lookup_cache import get_lookup_cache
+
+
+class Command(BaseCommand):
+    help = 'Removes cached OMDb answers for given titles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('titles', nargs='+')
+
+    def handle(self, *args, **options):
+        lookup_cache = get_lookup_cache()
+
+        for title in options['titles']:
+            lookup_cache.invalidate(title)
+            self.stdout.write('Invalidated {0}'.format(title))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from ... import rollup
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the daily comment count rollup from stored comments'
+
+    def handle(self, *args, **options):
+        rows = rollup.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            'Rebuilt comment rollup: {0} rows'.format(rows)))
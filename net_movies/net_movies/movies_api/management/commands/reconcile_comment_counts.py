@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from ... import response_cache
+from ...models import Movie
+
+
+class Command(BaseCommand):
+    help = 'Repairs Movie.comment_count counters that drifted from ' \
+        'the number of stored comments'
+
+    def handle(self, *args, **options):
+        fixed = Movie.objects.reconcile_comment_counts()
+
+        if fixed:
+            response_cache.bump(response_cache.MOVIES, response_cache.TOP)
+
+        self.stdout.write(self.style.SUCCESS(
+            'Reconciled comment counts: {0} movies fixed'.format(fixed)))
@@ -0,0 +1,47 @@
+import time
+from django.core.management.base import BaseCommand
+from ... import refresh
+from ...omdb import get_client
+
+
+class Command(BaseCommand):
+    help = 'Runs a worker refreshing stale OMDb data of stored movies ' \
+        'in rate limited batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Process a single batch and exit')
+        parser.add_argument(
+            '--max-age-days', type=int,
+            help='Refresh movies fetched more than this many days ago')
+        parser.add_argument(
+            '--batch-size', type=int,
+            help='Number of movies claimed and updated at once')
+
+    def handle(self, *args, **options):
+        config = refresh.get_config()
+        batch_size = options['batch_size'] or config['BATCH_SIZE']
+        worker = refresh.worker_name()
+        client = get_client()
+        limiter = refresh.RateLimiter(
+            config['REQUESTS_PER_SECOND'],
+            config['DAILY_QUOTA'],
+            config['CACHE'])
+
+        while True:
+            refresh.enqueue_stale(
+                options['max_age_days'], limit=config['DAILY_QUOTA'])
+            jobs = refresh.claim_jobs(worker, batch_size, config['LEASE'])
+            result = refresh.refresh_jobs(jobs, client, limiter, config)
+
+            if options['verbosity'] > 0 and (jobs or options['once']):
+                self.stdout.write(', '.join(
+                    '{0} {1}'.format(count, name)
+                    for name, count in sorted(result.items())))
+
+            if options['once']:
+                return
+
+            if not result['refreshed']:
+                time.sleep(config['IDLE_SLEEP'])
@@ -0,0 +1,35 @@
+import time
+from django.core.management.base import BaseCommand
+from ... import response_cache, top_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the /top ranking snapshot whenever comments ' \
+        'or movies changed'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Refresh the snapshot if it is out of date and exit')
+        parser.add_argument(
+            '--interval', type=float,
+            help='Seconds between checks for changes')
+
+    def handle(self, *args, **options):
+        interval = options['interval'] or \
+            top_snapshot.get_config()['REFRESH_INTERVAL']
+
+        while True:
+            state = top_snapshot.refresh_if_stale(max_staleness=0)
+
+            if state is not None:
+                response_cache.bump(response_cache.TOP)
+
+                if options['verbosity'] > 0:
+                    self.stdout.write('Ranking computed at {0}'.format(
+                        state.computed_at.isoformat()))
+
+            if options['once']:
+                return
+
+            time.sleep(interval)
@@ -0,0 +1,53 @@
+# Generated by Django 2.1.7 on 2026-10-18 09:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def build_comment_rollup(apps, schema_editor):
+    MovieComment = apps.get_model('movies_api', 'MovieComment')
+    MovieCommentDailyCount = apps.get_model(
+        'movies_api', 'MovieCommentDailyCount')
+
+    rows = MovieComment.objects\
+        .annotate(day=TruncDate('created_at'))\
+        .values('movie_id', 'day')\
+        .annotate(comment_count=Count('id'))\
+        .order_by()
+
+    MovieCommentDailyCount.objects.bulk_create(
+        (MovieCommentDailyCount(**row) for row in rows.iterator()),
+        batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies_api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovieCommentDailyCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),  # NOQA
+                ('day', models.DateField()),
+                ('comment_count', models.PositiveIntegerField(default=0)),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_comment_counts', to='movies_api.Movie')),  # NOQA
+            ],
+        ),
+        migrations.AddField(
+            model_name='moviecomment',
+            name='created_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),  # NOQA
+        ),
+        migrations.AlterUniqueTogether(
+            name='moviecommentdailycount',
+            unique_together={('movie', 'day')},
+        ),
+        migrations.RunPython(
+            build_comment_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 2.1.7 on 2026-10-18 10:12
+
+from collections import defaultdict
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from . import _title_search as search
+from net_movies.movies_api.titles import normalize_title
+
+
+def normalize_titles(apps, schema_editor):
+    # Fills title_normalized and merges movies whose titles only differ in
+    # case or whitespace into the oldest one, moving their comments
+    Movie = apps.get_model('movies_api', 'Movie')
+    MovieComment = apps.get_model('movies_api', 'MovieComment')
+    MovieCommentDailyCount = apps.get_model(
+        'movies_api', 'MovieCommentDailyCount')
+
+    movies = defaultdict(list)
+    for movie_id, title in Movie.objects.order_by('id')\
+            .values_list('id', 'title').iterator():
+        movies[normalize_title(title)].append(movie_id)
+
+    for title_normalized, ids in movies.items():
+        keep, duplicates = ids[0], ids[1:]
+
+        if duplicates:
+            MovieComment.objects.filter(movie_id__in=duplicates)\
+                .update(movie_id=keep)
+            MovieCommentDailyCount.objects.filter(movie_id__in=ids).delete()
+            MovieCommentDailyCount.objects.bulk_create(
+                MovieCommentDailyCount(movie_id=keep, **row)
+                for row in MovieComment.objects.filter(movie_id=keep)
+                .annotate(day=TruncDate('created_at'))
+                .values('day')
+                .annotate(comment_count=Count('id'))
+                .order_by())
+            Movie.objects.filter(id__in=duplicates).delete()
+
+        Movie.objects.filter(id=keep)\
+            .update(title_normalized=title_normalized)
+
+
+def install_search_index(apps, schema_editor):
+    search.install(schema_editor.connection)
+
+
+def uninstall_search_index(apps, schema_editor):
+    search.uninstall(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies_api', '0002_comment_daily_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='title_normalized',
+            field=models.CharField(editable=False, max_length=255, null=True),  # NOQA
+        ),
+        migrations.RunPython(normalize_titles, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='movie',
+            name='title_normalized',
+            field=models.CharField(editable=False, max_length=255, unique=True),  # NOQA
+        ),
+        migrations.AlterField(
+            model_name='movie',
+            name='year_of_production',
+            field=models.IntegerField(db_index=True),
+        ),
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
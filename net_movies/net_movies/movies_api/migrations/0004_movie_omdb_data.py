@@ -0,0 +1,106 @@
+# Generated by Django 2.1.7 on 2026-10-18 12:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+import jsonfield.fields
+from . import _title_search as search
+
+
+# Copies of models.omdb_value and models.omdb_columns as they were when this
+# migration was written, later changes to them must not change it
+def omdb_value(data, key):
+    value = (data or {}).get(key, None)
+    return None if value in (None, '', 'N/A') else value
+
+
+def omdb_columns(data):
+    rating = omdb_value(data, 'imdbRating')
+    runtime = (omdb_value(data, 'Runtime') or '').split(' ')[0]
+
+    try:
+        rating = float(rating) if rating else None
+    except ValueError:
+        rating = None
+
+    return {
+        'imdb_rating': rating,
+        'genre': omdb_value(data, 'Genre') or '',
+        'runtime_minutes': int(runtime) if runtime.isdigit() else None,
+        'type': omdb_value(data, 'Type') or '',
+    }
+
+
+def split_omdb_data(apps, schema_editor):
+    # Moves OMDb payloads to the side table and fills promoted columns
+    Movie = apps.get_model('movies_api', 'Movie')
+    MovieOMDbData = apps.get_model('movies_api', 'MovieOMDbData')
+
+    side_rows = []
+    for movie in Movie.objects.order_by('id').iterator():
+        for column, value in omdb_columns(movie.omdb_data).items():
+            setattr(movie, column, value)
+        movie.save(update_fields=list(omdb_columns(None)))
+        side_rows.append(
+            MovieOMDbData(movie_id=movie.id, data=movie.omdb_data))
+
+        if len(side_rows) >= 500:
+            MovieOMDbData.objects.bulk_create(side_rows)
+            side_rows = []
+
+    MovieOMDbData.objects.bulk_create(side_rows)
+
+
+def join_omdb_data(apps, schema_editor):
+    Movie = apps.get_model('movies_api', 'Movie')
+    MovieOMDbData = apps.get_model('movies_api', 'MovieOMDbData')
+
+    for omdb in MovieOMDbData.objects.iterator():
+        Movie.objects.filter(id=omdb.movie_id).update(omdb_data=omdb.data)
+
+
+def install_search_index(apps, schema_editor):
+    # Removing a column rebuilds the movie table on SQLite, dropping triggers
+    search.install(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies_api', '0003_title_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovieOMDbData',
+            fields=[
+                ('movie', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='omdb', serialize=False, to='movies_api.Movie')),  # NOQA
+                ('data', jsonfield.fields.JSONField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='genre',
+            field=models.CharField(blank=True, db_index=True, max_length=255),  # NOQA
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='imdb_rating',
+            field=models.FloatField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='runtime_minutes',
+            field=models.PositiveIntegerField(blank=True, db_index=True, null=True),  # NOQA
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='type',
+            field=models.CharField(blank=True, db_index=True, max_length=20),
+        ),
+        migrations.RunPython(split_omdb_data, join_omdb_data),
+        migrations.RemoveField(
+            model_name='movie',
+            name='omdb_data',
+        ),
+        migrations.RunPython(install_search_index, migrations.RunPython.noop),
+    ]
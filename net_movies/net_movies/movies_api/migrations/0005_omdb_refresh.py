@@ -0,0 +1,38 @@
+# Generated by Django 2.1.7 on 2026-10-18 15:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+from . import _title_search as search
+
+
+def install_search_index(apps, schema_editor):
+    search.install(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies_api', '0004_movie_omdb_data'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='omdb_fetched_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),  # NOQA
+        ),
+        migrations.CreateModel(
+            name='OMDbRefreshJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),  # NOQA
+                ('enqueued_at', models.DateTimeField(default=django.utils.timezone.now)),  # NOQA
+                ('run_after', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),  # NOQA
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('locked_by', models.CharField(blank=True, max_length=64)),
+                ('locked_until', models.DateTimeField(blank=True, db_index=True, null=True)),  # NOQA
+                ('movie', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='refresh_job', to='movies_api.Movie')),  # NOQA
+            ],
+        ),
+        migrations.RunPython(install_search_index, migrations.RunPython.noop),
+    ]
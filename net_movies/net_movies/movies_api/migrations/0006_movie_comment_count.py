@@ -0,0 +1,37 @@
+# Generated by Django 2.1.7 on 2026-10-18 16:40
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from . import _title_search as search
+
+
+def count_comments(apps, schema_editor):
+    Movie = apps.get_model('movies_api', 'Movie')
+    MovieComment = apps.get_model('movies_api', 'MovieComment')
+
+    Movie.objects.update(comment_count=Coalesce(Subquery(
+        MovieComment.objects.filter(movie=OuterRef('pk')).order_by()
+        .values('movie').annotate(total=Count('id')).values('total'),
+        output_field=models.PositiveIntegerField()), 0))
+
+
+def install_search_index(apps, schema_editor):
+    search.install(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies_api', '0005_omdb_refresh'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='comment_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),  # NOQA
+        ),
+        migrations.RunPython(count_comments, migrations.RunPython.noop),
+        migrations.RunPython(install_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 2.1.7 on 2026-10-18 17:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies_api', '0006_movie_comment_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovieRank',
+            fields=[
+                ('movie', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rank_snapshot', serialize=False, to='movies_api.Movie')),  # NOQA
+                ('total_comments', models.PositiveIntegerField()),
+                ('rank', models.PositiveIntegerField(db_index=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TopSnapshotState',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),  # NOQA
+                ('computed_at', models.DateTimeField(blank=True, null=True)),
+                ('changed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 2.1.7 on 2026-10-18 10:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Copy of models.genre_names as it was when this migration was written,
+# later changes to it must not change it
+def genre_names(genre):
+    return sorted({
+        name.strip().casefold() for name in genre.split(',')
+        if name.strip()})
+
+
+def fill_genres(apps, schema_editor):
+    Movie = apps.get_model('movies_api', 'Movie')
+    MovieGenre = apps.get_model('movies_api', 'MovieGenre')
+
+    genres = []
+    for movie_id, genre in Movie.objects.exclude(genre='')\
+            .order_by('id').values_list('id', 'genre').iterator():
+        genres.extend(
+            MovieGenre(movie_id=movie_id, genre=name)
+            for name in genre_names(genre))
+
+        if len(genres) >= 500:
+            MovieGenre.objects.bulk_create(genres)
+            genres = []
+
+    MovieGenre.objects.bulk_create(genres)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies_api', '0007_top_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovieGenre',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),  # NOQA
+                ('genre', models.CharField(max_length=100)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['title'], name='movie_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['type', 'title'], name='movie_type_title_idx'),  # NOQA
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['type', 'year_of_production'], name='movie_type_year_idx'),  # NOQA
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['type', 'imdb_rating'], name='movie_type_rating_idx'),  # NOQA
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['type', 'comment_count'], name='movie_type_comments_idx'),  # NOQA
+        ),
+        migrations.AddField(
+            model_name='moviegenre',
+            name='movie',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='genres', to='movies_api.Movie'),  # NOQA
+        ),
+        migrations.AlterUniqueTogether(
+            name='moviegenre',
+            unique_together={('genre', 'movie')},
+        ),
+        migrations.RunPython(fill_genres, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 2.1.7 on 2026-10-18 11:17
+
+from django.db import migrations, models
+
+
+def mark_out_of_date(apps, schema_editor):
+    # A snapshot already out of date gets a version it was not computed at
+    TopSnapshotState = apps.get_model('movies_api', 'TopSnapshotState')
+    TopSnapshotState.objects.filter(changed_at__isnull=False)\
+        .update(version=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies_api', '0008_movie_filters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='topsnapshotstate',
+            name='computed_version',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='topsnapshotstate',
+            name='version',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(mark_out_of_date, migrations.RunPython.noop),
+    ]
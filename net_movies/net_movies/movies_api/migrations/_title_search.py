@@ -0,0 +1,71 @@
+# Copy of the title search index schema of movies_api.search as it was when
+# migrations 0003 to 0006 were written, later changes to search must not
+# change them. The leading underscore keeps the migration loader away.
+# A migration needing another schema gets a copy of its own
+
+FTS_TABLE = 'movies_api_movie_fts'
+
+FTS_SCHEMA = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+    "title, content='movies_api_movie', content_rowid='id', "
+    "tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS {fts}_insert "
+    "AFTER INSERT ON movies_api_movie BEGIN "
+    "INSERT INTO {fts}(rowid, title) VALUES (new.id, new.title); END",
+    "CREATE TRIGGER IF NOT EXISTS {fts}_delete "
+    "AFTER DELETE ON movies_api_movie BEGIN "
+    "INSERT INTO {fts}({fts}, rowid, title) "
+    "VALUES ('delete', old.id, old.title); END",
+    "CREATE TRIGGER IF NOT EXISTS {fts}_update "
+    "AFTER UPDATE OF title ON movies_api_movie BEGIN "
+    "INSERT INTO {fts}({fts}, rowid, title) "
+    "VALUES ('delete', old.id, old.title); "
+    "INSERT INTO {fts}(rowid, title) VALUES (new.id, new.title); END",
+]
+
+FTS_TRIGGERS = ['{0}_insert', '{0}_delete', '{0}_update']
+
+
+def supports_fts(connection):
+    if connection.vendor != 'sqlite':
+        return False
+
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute(
+                "CREATE VIRTUAL TABLE temp.fts_probe "
+                "USING fts5(title, tokenize='trigram')")
+            cursor.execute("DROP TABLE temp.fts_probe")
+            return True
+        except Exception:
+            return False
+
+
+def install(connection):
+    # Method that creates the index when missing and rebuilds it when any
+    # of its triggers had to be recreated
+    if not supports_fts(connection):
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE name LIKE %s",
+            [FTS_TABLE + '%'])
+        existing = {row[0] for row in cursor.fetchall()}
+
+        for statement in FTS_SCHEMA:
+            cursor.execute(statement.format(fts=FTS_TABLE))
+
+        if not all(trigger.format(FTS_TABLE) in existing
+                   for trigger in FTS_TRIGGERS):
+            cursor.execute(
+                "INSERT INTO {0}({0}) VALUES ('rebuild')".format(FTS_TABLE))
+
+
+def uninstall(connection):
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            for trigger in FTS_TRIGGERS:
+                cursor.execute(
+                    'DROP TRIGGER IF EXISTS ' + trigger.format(FTS_TABLE))
+            cursor.execute('DROP TABLE IF EXISTS ' + FTS_TABLE)
@@ -1,11 +1,302 @@
-from django.db import models
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from django.db import connections, models, transaction
+from django.db.models import Case, Count, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.dispatch import Signal
+from django.utils import timezone
 from jsonfield import JSONField
+from .titles import normalize_title
+
+
+def omdb_value(data, key):
+    value = (data or {}).get(key, None)
+    return None if value in (None, '', 'N/A') else value
+
+
+def omdb_columns(data):
+    # Method that extracts values of promoted Movie columns from OMDb data
+    rating = omdb_value(data, 'imdbRating')
+    runtime = (omdb_value(data, 'Runtime') or '').split(' ')[0]
+
+    try:
+        rating = float(rating) if rating else None
+    except ValueError:
+        rating = None
+
+    return {
+        'imdb_rating': rating,
+        'genre': omdb_value(data, 'Genre') or '',
+        'runtime_minutes': int(runtime) if runtime.isdigit() else None,
+        'type': omdb_value(data, 'Type') or '',
+    }
+
+
+def genre_names(genre):
+    # Method that splits the OMDb genre list into normalised genre names
+    return sorted({
+        name.strip().casefold() for name in genre.split(',')
+        if name.strip()})
+
+
+# Sent once with all comments created by MovieCommentQuerySet.bulk_create()
+# and deleted by MovieCommentQuerySet.delete(), bulk inserts send no
+# post_save signals and post_delete signals do not update counters one by one
+comments_created = Signal(providing_args=['comments', 'using'])
+comments_deleted = Signal(providing_args=['comments', 'using'])
+
+_deletes = threading.local()
+
+
+@contextmanager
+def collect_deleted_comments():
+    # Context manager yielding a list that collects comments deleted
+    # inside it, see collected_deleted_comment
+    if getattr(_deletes, 'comments', None) is not None:
+        yield _deletes.comments
+        return
+
+    _deletes.comments = []
+
+    try:
+        yield _deletes.comments
+    finally:
+        _deletes.comments = None
+
+
+def collecting_deleted_comments():
+    return getattr(_deletes, 'comments', None) is not None
+
+
+def collected_deleted_comment(comment):
+    # Method that adds a deleted comment to the collecting list, returns
+    # False when nothing collects deleted comments
+    collected = getattr(_deletes, 'comments', None)
+
+    if collected is None:
+        return False
+
+    collected.append(comment)
+    return True
+
+
+class BulkUpdateQuerySet(models.QuerySet):
+    def bulk_update(self, objs, fields, batch_size=None):
+        # Backport of QuerySet.bulk_update from Django 2.2: updates given
+        # fields of saved objects with one UPDATE ... CASE query per batch,
+        # returns the number of updated rows
+        objs = list(objs)
+
+        if not objs:
+            return 0
+
+        fields = [self.model._meta.get_field(name) for name in fields]
+        batch_size = min(
+            batch_size or len(objs),
+            connections[self.db].ops.bulk_batch_size(
+                ['pk', 'pk'] + fields, objs))
+        updated = 0
+
+        with transaction.atomic(using=self.db, savepoint=False):
+            for start in range(0, len(objs), batch_size):
+                batch = objs[start:start + batch_size]
+                updated += self.filter(pk__in=[obj.pk for obj in batch])\
+                    .update(**{
+                        field.attname: Case(
+                            *[When(
+                                pk=obj.pk,
+                                then=Value(
+                                    getattr(obj, field.attname),
+                                    output_field=field))
+                              for obj in batch],
+                            output_field=field)
+                        for field in fields})
+
+        return updated
+
+
+class MovieQuerySet(BulkUpdateQuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+
+        for movie in objs:
+            movie.title_normalized = normalize_title(movie.title)
+
+        created = super().bulk_create(objs, *args, **kwargs)
+        pending = [movie for movie in objs if movie.has_pending_omdb_data()]
+        TopSnapshotState.mark_changed(self.db)
+
+        if pending:
+            # Backends like SQLite do not return ids of bulk inserted rows
+            batch_size = kwargs.get('batch_size', None) or 500
+            missing = [movie for movie in pending if movie.pk is None]
+
+            for start in range(0, len(missing), batch_size):
+                batch = missing[start:start + batch_size]
+                ids = dict(self.model.objects.using(self.db)
+                           .filter(title_normalized__in=[
+                               movie.title_normalized for movie in batch])
+                           .values_list('title_normalized', 'id'))
+                for movie in batch:
+                    movie.pk = ids[movie.title_normalized]
+
+            MovieOMDbData.objects.using(self.db).bulk_create(
+                [movie.pop_pending_omdb_data() for movie in pending],
+                batch_size=batch_size)
+            self.set_genres(pending, replace=False)
+
+        return created
+
+    def delete(self):
+        # Comments of deleted movies are deleted with them, so their
+        # counters are not updated one by one
+        with collect_deleted_comments():
+            return super().delete()
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+    def set_genres(self, movies, replace=True):
+        # Method that stores genres listed in the genre column of given
+        # saved movies as MovieGenre rows, replacing the stored ones
+        movies = list(movies)
+        genres = MovieGenre.objects.using(self.db)
+
+        if replace:
+            genres.filter(movie__in=[movie.pk for movie in movies]).delete()
+
+        genres.bulk_create([
+            MovieGenre(movie_id=movie.pk, genre=name)
+            for movie in movies for name in genre_names(movie.genre)])
+
+    def change_comment_counts(self, changes):
+        # Method that applies {movie_id: delta} changes to comment_count with
+        # atomic F() updates, one UPDATE per distinct delta. Counters never
+        # drop below zero
+        movies = defaultdict(list)
+
+        for movie_id, delta in changes.items():
+            if delta:
+                movies[delta].append(movie_id)
+
+        for delta, ids in movies.items():
+            rows = self.filter(id__in=ids)
+
+            if delta < 0:
+                rows = rows.filter(comment_count__gte=-delta)
+
+            rows.update(comment_count=F('comment_count') + delta)
+
+        if movies:
+            TopSnapshotState.mark_changed(self.db)
+
+    def reconcile_comment_counts(self):
+        # Method that sets comment_count of movies whose counter drifted from
+        # the number of stored comments, returns the number of fixed movies
+        stored = Coalesce(Subquery(
+            MovieComment.objects.filter(movie=OuterRef('pk')).order_by()
+            .values('movie').annotate(total=Count('id')).values('total'),
+            output_field=models.PositiveIntegerField()), 0)
+        drifted = list(self.annotate(stored=stored)
+                       .exclude(comment_count=F('stored'))
+                       .values_list('id', flat=True))
+
+        for start in range(0, len(drifted), 500):
+            self.filter(id__in=drifted[start:start + 500])\
+                .update(comment_count=stored)
+
+        return len(drifted)
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        # Method that also stores OMDb data assigned to given movies
+        objs = list(objs)
+        updated = super().bulk_update(objs, fields, batch_size)
+        omdb = [
+            movie.pop_pending_omdb_data() for movie in objs
+            if movie.has_pending_omdb_data()]
+
+        if omdb:
+            side_rows = MovieOMDbData.objects.using(self.db)
+            existing = set(side_rows.filter(
+                movie__in=[row.movie_id for row in omdb])
+                .values_list('movie_id', flat=True))
+            side_rows.bulk_update(
+                [row for row in omdb if row.movie_id in existing],
+                ['data'], batch_size)
+            side_rows.bulk_create(
+                [row for row in omdb if row.movie_id not in existing],
+                batch_size=batch_size)
+            self.set_genres(row.movie for row in omdb)
+
+        return updated
 
 
 class Movie(models.Model):
     title = models.CharField(max_length=255)
-    year_of_production = models.IntegerField()
-    omdb_data = JSONField()
+    title_normalized = models.CharField(
+        max_length=255, unique=True, editable=False)
+    year_of_production = models.IntegerField(db_index=True)
+    imdb_rating = models.FloatField(null=True, blank=True, db_index=True)
+    genre = models.CharField(max_length=255, blank=True, db_index=True)
+    runtime_minutes = models.PositiveIntegerField(
+        null=True, blank=True, db_index=True)
+    type = models.CharField(max_length=20, blank=True, db_index=True)
+    omdb_fetched_at = models.DateTimeField(
+        null=True, blank=True, db_index=True)
+    # Number of comments, kept up to date by MovieCommentQuerySet and the
+    # comment signals, see MovieQuerySet.reconcile_comment_counts
+    comment_count = models.PositiveIntegerField(
+        default=0, db_index=True, editable=False)
+
+    objects = MovieQuerySet.as_manager()
+
+    class Meta:
+        # Filters of GET /movies combined with its orderings, see
+        # movies_api.filters. Single column indexes also order by id
+        indexes = [
+            models.Index(fields=['title'], name='movie_title_idx'),
+            models.Index(
+                fields=['type', 'title'], name='movie_type_title_idx'),
+            models.Index(
+                fields=['type', 'year_of_production'],
+                name='movie_type_year_idx'),
+            models.Index(
+                fields=['type', 'imdb_rating'], name='movie_type_rating_idx'),
+            models.Index(
+                fields=['type', 'comment_count'],
+                name='movie_type_comments_idx'),
+        ]
+
+    # Full OMDb payload lives in MovieOMDbData, so that list and ranking
+    # queries never read it. Assigning it also fills the promoted columns
+    # and omdb_fetched_at, the payload is stored on save
+    @property
+    def omdb_data(self):
+        if self.has_pending_omdb_data():
+            return self._omdb_data
+
+        try:
+            return self.omdb.data
+        except MovieOMDbData.DoesNotExist:
+            return None
+
+    @omdb_data.setter
+    def omdb_data(self, data):
+        self._omdb_data = data
+        self.omdb_fetched_at = timezone.now()
+
+        for column, value in omdb_columns(data).items():
+            setattr(self, column, value)
+
+    def has_pending_omdb_data(self):
+        return hasattr(self, '_omdb_data')
+
+    def pop_pending_omdb_data(self):
+        omdb = MovieOMDbData(
+            movie=self, data=self.__dict__.pop('_omdb_data'))
+        self._state.fields_cache['omdb'] = omdb
+        return omdb
 
     def __str__(self):
         return '{0} ({1})'.format(self.title, self.year_of_production)
@@ -13,16 +304,204 @@ class Movie(models.Model):
     def __repr__(self):
         return '{0} ({1})'.format(self.title, self.year_of_production)
 
+    def delete(self, *args, **kwargs):
+        with collect_deleted_comments():
+            return super().delete(*args, **kwargs)
+
+    def save(self, *args, **kwargs):
+        self.title_normalized = normalize_title(self.title)
+        super().save(*args, **kwargs)
+
+        if self.has_pending_omdb_data():
+            omdb = self.pop_pending_omdb_data()
+            self._state.fields_cache['omdb'] = MovieOMDbData.objects\
+                .using(kwargs.get('using', None))\
+                .update_or_create(movie=self, defaults={'data': omdb.data})[0]
+            Movie.objects.using(self._state.db).set_genres([self])
+
+
+class MovieOMDbData(models.Model):
+    movie = models.OneToOneField(
+        Movie, primary_key=True, related_name='omdb',
+        on_delete=models.CASCADE)
+    data = JSONField()
+
+    objects = BulkUpdateQuerySet.as_manager()
+
+    def __str__(self):
+        return 'MovieOMDbData ({0})'.format(self.movie_id)
+
+    def __repr__(self):
+        return 'MovieOMDbData ({0})'.format(self.movie_id)
+
+
+class MovieGenre(models.Model):
+    # One of the genres listed in Movie.genre, casefolded, so that movies
+    # can be filtered by genre with an index
+    movie = models.ForeignKey(
+        Movie, related_name='genres', on_delete=models.CASCADE)
+    genre = models.CharField(max_length=100)
+
+    class Meta:
+        unique_together = ('genre', 'movie')
+
+    def __str__(self):
+        return 'MovieGenre ({0}): {1}'.format(self.movie_id, self.genre)
+
+    def __repr__(self):
+        return 'MovieGenre ({0}): {1}'.format(self.movie_id, self.genre)
+
+
+class MovieCommentQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        # Method that also counts created comments on their movies and in
+        # the daily rollup, signals are not sent for bulk inserts
+        objs = list(objs)
+
+        with transaction.atomic(using=self.db, savepoint=False):
+            created = super().bulk_create(objs, *args, **kwargs)
+            comments_created.send(
+                sender=self.model, comments=objs, using=self.db)
+
+        return created
+
+    def for_display(self):
+        # Method that loads the movie title along with comments, for paths
+        # that print comments or their movie
+        return self.select_related('movie')\
+            .only('id', 'comment_content', 'created_at', 'movie__title')
+
+    def delete(self):
+        # Method that updates counters of all deleted comments at once
+        with transaction.atomic(using=self.db, savepoint=False):
+            with collect_deleted_comments() as comments:
+                deleted = super().delete()
+
+            comments_deleted.send(
+                sender=self.model, comments=comments, using=self.db)
+
+        return deleted
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+
+class MovieCommentManager(
+        models.Manager.from_queryset(MovieCommentQuerySet)):
+    def get_queryset(self):
+        # Comments are mostly shown with their movie title. Related
+        # managers, cascades, values() and deletes do not join the movie
+        return super().get_queryset().select_related('movie')
+
 
 class MovieComment(models.Model):
     comment_content = models.TextField()
     movie = models.ForeignKey(
         Movie, related_name='comments', on_delete=models.CASCADE)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    objects = MovieCommentManager()
+
+    def movie_label(self):
+        # Title of the movie when it is loaded, otherwise its id, so that
+        # printing comments never queries
+        return self.movie.title if MovieComment.movie.is_cached(self) \
+            else 'movie {0}'.format(self.movie_id)
 
     def __str__(self):
         return 'MovieComment ({0}): {1}'\
-            .format(self.movie.title, self.comment_content)
+            .format(self.movie_label(), self.comment_content)
 
     def __repr__(self):
         return 'MovieComment ({0}): {1}'\
-            .format(self.movie.title, self.comment_content)
+            .format(self.movie_label(), self.comment_content)
+
+
+class MovieCommentDailyCount(models.Model):
+    movie = models.ForeignKey(
+        Movie, related_name='daily_comment_counts', on_delete=models.CASCADE)
+    day = models.DateField()
+    comment_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('movie', 'day')
+
+    def __str__(self):
+        return 'MovieCommentDailyCount ({0}, {1}): {2}'\
+            .format(self.movie_id, self.day, self.comment_count)
+
+    def __repr__(self):
+        return 'MovieCommentDailyCount ({0}, {1}): {2}'\
+            .format(self.movie_id, self.day, self.comment_count)
+
+
+class OMDbRefreshJob(models.Model):
+    # Queued refresh of a movie's OMDb data, see refresh.py. A worker
+    # claims a job by setting locked_by and locked_until, jobs whose lease
+    # ran out can be claimed again
+    movie = models.OneToOneField(
+        Movie, related_name='refresh_job', on_delete=models.CASCADE)
+    enqueued_at = models.DateTimeField(default=timezone.now)
+    run_after = models.DateTimeField(default=timezone.now, db_index=True)
+    attempts = models.PositiveIntegerField(default=0)
+    locked_by = models.CharField(max_length=64, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    def __str__(self):
+        return 'OMDbRefreshJob ({0})'.format(self.movie_id)
+
+    def __repr__(self):
+        return 'OMDbRefreshJob ({0})'.format(self.movie_id)
+
+
+class MovieRank(models.Model):
+    # Row of the materialised overall ranking served by /top, see
+    # top_snapshot.py
+    movie = models.OneToOneField(
+        Movie, primary_key=True, related_name='rank_snapshot',
+        on_delete=models.CASCADE)
+    total_comments = models.PositiveIntegerField()
+    rank = models.PositiveIntegerField(db_index=True)
+
+    objects = BulkUpdateQuerySet.as_manager()
+
+    def __str__(self):
+        return 'MovieRank ({0}): {1}'.format(self.movie_id, self.rank)
+
+    def __repr__(self):
+        return 'MovieRank ({0}): {1}'.format(self.movie_id, self.rank)
+
+
+class TopSnapshotState(models.Model):
+    # Single row telling when MovieRank was computed and since when it is
+    # out of date (changed_at is None while it is current). Every change
+    # increments version and a recompute stores the version it saw, so a
+    # change made while the ranking is recomputed is never lost
+    computed_at = models.DateTimeField(null=True, blank=True)
+    changed_at = models.DateTimeField(null=True, blank=True)
+    version = models.BigIntegerField(default=0)
+    computed_version = models.BigIntegerField(default=0)
+
+    SINGLETON_ID = 1
+
+    @classmethod
+    def mark_changed(cls, using=None):
+        # Every change writes the row, so it waits for a recompute holding
+        # the row lock and the recompute sees the change once it commits
+        cls.objects.using(using).filter(id=cls.SINGLETON_ID).update(
+            version=F('version') + 1,
+            changed_at=Coalesce(
+                'changed_at',
+                Value(timezone.now(), output_field=models.DateTimeField())))
+
+    def is_current(self):
+        return self.computed_at is not None \
+            and self.version == self.computed_version
+
+    def __str__(self):
+        return 'TopSnapshotState: computed {0}, changed {1}'\
+            .format(self.computed_at, self.changed_at)
+
+    def __repr__(self):
+        return 'TopSnapshotState: computed {0}, changed {1}'\
+            .format(self.computed_at, self.changed_at)
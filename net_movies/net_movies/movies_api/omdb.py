@@ -0,0 +1,254 @@
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from .instrumentation import timer
+
+DEFAULTS = {
+    'URL': 'http://www.omdbapi.com/',
+    'CONNECT_TIMEOUT': 3.05,
+    'READ_TIMEOUT': 10,
+    'RETRIES': 2,
+    'BACKOFF': 0.2,
+    'MAX_BACKOFF': 2,
+    'POOL_SIZE': 10,
+    'MAX_IN_FLIGHT': 10,
+    'ACQUIRE_TIMEOUT': 5,
+    'FAILURE_THRESHOLD': 5,
+    'RESET_TIMEOUT': 30,
+    'ASYNC_POOL_SIZE': 100,
+    'ASYNC_MAX_IN_FLIGHT': 500,
+}
+
+
+class OMDbError(Exception):
+    pass
+
+
+class OMDbUnavailable(OMDbError):
+    pass
+
+
+class CircuitBreaker(object):
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    def allow(self):
+        # Method that tells whether a call may go through. After
+        # reset_timeout an open circuit lets a single trial call through
+        with self.lock:
+            if self.state == self.CLOSED:
+                return True
+
+            if self.state == self.OPEN and \
+                    time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return True
+
+            return False
+
+    def cancel(self):
+        # Method that gives back a trial call that was never made
+        with self.lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+
+    def success(self):
+        with self.lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def failure(self):
+        with self.lock:
+            self.failures += 1
+
+            if self.state == self.HALF_OPEN or \
+                    self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class BaseOMDbClient(object):
+    # Retry, circuit breaker and statistics bookkeeping shared by the
+    # blocking and the asyncio client
+    def __init__(self, url, api_key, **options):
+        options = dict(DEFAULTS, **options)
+        self.url = url
+        self.api_key = api_key
+        self.retries = options['RETRIES']
+        self.backoff = options['BACKOFF']
+        self.max_backoff = options['MAX_BACKOFF']
+        self.acquire_timeout = options['ACQUIRE_TIMEOUT']
+        self.breaker = CircuitBreaker(
+            options['FAILURE_THRESHOLD'], options['RESET_TIMEOUT'])
+
+        self.counters_lock = threading.Lock()
+        self.counters = dict.fromkeys([
+            'requests', 'errors', 'retries', 'timeouts', 'rejected',
+            'latency_count'], 0)
+        self.counters.update(latency_sum=0.0, latency_max=0.0)
+
+    def count(self, **increments):
+        with self.counters_lock:
+            for name, value in increments.items():
+                self.counters[name] += value
+
+    def record_latency(self, seconds):
+        with self.counters_lock:
+            self.counters['latency_count'] += 1
+            self.counters['latency_sum'] += seconds
+            self.counters['latency_max'] = max(
+                self.counters['latency_max'], seconds)
+
+    def stats(self):
+        with self.counters_lock:
+            return dict(self.counters, circuit=self.breaker.state)
+
+    def backoff_delay(self, attempt):
+        delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def reject(self, reason):
+        self.count(rejected=1)
+        raise OMDbUnavailable(reason)
+
+    def give_up(self, attempts):
+        self.breaker.failure()
+        raise OMDbUnavailable(
+            'OMDb request failed after {0} attempts'.format(attempts))
+
+    def client_error(self, status_code):
+        # 4xx answers mean OMDb is up, they are neither retried nor counted
+        # against the circuit
+        self.count(errors=1)
+        self.breaker.success()
+        raise OMDbError('OMDb responded with {0}'.format(status_code))
+
+    def found(self, data):
+        return data if data.get('Title', None) else None
+
+
+class OMDbClient(BaseOMDbClient):
+    def __init__(self, url, api_key, **options):
+        super().__init__(url, api_key, **options)
+        options = dict(DEFAULTS, **options)
+        self.timeout = (options['CONNECT_TIMEOUT'], options['READ_TIMEOUT'])
+        self.in_flight = threading.BoundedSemaphore(options['MAX_IN_FLIGHT'])
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=options['POOL_SIZE'],
+            max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def request(self, params):
+        # Method that performs a single HTTP call, returns the response or
+        # raises requests exceptions for timeouts and connection errors
+        start = time.perf_counter()
+
+        try:
+            self.count(requests=1)
+
+            with timer('omdb'):
+                return self.session.get(
+                    self.url,
+                    params=dict(params, apikey=self.api_key),
+                    timeout=self.timeout)
+        finally:
+            self.record_latency(time.perf_counter() - start)
+
+    def get(self, **params):
+        # Method that queries OMDb with bounded retries on timeouts and 5xx
+        # responses and returns decoded JSON
+        if not self.breaker.allow():
+            self.reject('OMDb circuit is open')
+
+        if not self.in_flight.acquire(timeout=self.acquire_timeout):
+            self.breaker.cancel()
+            self.reject('Too many OMDb requests in flight')
+
+        try:
+            for attempt in range(self.retries + 1):
+                if attempt:
+                    self.count(retries=1)
+                    time.sleep(self.backoff_delay(attempt - 1))
+
+                try:
+                    response = self.request(params)
+                except requests.Timeout:
+                    self.count(errors=1, timeouts=1)
+                    continue
+                except requests.ConnectionError:
+                    self.count(errors=1)
+                    continue
+
+                if response.status_code >= 500:
+                    self.count(errors=1)
+                    continue
+
+                if response.status_code != 200:
+                    self.client_error(response.status_code)
+
+                try:
+                    data = response.json()
+                except ValueError:
+                    self.count(errors=1)
+                    continue
+
+                self.breaker.success()
+                return data
+        finally:
+            self.in_flight.release()
+
+        self.give_up(attempt + 1)
+
+    def fetch(self, title):
+        # Method that returns OMDb data for given title or None if OMDb
+        # does not know it
+        return self.found(self.get(t=title))
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def client_arguments():
+    options = dict(getattr(settings, 'OMDB_CLIENT', {}))
+    url = options.pop('URL', DEFAULTS['URL'])
+
+    return (url, getattr(settings, 'OMDB_API_KEY', '')), options
+
+
+def get_client():
+    global _client
+
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                args, options = client_arguments()
+                _client = OMDbClient(*args, **options)
+
+    return _client
+
+
+@receiver(setting_changed)
+def reset_client(setting, **kwargs):
+    global _client
+
+    if setting in ('OMDB_CLIENT', 'OMDB_API_KEY'):
+        _client = None
@@ -0,0 +1,132 @@
+import asyncio
+import time
+import weakref
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from .omdb import DEFAULTS, BaseOMDbClient, client_arguments
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+class AsyncOMDbClient(BaseOMDbClient):
+    # asyncio counterpart of OMDbClient built on aiohttp. One client
+    # keeps up to ASYNC_MAX_IN_FLIGHT lookups going over a shared pool of
+    # ASYNC_POOL_SIZE connections, it has to be used within a single
+    # event loop
+    def __init__(self, url, api_key, **options):
+        if aiohttp is None:
+            raise ImportError('AsyncOMDbClient requires aiohttp')
+
+        super().__init__(url, api_key, **options)
+        options = dict(DEFAULTS, **options)
+        self.timeout = aiohttp.ClientTimeout(
+            sock_connect=options['CONNECT_TIMEOUT'],
+            sock_read=options['READ_TIMEOUT'])
+        self.in_flight = asyncio.BoundedSemaphore(
+            options['ASYNC_MAX_IN_FLIGHT'])
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=options['ASYNC_POOL_SIZE']),
+            timeout=self.timeout)
+
+    async def request(self, params):
+        # Method that performs a single HTTP call, returns a (status, data)
+        # tuple where data is None for bodies that are not JSON
+        start = time.perf_counter()
+
+        try:
+            self.count(requests=1)
+            async with self.session.get(
+                    self.url,
+                    params=dict(params, apikey=self.api_key)) as response:
+                try:
+                    data = await response.json(content_type=None)
+                except ValueError:
+                    data = None
+
+                return response.status, data
+        finally:
+            self.record_latency(time.perf_counter() - start)
+
+    async def get(self, **params):
+        # Method that queries OMDb with bounded retries on timeouts and 5xx
+        # responses and returns decoded JSON
+        if not self.breaker.allow():
+            self.reject('OMDb circuit is open')
+
+        try:
+            await asyncio.wait_for(
+                self.in_flight.acquire(), self.acquire_timeout)
+        except asyncio.TimeoutError:
+            self.breaker.cancel()
+            self.reject('Too many OMDb requests in flight')
+
+        try:
+            for attempt in range(self.retries + 1):
+                if attempt:
+                    self.count(retries=1)
+                    await asyncio.sleep(self.backoff_delay(attempt - 1))
+
+                try:
+                    status, data = await self.request(params)
+                except asyncio.TimeoutError:
+                    self.count(errors=1, timeouts=1)
+                    continue
+                except aiohttp.ClientError:
+                    self.count(errors=1)
+                    continue
+
+                if status >= 500:
+                    self.count(errors=1)
+                    continue
+
+                if status != 200:
+                    self.client_error(status)
+
+                if not isinstance(data, dict):
+                    self.count(errors=1)
+                    continue
+
+                self.breaker.success()
+                return data
+        finally:
+            self.in_flight.release()
+
+        self.give_up(attempt + 1)
+
+    async def fetch(self, title):
+        # Method that returns OMDb data for given title or None if OMDb
+        # does not know it
+        return self.found(await self.get(t=title))
+
+    async def close(self):
+        await self.session.close()
+
+
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_client():
+    # Method that returns the client of the running event loop
+    loop = asyncio.get_event_loop()
+
+    if loop not in _clients:
+        args, options = client_arguments()
+        _clients[loop] = AsyncOMDbClient(*args, **options)
+
+    return _clients[loop]
+
+
+async def close_async_client():
+    client = _clients.pop(asyncio.get_event_loop(), None)
+
+    if client is not None:
+        await client.close()
+
+
+@receiver(setting_changed)
+def reset_async_clients(setting, **kwargs):
+    if setting in ('OMDB_CLIENT', 'OMDB_API_KEY'):
+        _clients.clear()
@@ -0,0 +1,152 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs, urlparse
+
+# Genres of generated answers, picked by title length
+GENERATED_GENRES = [
+    'Drama', 'Comedy', 'Action, Adventure', 'Comedy, Drama', 'Horror',
+    'Documentary', 'Animation, Comedy, Family']
+
+MOVIES = {
+    'avatar': {
+        'Title': 'Avatar',
+        'Year': '2009',
+        'Genre': 'Action, Adventure, Fantasy',
+        'Runtime': '162 min',
+        'imdbRating': '7.8',
+        'Type': 'movie',
+        'Response': 'True',
+    },
+    'karate kids': {
+        'Title': 'Karate Kids',
+        'Year': '1990',
+        'Genre': 'Animation, Short',
+        'Runtime': '20 min',
+        'imdbRating': 'N/A',
+        'Type': 'movie',
+        'Response': 'True',
+    },
+}
+
+NOT_FOUND = {'Response': 'False', 'Error': 'Movie not found!'}
+
+
+class ThreadingServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    # Load tests open hundreds of connections at once
+    request_queue_size = 512
+
+    def handle_error(self, request, client_address):
+        # Clients giving up on slow responses are expected, not errors
+        pass
+
+
+class OMDbStubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.server.stub.count(connections=1)
+
+    def do_GET(self):
+        stub = self.server.stub
+        status, delay = stub.next_response()
+        stub.count(requests=1)
+
+        if delay:
+            time.sleep(delay)
+
+        title = parse_qs(urlparse(self.path).query).get('t', [''])[0]
+        body = json.dumps(
+            stub.movie(title) if status == 200 else {'Error': 'Failure'})\
+            .encode()
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class OMDbStub(object):
+    # Local HTTP server answering OMDb title lookups, used by tests and
+    # benchmarks instead of the real API. With generate=True every title
+    # is known and gets a synthetic payload
+    def __init__(self, movies=None, generate=False, delay=0):
+        self.movies = MOVIES if movies is None else movies
+        self.generate = generate
+        self.delay = delay
+        self.failures = []
+        self.counters = {'requests': 0, 'connections': 0}
+        self.lock = threading.Lock()
+        self.server = None
+
+    @property
+    def url(self):
+        return 'http://{0}:{1}/'.format(*self.server.server_address)
+
+    @property
+    def requests(self):
+        return self.counters['requests']
+
+    @property
+    def connections(self):
+        return self.counters['connections']
+
+    def count(self, **increments):
+        with self.lock:
+            for name, value in increments.items():
+                self.counters[name] += value
+
+    def fail_next(self, times, status=503, delay=0):
+        with self.lock:
+            self.failures.extend([(status, delay)] * times)
+
+    def next_response(self):
+        with self.lock:
+            return self.failures.pop(0) if self.failures \
+                else (200, self.delay)
+
+    def movie(self, title):
+        key = ' '.join(title.casefold().split())
+
+        if key in self.movies:
+            return self.movies[key]
+
+        if self.generate and key:
+            return {
+                'Title': title,
+                'Year': str(1900 + len(key) % 120),
+                'Genre': GENERATED_GENRES[len(key) % len(GENERATED_GENRES)],
+                'Runtime': '{0} min'.format(60 + len(key) % 90),
+                'imdbRating': '{0:.1f}'.format(len(key) % 100 / 10),
+                'Type': 'series' if len(key) % 5 == 0 else 'movie',
+                'Response': 'True',
+            }
+
+        return NOT_FOUND
+
+    def start(self):
+        self.server = ThreadingServer(('127.0.0.1', 0), OMDbStubHandler)
+        self.server.stub = self
+        threading.Thread(
+            target=self.server.serve_forever,
+            kwargs={'poll_interval': 0.05},
+            daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,259 @@
+import base64
+import binascii
+import json
+from itertools import chain, islice
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils.http import urlencode
+from rest_framework.response import Response
+from .rendering import dumps, values_rows
+
+DEFAULTS = {
+    'PAGE_SIZE': 100,
+    'MAX_PAGE_SIZE': 1000,
+    'CHUNK_SIZE': 2000,
+}
+
+# Cursor numbers have to fit a 64-bit integer column
+CURSOR_NUMBER_BOUND = 2 ** 63
+
+STREAM_FORMATS = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class InvalidPage(ValueError):
+    pass
+
+
+def get_config():
+    return dict(DEFAULTS, **getattr(settings, 'PAGINATION', {}))
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(
+        json.dumps(values, cls=DjangoJSONEncoder).encode()).decode()
+
+
+def decode_cursor(cursor, ordering, model=None):
+    # Method that returns cursor values for ordering. With a model, every
+    # value has to suit the model field it is compared to
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, ValueError):
+        raise InvalidPage('Invalid cursor')
+
+    if not isinstance(values, list) or len(values) != len(ordering):
+        raise InvalidPage('Invalid cursor')
+
+    if model is not None and not all(
+            valid_cursor_value(model._meta.get_field(field.lstrip('-')), value)
+            for field, value in zip(ordering, values)):
+        raise InvalidPage('Invalid cursor')
+
+    return values
+
+
+def valid_cursor_value(field, value):
+    kind = field.get_internal_type()
+
+    if value is None:
+        # Rows without a value of a nullable field, see segments()
+        return field.null
+
+    if kind in ('CharField', 'TextField'):
+        return isinstance(value, str)
+
+    if isinstance(value, bool):
+        return False
+
+    if kind == 'AutoField' or kind.endswith('IntegerField'):
+        return isinstance(value, int) \
+            and -CURSOR_NUMBER_BOUND <= value < CURSOR_NUMBER_BOUND
+
+    if kind == 'FloatField':
+        # NaN fails both comparisons
+        return isinstance(value, (int, float)) \
+            and -CURSOR_NUMBER_BOUND <= value < CURSOR_NUMBER_BOUND
+
+    return value is not None
+
+
+def keyset_filter(ordering, values):
+    # Method that builds a filter selecting rows placed after given values
+    # in ordering, e.g. for ['-year', 'id'] it is
+    # year <= v0 AND (year < v0 OR (year = v0 AND id > v1)). The redundant
+    # bound on the first field lets the database seek to it in an index
+    # instead of filtering every row before the cursor
+    first = ordering[0]
+    after = Q()
+
+    for i, field in enumerate(ordering):
+        name = field.lstrip('-')
+        condition = Q(**{
+            name + ('__lt' if field.startswith('-') else '__gt'): values[i]})
+
+        for previous, value in zip(ordering[:i], values[:i]):
+            condition &= Q(**{previous.lstrip('-'): value})
+
+        after |= condition
+
+    if len(ordering) > 1:
+        after &= Q(**{
+            first.lstrip('-') +
+            ('__lte' if first.startswith('-') else '__gte'): values[0]})
+
+    return after
+
+
+def segments(queryset, ordering):
+    # Method that splits queryset into (queryset, ordering) parts read one
+    # after another. Rows whose first ordering field is NULL can not be
+    # compared with a cursor, so they come last, in a part of their own
+    # ordered by the remaining fields. Each part is read from an index.
+    # Only the first ordering field may be nullable
+    name = ordering[0].lstrip('-')
+
+    if len(ordering) < 2 or not queryset.model._meta.get_field(name).null:
+        return [(queryset, tuple(ordering))]
+
+    return [
+        (queryset.filter(**{name + '__isnull': False}), tuple(ordering)),
+        (queryset.filter(**{name + '__isnull': True}), tuple(ordering[1:]))]
+
+
+def page_size(request):
+    # Method that returns requested page size capped to MAX_PAGE_SIZE,
+    # or None when the client did not ask for a page
+    config = get_config()
+    size = request.GET.get('page_size', None)
+
+    if size is None:
+        return config['PAGE_SIZE'] if 'cursor' in request.GET else None
+
+    if not size.isdigit() or not int(size):
+        raise InvalidPage('Invalid page size')
+
+    return min(int(size), config['MAX_PAGE_SIZE'])
+
+
+def paginate(request, queryset, ordering=('id',)):
+    # Method that returns (rows, next_url) for the page of queryset placed
+    # after the cursor passed in request. The last ordering field has to be
+    # unique, rows are objects or dicts carrying the ordering fields
+    size = page_size(request)
+    cursor = request.GET.get('cursor', None)
+    values = decode_cursor(cursor, ordering, queryset.model) \
+        if cursor else None
+    rows = []
+
+    for part, part_ordering in segments(queryset, ordering):
+        # The cursor of a row without a value points into the NULL part
+        null_part = len(part_ordering) < len(ordering)
+        part = part.order_by(*part_ordering)
+
+        if values is not None and (values[0] is None) == null_part:
+            part = part.filter(keyset_filter(
+                part_ordering, values[len(ordering) - len(part_ordering):]))
+        elif values is not None and values[0] is None:
+            continue
+
+        rows += part[:size + 1 - len(rows)]
+
+        if len(rows) > size:
+            break
+
+    if len(rows) <= size:
+        return rows, None
+
+    rows = rows[:size]
+    last = rows[-1]
+    values = [
+        last[field.lstrip('-')] if isinstance(last, dict)
+        else getattr(last, field.lstrip('-'))
+        for field in ordering]
+
+    return rows, next_page_url(request, values, size)
+
+
+def next_page_url(request, values, size):
+    # Method that builds the URL of the page after the row with given
+    # cursor values, keeping other query parameters
+    query = request.GET.copy()
+    query['cursor'] = encode_cursor(values)
+    query['page_size'] = size
+
+    return request.build_absolute_uri(
+        '{0}?{1}'.format(request.path, urlencode(sorted(query.items()))))
+
+
+def link_header(next_url):
+    return {'Link': '<{0}>; rel="next"'.format(next_url)} if next_url else {}
+
+
+def stream_format(request):
+    stream = request.GET.get('stream', None)
+
+    if stream and stream not in STREAM_FORMATS:
+        raise InvalidPage('Invalid stream format')
+
+    return stream
+
+
+def chunked(rows, size):
+    rows = iter(rows)
+    chunk = list(islice(rows, size))
+
+    while chunk:
+        yield chunk
+        chunk = list(islice(rows, size))
+
+
+def json_chunks(rows, stream, rows_per_chunk=500):
+    # Method that encodes rows as a JSON array or NDJSON lines, yielding
+    # bytes for every rows_per_chunk rows
+    if stream == 'ndjson':
+        for chunk in chunked(rows, rows_per_chunk):
+            yield b''.join(dumps(row) + b'\n' for row in chunk)
+        return
+
+    yield b'['
+
+    for i, chunk in enumerate(chunked(rows, rows_per_chunk)):
+        yield (b',' if i else b'') + dumps(chunk)[1:-1]
+
+    yield b']'
+
+
+def streaming_response(queryset, fields, stream, ordering=('id',)):
+    # Method that streams queryset values in constant memory
+    rows = chain.from_iterable(
+        part.order_by(*part_ordering).values(*fields)
+        .iterator(chunk_size=get_config()['CHUNK_SIZE'])
+        for part, part_ordering in segments(queryset, ordering))
+
+    return StreamingHttpResponse(
+        json_chunks(rows, stream), content_type=STREAM_FORMATS[stream])
+
+
+def list_response(request, queryset, fields, ordering=('id',)):
+    # Method that answers a list request with given fields of every row in
+    # ordering, with a keyset page when page_size or cursor are given, or
+    # with a stream when stream is given. Fields have to include the
+    # ordering fields. Raises InvalidPage for malformed parameters
+    stream = stream_format(request)
+
+    if stream:
+        return streaming_response(queryset, fields, stream, ordering)
+
+    if page_size(request) is None:
+        return Response([
+            row for part, part_ordering in segments(queryset, ordering)
+            for row in values_rows(part.order_by(*part_ordering), fields)])
+
+    rows, next_url = paginate(request, queryset.values(*fields), ordering)
+
+    return Response(rows, headers=link_header(next_url))
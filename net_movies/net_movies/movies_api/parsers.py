@@ -0,0 +1,30 @@
+import json
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class NDJSONParser(BaseParser):
+    # Parses newline delimited JSON into a list with one item per line,
+    # blank lines are skipped
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get(
+            'encoding', settings.DEFAULT_CHARSET)
+        items = []
+
+        for number, line in enumerate(stream, 1):
+            line = line.decode(encoding).strip()
+
+            if not line:
+                continue
+
+            try:
+                items.append(json.loads(line))
+            except ValueError as error:
+                raise ParseError(
+                    'NDJSON parse error on line {0} - {1}'.format(
+                        number, error))
+
+        return items
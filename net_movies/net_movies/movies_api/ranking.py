@@ -0,0 +1,78 @@
+from itertools import islice, takewhile
+from django.db import connections
+from django.db.models import F, Q, Window
+from django.db.models.functions import DenseRank
+from .pagination import InvalidPage, decode_cursor
+
+# Values of the last row of a ranking page carried by the next page cursor,
+# enough to continue dense ranks across ties without counting earlier rows
+RANK_CURSOR = ('total_comments', 'movie_id', 'rank')
+
+
+def dense_rank(rows, rank=0, previous=None):
+    # Method that assigns dense ranks to (movie_id, total_comments) rows
+    # already ordered by total_comments descending, continuing after a row
+    # with given rank and total_comments
+    for movie_id, total_comments in rows:
+        if total_comments != previous:
+            rank, previous = rank + 1, total_comments
+
+        yield {
+            'movie_id': movie_id,
+            'total_comments': total_comments,
+            'rank': rank}
+
+
+def rank_movies(movies, total_comments=None):
+    # Method that ranks given movies by number of comments in one query,
+    # using DENSE_RANK() when the database supports window functions. By
+    # default it reads the indexed comment_count counter
+    movies = movies.annotate(
+        total_comments=total_comments or F('comment_count'))\
+        .order_by('-total_comments', 'id')
+
+    if connections[movies.db].features.supports_over_clause:
+        rows = movies.annotate(rank=Window(
+            expression=DenseRank(),
+            order_by=F('total_comments').desc()))\
+            .values_list('id', 'total_comments', 'rank')
+
+        return [
+            {'movie_id': movie_id, 'total_comments': total, 'rank': rank}
+            for movie_id, total, rank in rows]
+
+    return list(dense_rank(movies.values_list('id', 'total_comments')))
+
+
+def decode_rank_cursor(cursor):
+    values = decode_cursor(cursor, RANK_CURSOR)
+
+    if not all(isinstance(value, int) for value in values):
+        raise InvalidPage('Invalid cursor')
+
+    return values
+
+
+def ranked(movies, total_comments, limit=None, after=None, size=None):
+    # Method that returns up to size ranking rows of movies ranked at most
+    # limit, continuing after a RANK_CURSOR position. Rows are streamed in
+    # order and reading stops at limit or size, so the rest of the ranking
+    # is never materialised
+    movies = movies.annotate(total_comments=total_comments)\
+        .order_by('-total_comments', 'id')
+    rank, previous = 0, None
+
+    if after:
+        previous, movie_id, rank = after
+        movies = movies.filter(
+            Q(total_comments__lt=previous) |
+            Q(total_comments=previous, id__gt=movie_id))
+
+    rows = dense_rank(
+        movies.values_list('id', 'total_comments').iterator(),
+        rank, previous)
+
+    if limit:
+        rows = takewhile(lambda row: row['rank'] <= limit, rows)
+
+    return list(islice(rows, size) if size else rows)
@@ -0,0 +1,191 @@
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Q
+from django.utils import timezone
+from . import response_cache
+from .lookup_cache import get_lookup_cache
+from .models import Movie, OMDbRefreshJob, omdb_columns
+from .omdb import OMDbError, OMDbUnavailable
+
+DEFAULTS = {
+    'MAX_AGE_DAYS': 30,
+    'BATCH_SIZE': 50,
+    'REQUESTS_PER_SECOND': 1,
+    'DAILY_QUOTA': 500,
+    'CACHE': 'default',
+    'LEASE': 10 * 60,
+    'RETRY_DELAY': 60 * 60,
+    'MAX_RETRY_DELAY': 24 * 60 * 60,
+    'IDLE_SLEEP': 60,
+}
+
+UPDATED_FIELDS = ['omdb_fetched_at'] + list(omdb_columns(None))
+
+
+def get_config():
+    return dict(DEFAULTS, **getattr(settings, 'OMDB_REFRESH', {}))
+
+
+def worker_name():
+    return '{0}-{1}-{2}'.format(
+        socket.gethostname(), os.getpid(), uuid.uuid4().hex[:8])[-64:]
+
+
+class RateLimiter(object):
+    # Spaces OMDb requests of a worker by 1 / rate seconds and counts them
+    # against a daily quota kept in the cache. Workers share the quota only
+    # through a shared cache backend, with LocMemCache each process counts
+    # its own
+    def __init__(self, rate, daily_quota, cache_alias):
+        self.interval = 1 / rate
+        self.daily_quota = daily_quota
+        self.cache_alias = cache_alias
+        self.next_at = 0
+        self.lock = threading.Lock()
+
+    def quota_key(self):
+        return 'omdb-refresh-quota:{0}'.format(
+            timezone.now().date().isoformat())
+
+    def used(self):
+        return caches[self.cache_alias].get(self.quota_key(), 0)
+
+    def acquire(self):
+        # Method that waits for the next request slot, returns False when
+        # today's quota is used up
+        cache = caches[self.cache_alias]
+        key = self.quota_key()
+        cache.add(key, 0, 2 * 24 * 60 * 60)
+
+        if cache.incr(key) > self.daily_quota:
+            return False
+
+        with self.lock:
+            delay = self.next_at - time.monotonic()
+            self.next_at = max(self.next_at, time.monotonic()) + \
+                self.interval
+
+        if delay > 0:
+            time.sleep(delay)
+
+        return True
+
+
+def stale_movies(max_age_days=None):
+    max_age_days = max_age_days or get_config()['MAX_AGE_DAYS']
+    fetched_before = timezone.now() - timedelta(days=max_age_days)
+
+    return Movie.objects.filter(
+        Q(omdb_fetched_at__isnull=True) |
+        Q(omdb_fetched_at__lt=fetched_before))
+
+
+def enqueue_stale(max_age_days=None, limit=None):
+    # Method that queues refresh jobs for movies fetched more than
+    # max_age_days ago that are not queued yet, oldest first. Returns the
+    # number of queued jobs
+    ids = stale_movies(max_age_days)\
+        .filter(refresh_job__isnull=True)\
+        .order_by('omdb_fetched_at', 'id')\
+        .values_list('id', flat=True)
+
+    jobs = OMDbRefreshJob.objects.bulk_create(
+        [OMDbRefreshJob(movie_id=movie_id)
+         for movie_id in (ids[:limit] if limit else ids)],
+        batch_size=500)
+
+    return len(jobs)
+
+
+def claim_jobs(worker, batch_size, lease):
+    # Method that locks up to batch_size due jobs for worker for lease
+    # seconds. Claiming is a single conditional UPDATE, so two workers
+    # never get the same job
+    now = timezone.now()
+    free = Q(locked_until__isnull=True) | Q(locked_until__lt=now)
+    ids = list(OMDbRefreshJob.objects
+               .filter(free, run_after__lte=now)
+               .order_by('run_after', 'id')
+               .values_list('id', flat=True)[:batch_size])
+
+    OMDbRefreshJob.objects.filter(free, id__in=ids).update(
+        locked_by=worker, locked_until=now + timedelta(seconds=lease))
+
+    return list(OMDbRefreshJob.objects
+                .filter(id__in=ids, locked_by=worker)
+                .select_related('movie')
+                .order_by('run_after', 'id'))
+
+
+def retry_later(jobs, config):
+    for job in jobs:
+        delay = min(
+            config['MAX_RETRY_DELAY'],
+            config['RETRY_DELAY'] * 2 ** job.attempts)
+        OMDbRefreshJob.objects.filter(id=job.id).update(
+            attempts=job.attempts + 1,
+            run_after=timezone.now() + timedelta(seconds=delay),
+            locked_by='',
+            locked_until=None)
+
+
+def release(jobs):
+    OMDbRefreshJob.objects.filter(id__in=[job.id for job in jobs])\
+        .update(locked_by='', locked_until=None)
+
+
+def refresh_jobs(jobs, client, limiter, config=None):
+    # Method that re-fetches movies of claimed jobs and stores the answers
+    # with two bulk updates. Jobs that can not run now, because the quota
+    # is used up or OMDb is down, are released or retried later. Returns
+    # counts of refreshed, failed and deferred jobs
+    config = config or get_config()
+    refreshed, failed, done = [], [], []
+    pending = list(jobs)
+
+    while pending:
+        job = pending[0]
+
+        if not limiter.acquire():
+            break
+
+        pending.pop(0)
+        movie = job.movie
+
+        try:
+            data = client.fetch(movie.title)
+        except OMDbUnavailable:
+            failed.append(job)
+            break
+        except OMDbError:
+            failed.append(job)
+            continue
+
+        if data:
+            movie.omdb_data = data
+            get_lookup_cache().set(movie.title, data)
+        else:
+            # Keep what was stored, OMDb is asked again after MAX_AGE_DAYS
+            movie.omdb_fetched_at = timezone.now()
+
+        refreshed.append(movie)
+        done.append(job)
+
+    # Bulk updates send no signals
+    if Movie.objects.bulk_update(refreshed, UPDATED_FIELDS):
+        response_cache.bump(response_cache.MOVIES)
+
+    OMDbRefreshJob.objects.filter(id__in=[job.id for job in done]).delete()
+    retry_later(failed, config)
+    release(pending)
+
+    return {
+        'refreshed': len(done),
+        'failed': len(failed),
+        'deferred': len(pending)}
@@ -0,0 +1,112 @@
+import json
+from rest_framework import renderers
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.utils.encoders import JSONEncoder
+from .encoded_cache import Encoded, get_or_encode
+from .instrumentation import timer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+def default(value):
+    return JSONEncoder().default(value)
+
+
+def dumps(data):
+    # Method that encodes data as compact UTF-8 JSON bytes, with orjson
+    # when it is installed. Line and paragraph separators are escaped like
+    # DRF does, so the output is also valid JavaScript
+    content = orjson.dumps(data, default=default) if orjson else json.dumps(
+        data, cls=JSONEncoder, ensure_ascii=False,
+        separators=(',', ':')).encode()
+
+    return content.replace(b'\xe2\x80\xa8', b'\\u2028')\
+        .replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+def values_rows(queryset, fields):
+    # Method that reads given fields of queryset rows as plain dicts,
+    # without instantiating models or serializer fields
+    return [
+        dict(zip(fields, row)) for row in queryset.values_list(*fields)]
+
+
+def packb(data):
+    # Method that encodes data as MessagePack, values JSON has no type for
+    # (dates, decimals) are encoded as they are in JSON
+    return msgpack.packb(data, use_bin_type=True, default=default)
+
+
+def render_encoded(renderer, data, renderer_context, encode):
+    # Method that returns bytes of an Encoded payload in the format of
+    # renderer from the encoded cache. The response keeps the key, so
+    # compressed variants are cached too, see movies_api.compression
+    key = '{0}:{1}'.format(data.key, renderer.format)
+    response = (renderer_context or {}).get('response', None)
+
+    if response is not None:
+        response.encoded_key = key
+
+    return get_or_encode(key, lambda: encode(data.load()))
+
+
+class JSONRenderer(renderers.JSONRenderer):
+    # Renders through dumps unless the client asked for indented output
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        with timer('serialize'):
+            if self.get_indent(accepted_media_type, renderer_context or {}):
+                return super().render(
+                    data.load() if isinstance(data, Encoded) else data,
+                    accepted_media_type, renderer_context)
+
+            if isinstance(data, Encoded):
+                return render_encoded(self, data, renderer_context, dumps)
+
+            return dumps(data)
+
+
+class MessagePackRenderer(renderers.BaseRenderer):
+    # Compact binary rendering for clients sending
+    # Accept: application/msgpack (or ?format=msgpack). Offered only when
+    # msgpack is installed
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    @property
+    def available(self):
+        return msgpack is not None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        with timer('serialize'):
+            if isinstance(data, Encoded):
+                return render_encoded(self, data, renderer_context, packb)
+
+            return packb(data)
+
+
+class ContentNegotiation(DefaultContentNegotiation):
+    # Leaves out renderers whose optional dependency is not installed, so
+    # that clients asking only for them get 406 Not Acceptable
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return super().select_renderer(
+            request,
+            [renderer for renderer in renderers
+             if getattr(renderer, 'available', True)],
+            format_suffix)
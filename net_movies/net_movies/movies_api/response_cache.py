@@ -0,0 +1,172 @@
+import hashlib
+import time
+from functools import wraps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from .db_routing import pinned_to_primary
+
+CACHED_HEADERS = ['Link', 'X-Computed-At']
+
+MOVIES = 'movies'
+COMMENTS = 'comments'
+TOP = 'top'
+
+DEFAULTS = {
+    'ENABLED': False,
+    'CACHE': 'default',
+    'TIMEOUT': 300,
+    'LOCK_TIMEOUT': 10,
+    'LOCK_WAIT': 5,
+    'POLL_INTERVAL': 0.05,
+}
+
+
+def get_config():
+    return dict(DEFAULTS, **getattr(settings, 'RESPONSE_CACHE', {}))
+
+
+def get_cache():
+    return caches[get_config()['CACHE']]
+
+
+def generation_key(resource):
+    return 'response-cache:generation:{0}'.format(resource)
+
+
+def initial_generation():
+    # Generations start from the clock, so a counter evicted from the cache
+    # never comes back with a value used by older entries
+    return int(time.time() * 1000000)
+
+
+def generations(resources):
+    cache = get_cache()
+    keys = [generation_key(resource) for resource in resources]
+    values = cache.get_many(keys)
+
+    for key in keys:
+        if key not in values:
+            cache.add(key, initial_generation(), None)
+            values[key] = cache.get(key)
+
+    return [values[key] for key in keys]
+
+
+def bump(*resources, using=None):
+    # Method that invalidates every cached response built from resources
+    # once the current transaction commits. Bumping earlier would let a
+    # reader cache data from before the commit under the new generation
+    if not get_config()['ENABLED']:
+        return
+
+    transaction.on_commit(lambda: increment(resources), using=using)
+
+
+def increment(resources):
+    cache = get_cache()
+
+    for resource in resources:
+        try:
+            cache.incr(generation_key(resource))
+        except ValueError:
+            cache.set(generation_key(resource), initial_generation(), None)
+
+
+def response_key(path, media_type, resources):
+    return 'response-cache:{0}'.format(hashlib.md5('|'.join(
+        [path, media_type or '']
+        + [str(generation) for generation in generations(resources)])
+        .encode()).hexdigest())
+
+
+def build_entry(view, request, response):
+    response.accepted_renderer = request.accepted_renderer
+    response.accepted_media_type = request.accepted_media_type
+    response.renderer_context = view.get_renderer_context()
+    response.render()
+
+    return {
+        'content': response.content,
+        'content_type': response['Content-Type'],
+        'etag': quote_etag(hashlib.md5(response.content).hexdigest()),
+        'last_modified': int(time.time()),
+        'headers': {
+            header: response[header]
+            for header in CACHED_HEADERS if response.has_header(header)},
+    }
+
+
+def wait_for_entry(cache, key, config):
+    # Method that polls for an entry built by the worker holding the lock
+    deadline = time.monotonic() + config['LOCK_WAIT']
+
+    while time.monotonic() < deadline:
+        time.sleep(config['POLL_INTERVAL'])
+        entry = cache.get(key)
+
+        if entry is not None:
+            return entry
+
+
+def entry_response(request, entry):
+    response = get_conditional_response(
+        request, etag=entry['etag'], last_modified=entry['last_modified'])\
+        or HttpResponse(entry['content'], content_type=entry['content_type'])
+
+    for header, value in entry.get('headers', {}).items():
+        response[header] = value
+
+    response['ETag'] = entry['etag']
+    response['Last-Modified'] = http_date(entry['last_modified'])
+    patch_vary_headers(response, ['Accept'])
+
+    return response
+
+
+def cached_response(*resources):
+    # Decorator for APIView.get handlers that serves rendered bytes from
+    # Django's cache, keyed by the current generation of given resources.
+    # Only one worker rebuilds a missing entry, others wait for its result.
+    # Clients pinned to the primary bypass the cache, see db_routing
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(view, request, *args, **kwargs):
+            config = get_config()
+
+            if not config['ENABLED'] or pinned_to_primary(request):
+                return handler(view, request, *args, **kwargs)
+
+            cache = get_cache()
+            key = response_key(
+                request.get_full_path(), request.accepted_media_type,
+                resources)
+            entry = cache.get(key)
+
+            if entry is None:
+                lock_key = key + ':lock'
+                locked = cache.add(lock_key, 1, config['LOCK_TIMEOUT'])
+
+                if not locked:
+                    entry = wait_for_entry(cache, key, config)
+
+                if entry is None:
+                    try:
+                        response = handler(view, request, *args, **kwargs)
+
+                        if response.status_code != 200 or \
+                                response.streaming:
+                            return response
+
+                        entry = build_entry(view, request, response)
+                        cache.set(key, entry, config['TIMEOUT'])
+                    finally:
+                        if locked:
+                            cache.delete(lock_key)
+
+            return entry_response(request, entry)
+        return wrapper
+    return decorator
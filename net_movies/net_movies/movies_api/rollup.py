@@ -0,0 +1,143 @@
+from collections import Counter
+from django.db import IntegrityError, transaction
+from django.db.models import (
+    Case,
+    Count,
+    F,
+    PositiveIntegerField,
+    Q,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce, Greatest, TruncDate
+from django.utils import timezone
+from . import response_cache
+from .models import MovieComment, MovieCommentDailyCount
+
+
+def comment_day(comment):
+    return timezone.localdate(comment.created_at)
+
+
+def count_by_day(comments):
+    return Counter((c.movie_id, comment_day(c)) for c in comments)
+
+
+def total_comments(date_from=None, date_to=None):
+    # Method that builds a Movie annotation summing daily comment counters
+    # within the given (inclusive, optionally open-ended) date range
+    days = Q()
+
+    if date_from:
+        days &= Q(daily_comment_counts__day__gte=date_from)
+    if date_to:
+        days &= Q(daily_comment_counts__day__lte=date_to)
+
+    return Coalesce(
+        Sum('daily_comment_counts__comment_count', filter=days), 0)
+
+
+def add_count(movie_id, day, count):
+    rows = MovieCommentDailyCount.objects.filter(movie_id=movie_id, day=day)
+
+    if rows.update(comment_count=F('comment_count') + count):
+        return
+
+    try:
+        with transaction.atomic():
+            MovieCommentDailyCount.objects.create(
+                movie_id=movie_id, day=day, comment_count=count)
+    except IntegrityError:
+        rows.update(comment_count=F('comment_count') + count)
+
+
+def add_counts(counts):
+    # Method that applies many counters with one SELECT, one UPDATE and one
+    # INSERT. Only rows seen by the SELECT are updated, rows created by
+    # others in the meantime make the INSERT fail and are updated one by one
+    rows = Q()
+    for movie_id, day in counts:
+        rows |= Q(movie_id=movie_id, day=day)
+
+    existing = set(MovieCommentDailyCount.objects.filter(rows)
+                   .values_list('movie_id', 'day'))
+
+    if existing:
+        matches = [
+            (Q(movie_id=movie_id, day=day), counts[movie_id, day])
+            for movie_id, day in existing]
+        increments = Case(
+            *[When(match, then=Value(count)) for match, count in matches],
+            output_field=PositiveIntegerField())
+        rows = Q()
+        for match, _ in matches:
+            rows |= match
+
+        MovieCommentDailyCount.objects.filter(rows)\
+            .update(comment_count=F('comment_count') + increments)
+
+    missing = [key for key in counts if key not in existing]
+
+    try:
+        with transaction.atomic():
+            MovieCommentDailyCount.objects.bulk_create(
+                MovieCommentDailyCount(
+                    movie_id=movie_id, day=day,
+                    comment_count=counts[movie_id, day])
+                for movie_id, day in missing)
+    except IntegrityError:
+        for movie_id, day in missing:
+            add_count(movie_id, day, counts[movie_id, day])
+
+
+def add_comments(comments, batch_size=200):
+    # Method that increments daily comment counters for created comments
+    counts = sorted(count_by_day(comments).items())
+
+    if len(counts) == 1:
+        (movie_id, day), count = counts[0]
+        return add_count(movie_id, day, count)
+
+    for start in range(0, len(counts), batch_size):
+        add_counts(dict(counts[start:start + batch_size]))
+
+
+def remove_comments(comments, batch_size=200):
+    # Method that decrements daily comment counters for deleted comments
+    # with one UPDATE per batch of (movie, day) pairs, never below zero
+    counts = sorted(count_by_day(comments).items())
+
+    for start in range(0, len(counts), batch_size):
+        rows = Q()
+        decrements = []
+
+        for (movie_id, day), count in counts[start:start + batch_size]:
+            match = Q(movie_id=movie_id, day=day)
+            rows |= match
+            decrements.append(When(match, then=Value(count)))
+
+        MovieCommentDailyCount.objects.filter(rows).update(
+            comment_count=Greatest(
+                F('comment_count') - Case(
+                    *decrements, output_field=PositiveIntegerField()),
+                Value(0)))
+
+
+@transaction.atomic
+def rebuild():
+    # Method that recreates the whole rollup table from stored comments
+    MovieCommentDailyCount.objects.all().delete()
+
+    rows = MovieComment.objects\
+        .annotate(day=TruncDate('created_at'))\
+        .values('movie_id', 'day')\
+        .annotate(comment_count=Count('id'))\
+        .order_by()
+
+    created = MovieCommentDailyCount.objects.bulk_create(
+        (MovieCommentDailyCount(**row) for row in rows.iterator()),
+        batch_size=500)
+    response_cache.bump(response_cache.TOP)
+
+    return len(created)
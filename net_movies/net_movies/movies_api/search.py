@@ -0,0 +1,109 @@
+from django.db import connections
+
+FTS_TABLE = 'movies_api_movie_fts'
+
+# External content FTS5 index over movie titles, kept in sync by triggers
+# so that bulk and raw writes are indexed too. Table rebuilds done by
+# SQLite schema migrations drop the triggers, install() puts them back
+FTS_SCHEMA = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+    "title, content='movies_api_movie', content_rowid='id', "
+    "tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS {fts}_insert "
+    "AFTER INSERT ON movies_api_movie BEGIN "
+    "INSERT INTO {fts}(rowid, title) VALUES (new.id, new.title); END",
+    "CREATE TRIGGER IF NOT EXISTS {fts}_delete "
+    "AFTER DELETE ON movies_api_movie BEGIN "
+    "INSERT INTO {fts}({fts}, rowid, title) "
+    "VALUES ('delete', old.id, old.title); END",
+    "CREATE TRIGGER IF NOT EXISTS {fts}_update "
+    "AFTER UPDATE OF title ON movies_api_movie BEGIN "
+    "INSERT INTO {fts}({fts}, rowid, title) "
+    "VALUES ('delete', old.id, old.title); "
+    "INSERT INTO {fts}(rowid, title) VALUES (new.id, new.title); END",
+]
+
+FTS_TRIGGERS = ['{0}_insert', '{0}_delete', '{0}_update']
+
+MIN_MATCH_LENGTH = 3
+
+_available = {}
+
+
+def supports_fts(connection):
+    if connection.vendor != 'sqlite':
+        return False
+
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute(
+                "CREATE VIRTUAL TABLE temp.fts_probe "
+                "USING fts5(title, tokenize='trigram')")
+            cursor.execute("DROP TABLE temp.fts_probe")
+            return True
+        except Exception:
+            return False
+
+
+def schema_objects(connection):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE name LIKE %s",
+            [FTS_TABLE + '%'])
+        return {row[0] for row in cursor.fetchall()}
+
+
+def install(connection):
+    # Method that creates the title search index when missing and
+    # rebuilds it when any of its triggers had to be recreated
+    _available.pop(connection.alias, None)
+
+    if not supports_fts(connection):
+        return False
+
+    existing = schema_objects(connection)
+
+    with connection.cursor() as cursor:
+        for statement in FTS_SCHEMA:
+            cursor.execute(statement.format(fts=FTS_TABLE))
+
+        if not all(trigger.format(FTS_TABLE) in existing
+                   for trigger in FTS_TRIGGERS):
+            cursor.execute(
+                "INSERT INTO {0}({0}) VALUES ('rebuild')".format(FTS_TABLE))
+
+    return True
+
+
+def uninstall(connection):
+    _available.pop(connection.alias, None)
+
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            for trigger in FTS_TRIGGERS:
+                cursor.execute(
+                    'DROP TRIGGER IF EXISTS ' + trigger.format(FTS_TABLE))
+            cursor.execute('DROP TABLE IF EXISTS ' + FTS_TABLE)
+
+
+def available(connection):
+    if connection.alias not in _available:
+        _available[connection.alias] = connection.vendor == 'sqlite' and \
+            FTS_TABLE in schema_objects(connection)
+
+    return _available[connection.alias]
+
+
+def filter_title(queryset, text):
+    # Method that filters movies with titles containing text, ignoring
+    # case. Served by the trigram index when it exists and text is long
+    # enough to form a trigram, by a LIKE scan otherwise
+    if len(text) >= MIN_MATCH_LENGTH and \
+            available(connections[queryset.db]):
+        return queryset.extra(
+            where=['"movies_api_movie"."id" IN ('
+                   'SELECT rowid FROM {0} WHERE {0} MATCH %s)'
+                   .format(FTS_TABLE)],
+            params=['"{0}"'.format(text.replace('"', '""'))])
+
+    return queryset.filter(title__icontains=text)
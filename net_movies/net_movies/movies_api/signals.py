@@ -0,0 +1,150 @@
+from collections import Counter
+from django.core.signals import request_finished, request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.models.signals import (
+    post_delete,
+    post_migrate,
+    post_save,
+    pre_save,
+)
+from django.dispatch import receiver
+from . import (
+    db_routing,
+    response_cache,
+    rollup,
+    search,
+    sqlite_profile,
+)
+from .models import (
+    Movie,
+    MovieComment,
+    TopSnapshotState,
+    collected_deleted_comment,
+    collecting_deleted_comments,
+    comments_created,
+    comments_deleted,
+)
+from .title_index import get_title_index
+
+
+@receiver(pre_save, sender=MovieComment)
+def remember_comment_day(sender, instance, raw=False, **kwargs):
+    # Keeps the stored movie and day of an edited comment, so that its
+    # rollup counter can be moved if either of them changes
+    instance._rollup_previous = MovieComment.objects.select_related(None)\
+        .filter(pk=instance.pk).only('movie_id', 'created_at').first()\
+        if instance.pk and not raw else None
+
+
+@receiver(post_save, sender=MovieComment)
+def count_saved_comment(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+
+    previous = getattr(instance, '_rollup_previous', None)
+
+    if created:
+        rollup.add_comments([instance])
+        Movie.objects.change_comment_counts({instance.movie_id: 1})
+    elif previous and rollup.count_by_day([previous]) \
+            != rollup.count_by_day([instance]):
+        rollup.remove_comments([previous])
+        rollup.add_comments([instance])
+
+        if previous.movie_id != instance.movie_id:
+            Movie.objects.change_comment_counts(
+                {previous.movie_id: -1, instance.movie_id: 1})
+
+
+@receiver(post_delete, sender=MovieComment)
+def count_deleted_comment(sender, instance, **kwargs):
+    # Comments deleted by a queryset are counted at once by
+    # count_deleted_comments, those deleted with their movie need no
+    # counting
+    if not collected_deleted_comment(instance):
+        uncount_comments([instance])
+
+
+@receiver(comments_created)
+def count_created_comments(sender, comments, using=None, **kwargs):
+    rollup.add_comments(comments)
+    Movie.objects.using(using).change_comment_counts(
+        Counter(comment.movie_id for comment in comments))
+
+
+@receiver(comments_deleted)
+def count_deleted_comments(sender, comments, using=None, **kwargs):
+    if comments:
+        uncount_comments(comments)
+        response_cache.bump(
+            response_cache.COMMENTS, response_cache.TOP, using=using)
+
+
+def uncount_comments(comments):
+    rollup.remove_comments(comments)
+    Movie.objects.change_comment_counts({
+        movie_id: -count for movie_id, count
+        in Counter(comment.movie_id for comment in comments).items()})
+
+
+@receiver(post_save, sender=Movie)
+@receiver(post_delete, sender=Movie)
+def mark_ranking_changed(sender, instance, created=True, raw=False,
+                         **kwargs):
+    # New and deleted movies change the ranking, edited ones do not
+    if created and not raw:
+        TopSnapshotState.mark_changed(kwargs.get('using', None))
+
+
+@receiver(post_save, sender=Movie)
+@receiver(post_delete, sender=Movie)
+def invalidate_movie_responses(sender, using=None, **kwargs):
+    response_cache.bump(
+        response_cache.MOVIES, response_cache.COMMENTS, response_cache.TOP,
+        using=using)
+
+
+@receiver(post_save, sender=Movie)
+@receiver(post_delete, sender=Movie)
+def invalidate_title_index(sender, created=False, using=None, **kwargs):
+    # New movies can not change what an indexed title points to, edited
+    # and deleted ones can
+    if not created:
+        get_title_index().invalidate(using)
+
+
+@receiver(post_save, sender=MovieComment)
+@receiver(post_delete, sender=MovieComment)
+def invalidate_comment_responses(sender, using=None, **kwargs):
+    if not collecting_deleted_comments():
+        response_cache.bump(
+            response_cache.COMMENTS, response_cache.TOP, using=using)
+
+
+@receiver(post_migrate)
+def install_search_index(sender, using='default', **kwargs):
+    if sender.label == 'movies_api':
+        search.install(connections[using])
+
+
+@receiver(request_started)
+def check_connections(sender, **kwargs):
+    # Persistent connections (CONN_MAX_AGE) that were idle for a while are
+    # checked before they are reused by a request
+    db_routing.check_connections()
+
+
+@receiver(request_finished)
+def mark_connections_idle(sender, **kwargs):
+    db_routing.mark_connections_idle()
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    sqlite_profile.configure(connection)
+
+
+@receiver(request_finished)
+def optimize_sqlite(sender, **kwargs):
+    sqlite_profile.optimize_connections()
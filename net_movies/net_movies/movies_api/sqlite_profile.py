@@ -0,0 +1,69 @@
+import time
+from django.conf import settings
+from django.db import connections
+
+DEFAULTS = {
+    'ENABLED': False,
+    'JOURNAL_MODE': 'WAL',
+    'SYNCHRONOUS': 'NORMAL',
+    'BUSY_TIMEOUT': 5000,
+    'MMAP_SIZE': 256 * 1024 * 1024,
+    'CACHE_SIZE': -64000,
+    'TEMP_STORE': 'MEMORY',
+    'OPTIMIZE_INTERVAL': 60 * 60,
+}
+
+
+def get_config():
+    return dict(DEFAULTS, **getattr(settings, 'SQLITE_PROFILE', {}))
+
+
+def pragmas(config):
+    # Statements run on every new connection. journal_mode is stored in the
+    # database file, the others only last as long as the connection
+    return [
+        'PRAGMA journal_mode = {0}'.format(config['JOURNAL_MODE']),
+        'PRAGMA synchronous = {0}'.format(config['SYNCHRONOUS']),
+        'PRAGMA busy_timeout = {0:d}'.format(config['BUSY_TIMEOUT']),
+        'PRAGMA mmap_size = {0:d}'.format(config['MMAP_SIZE']),
+        'PRAGMA cache_size = {0:d}'.format(config['CACHE_SIZE']),
+        'PRAGMA temp_store = {0}'.format(config['TEMP_STORE']),
+    ]
+
+
+def configure(connection):
+    # Method that applies the profile to a new SQLite connection. Pragmas
+    # go straight to the driver, so they are not counted as queries of the
+    # request that opened the connection
+    config = get_config()
+
+    if connection.vendor != 'sqlite' or not config['ENABLED']:
+        return
+
+    for statement in pragmas(config):
+        connection.connection.execute(statement).fetchall()
+
+    connection.sqlite_optimized_at = time.monotonic()
+
+
+def optimize_connections():
+    # Method that runs PRAGMA optimize on open SQLite connections of this
+    # thread once per OPTIMIZE_INTERVAL, so that long lived connections
+    # (CONN_MAX_AGE) keep query planner statistics up to date
+    config = get_config()
+
+    if not config['ENABLED']:
+        return
+
+    now = time.monotonic()
+
+    for connection in connections.all():
+        optimized_at = getattr(connection, 'sqlite_optimized_at', None)
+
+        if connection.vendor != 'sqlite' or connection.connection is None \
+                or connection.in_atomic_block or optimized_at is None \
+                or now - optimized_at < config['OPTIMIZE_INTERVAL']:
+            continue
+
+        connection.connection.execute('PRAGMA optimize').fetchall()
+        connection.sqlite_optimized_at = now
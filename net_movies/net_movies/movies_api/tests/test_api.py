@@ -7,6 +7,7 @@ from net_movies.movies_api.utils import (
     movie_as_dict
 )
 from net_movies.movies_api.models import Movie, MovieComment
+from .test_rollup import FIRST_DAY, SECOND_DAY
 
 MOVIES_ENDPOINT_URL = '/movies'
 COMMENTS_ENDPOINT_URL = '/comments'
@@ -345,3 +346,33 @@ class TestTopAPI(TestCase):
         self.assertEquals(len(response.data), 2)
         self.assertEquals(response.data[0]['rank'], 1)
         self.assertEquals(response.data[1]['rank'], 1)
+
+    def test_get_top_movies_in_date_range(self):
+        movies = [
+            Movie.objects.create(title=title, year_of_production=REAL_YEAR)
+            for title in MOVIE_TITLES]
+        for movie, created_at in [
+                (movies[0], FIRST_DAY),
+                (movies[0], FIRST_DAY),
+                (movies[1], SECOND_DAY)]:
+            MovieComment.objects.create(
+                movie=movie,
+                comment_content=TEST_COMMENT_CONTENT,
+                created_at=created_at)
+
+        response = api.get(
+            TOP_ENDPOINT_URL,
+            data={'date_from': '2019-02-02', 'date_to': '2019-02-28'})
+        self.assertEquals(response.status_code, status.HTTP_200_OK)
+        self.assertListEqual(response.data, [
+            {'movie_id': movies[1].id, 'total_comments': 1, 'rank': 1},
+            {'movie_id': movies[0].id, 'total_comments': 0, 'rank': 2}])
+
+    def test_get_top_movies_invalid_date_range(self):
+        for data in [
+                {'date_from': 'yesterday'},
+                {'date_from': '2019-02-30'},
+                {'date_from': '2019-03-01', 'date_to': '2019-02-01'}]:
+            response = api.get(TOP_ENDPOINT_URL, data=data)
+            self.assertEquals(
+                response.status_code, status.HTTP_400_BAD_REQUEST)
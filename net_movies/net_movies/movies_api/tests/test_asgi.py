@@ -0,0 +1,253 @@
+import asyncio
+import json
+import time
+import unittest
+from django.core.cache import cache
+from django.core.wsgi import get_wsgi_application
+from django.test import TransactionTestCase, override_settings
+from .. import omdb
+from ..asgi import MoviesASGIApplication, wsgi_environ
+from ..lookup_cache import get_lookup_cache
+from ..models import Movie
+from ..omdb import OMDbUnavailable
+from ..omdb_async import AsyncOMDbClient, aiohttp, close_async_client
+from ..omdb_stub import OMDbStub
+from .test_api import MOVIE_TITLES, UNKNOWN_TITLE
+
+
+def http_scope(method, path, headers=(), query_string=b''):
+    return {
+        'type': 'http',
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'root_path': '',
+        'query_string': query_string,
+        'headers': [
+            (name.encode(), value.encode()) for name, value in headers],
+        'server': ('testserver', 80),
+        'client': ('127.0.0.1', 50000),
+    }
+
+
+async def call(application, scope, body=b''):
+    # Coroutine that runs one request and returns (status, content)
+    messages = await messages_of(application, scope, body)
+
+    return messages[0]['status'], b''.join(
+        message.get('body', b'') for message in messages[1:])
+
+
+async def messages_of(application, scope, body=b''):
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    await application(scope, receive, send)
+
+    return messages
+
+
+def post_movie(application, title, headers=(), call=call):
+    return call(
+        application,
+        http_scope(
+            'POST', '/movies',
+            [('content-type', 'application/json')] + list(headers)),
+        json.dumps({'title': title}).encode())
+
+
+class TestWSGIEnviron(unittest.TestCase):
+    def test_environ(self):
+        environ = wsgi_environ(
+            http_scope(
+                'GET', '/movies',
+                [('content-type', 'text/plain'), ('x-forwarded-for', 'a'),
+                 ('x-forwarded-for', 'b')],
+                b'year=2009'),
+            b'body')
+
+        self.assertEqual(environ['PATH_INFO'], '/movies')
+        self.assertEqual(environ['QUERY_STRING'], 'year=2009')
+        self.assertEqual(environ['CONTENT_TYPE'], 'text/plain')
+        self.assertEqual(environ['CONTENT_LENGTH'], '4')
+        self.assertEqual(environ['HTTP_X_FORWARDED_FOR'], 'a,b')
+        self.assertEqual(environ['wsgi.input'].read(), b'body')
+
+
+@unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+class TestASGIApplication(TransactionTestCase):
+    stub_options = {}
+
+    def setUp(self):
+        cache.clear()
+        get_lookup_cache().clear()
+        self.stub = OMDbStub(**self.stub_options).start()
+        self.addCleanup(self.stub.stop)
+
+        settings = override_settings(
+            OMDB_CLIENT={'URL': self.stub.url, 'BACKOFF': 0.01},
+            # The in-memory test database locks whole tables, so writes
+            # of concurrent requests would fail instead of waiting
+            ASGI={'WSGI_THREADS': 1})
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.application = MoviesASGIApplication(get_wsgi_application())
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+        self.addCleanup(
+            self.loop.run_until_complete, close_async_client())
+
+    def run_async(self, coroutine):
+        asyncio.set_event_loop(self.loop)
+        return self.loop.run_until_complete(coroutine)
+
+    def test_post_movie(self):
+        status, content = self.run_async(
+            post_movie(self.application, MOVIE_TITLES[0]))
+
+        self.assertEqual(status, 201)
+        self.assertEqual(json.loads(content.decode())['Title'], 'Avatar')
+        self.assertEqual(Movie.objects.get().omdb_data['Genre'],
+                         'Action, Adventure, Fantasy')
+
+    def test_post_form_encoded_movie(self):
+        status, _ = self.run_async(call(
+            self.application,
+            http_scope(
+                'POST', '/movies',
+                [('content-type', 'application/x-www-form-urlencoded')]),
+            b'title=Karate+Kids'))
+
+        self.assertEqual(status, 201)
+        self.assertEqual(Movie.objects.get().title, 'Karate Kids')
+
+    def test_post_unknown_movie(self):
+        status, content = self.run_async(
+            post_movie(self.application, UNKNOWN_TITLE))
+
+        self.assertEqual(status, 400)
+        self.assertEqual(json.loads(content.decode()), 'Movie not found')
+
+    def test_omdb_unavailable(self):
+        self.stub.fail_next(10)
+        status, _ = self.run_async(
+            post_movie(self.application, MOVIE_TITLES[0]))
+
+        self.assertEqual(status, 503)
+        self.assertFalse(Movie.objects.exists())
+        # The view answers from the failed lookup instead of a second one
+        self.assertEqual(self.stub.requests, omdb.DEFAULTS['RETRIES'] + 1)
+
+    def test_post_movie_runs_middleware(self):
+        messages = self.run_async(post_movie(
+            self.application, MOVIE_TITLES[0], call=messages_of))
+
+        self.assertEqual(messages[0]['status'], 201)
+        self.assertIn(b'server-timing', dict(messages[0]['headers']))
+
+    @override_settings(ALLOWED_HOSTS=['testserver'])
+    def test_post_movie_checks_host(self):
+        status, _ = self.run_async(post_movie(
+            self.application, MOVIE_TITLES[0], [('host', 'evil.example')]))
+
+        self.assertEqual(status, 400)
+        self.assertFalse(Movie.objects.exists())
+
+    def test_post_stored_movie(self):
+        self.run_async(post_movie(self.application, MOVIE_TITLES[0]))
+        status, content = self.run_async(post_movie(
+            self.application, MOVIE_TITLES[0], [('accept', 'text/html')]))
+
+        self.assertEqual(status, 201)
+        self.assertIn(b'Action, Adventure, Fantasy', content)
+        self.assertEqual(Movie.objects.count(), 1)
+
+    def test_other_requests_run_wsgi_application(self):
+        self.run_async(post_movie(self.application, MOVIE_TITLES[0]))
+        status, content = self.run_async(call(
+            self.application,
+            http_scope('GET', '/movies', query_string=b'year=2009')))
+
+        self.assertEqual(status, 200)
+        self.assertEqual(
+            [movie['title'] for movie in json.loads(content.decode())],
+            ['Avatar'])
+
+    def test_lookups_run_concurrently(self):
+        self.stub.generate = True
+        self.stub.delay = 0.2
+        titles = ['Movie {0}'.format(i) for i in range(50)]
+
+        async def post_all():
+            return await asyncio.gather(*(
+                post_movie(self.application, title) for title in titles))
+
+        start = time.perf_counter()
+        responses = self.run_async(post_all())
+
+        self.assertLess(time.perf_counter() - start, 5)
+        self.assertEqual([status for status, _ in responses], [201] * 50)
+        self.assertEqual(Movie.objects.count(), 50)
+
+    def test_concurrent_posts_of_one_title_query_omdb_once(self):
+        self.stub.delay = 0.2
+
+        async def post_all():
+            return await asyncio.gather(*(
+                post_movie(self.application, title)
+                for title in [MOVIE_TITLES[0], MOVIE_TITLES[0].upper()] * 10))
+
+        responses = self.run_async(post_all())
+
+        self.assertEqual([status for status, _ in responses], [201] * 20)
+        self.assertEqual(self.stub.requests, 1)
+        self.assertEqual(Movie.objects.count(), 1)
+
+
+@unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+class TestAsyncOMDbClient(unittest.TestCase):
+    def setUp(self):
+        self.stub = OMDbStub().start()
+        self.addCleanup(self.stub.stop)
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def fetch(self, title, **options):
+        async def fetch():
+            client = AsyncOMDbClient(
+                self.stub.url, 'test', BACKOFF=0.01, **options)
+
+            try:
+                return await client.fetch(title), client.stats()
+            finally:
+                await client.close()
+
+        return self.loop.run_until_complete(fetch())
+
+    def test_fetch(self):
+        data, _ = self.fetch(MOVIE_TITLES[0])
+        self.assertEqual(data['Title'], 'Avatar')
+
+    def test_fetch_unknown_title(self):
+        data, _ = self.fetch(UNKNOWN_TITLE)
+        self.assertIsNone(data)
+
+    def test_retries_server_errors(self):
+        self.stub.fail_next(2)
+        data, stats = self.fetch(MOVIE_TITLES[0], RETRIES=2)
+
+        self.assertEqual(data['Title'], 'Avatar')
+        self.assertEqual(stats['retries'], 2)
+
+    def test_gives_up(self):
+        self.stub.fail_next(3)
+
+        with self.assertRaises(OMDbUnavailable):
+            self.fetch(MOVIE_TITLES[0], RETRIES=1)
@@ -0,0 +1,66 @@
+import json
+import os
+import tempfile
+from django.test import TestCase
+from ..benchmarks import data, report
+from ..benchmarks.base import latency_stats, percentile, rolled_back
+from ..models import Movie, MovieComment, MovieCommentDailyCount
+
+
+class TestSyntheticData(TestCase):
+    def test_seed_is_skewed_and_reproducible(self):
+        with rolled_back():
+            data.seed(50, 1000)
+            first = sorted(
+                Movie.objects.values_list('comment_count', flat=True))
+
+        ids = data.seed(50, 1000)
+        counts = dict(Movie.objects.values_list('id', 'comment_count'))
+
+        self.assertEqual(sorted(counts.values()), first)
+        self.assertEqual(MovieComment.objects.count(), 1000)
+        self.assertEqual(max(counts.values()), counts[ids[0]])
+        self.assertGreater(counts[ids[0]], 10 * counts[ids[-1]] + 10)
+        self.assertEqual(
+            sum(MovieCommentDailyCount.objects
+                .values_list('comment_count', flat=True)),
+            1000)
+        self.assertIsNotNone(Movie.objects.get(id=ids[0]).omdb_data)
+
+
+class TestLatencyStats(TestCase):
+    def test_percentile(self):
+        values = list(range(1, 101))
+
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([3], 90), 3)
+
+    def test_latency_stats(self):
+        stats = latency_stats(
+            lambda i: 500 if i == 1 else Movie.objects.count() and 200, 4)
+
+        self.assertEqual(stats['errors'], 1)
+        self.assertEqual(stats['queries'], 0.8)
+        self.assertGreater(stats['peak_kb'], 0)
+
+
+class TestReport(TestCase):
+    def test_save_and_compare(self):
+        previous = {'top': [
+            {'movies': 10, 'seconds': 1.0, 'queries': 1},
+            {'movies': 100, 'seconds': 2.0, 'queries': 1}]}
+        current = {'top': [
+            {'movies': 10, 'seconds': 1.05, 'queries': 1},
+            {'movies': 100, 'seconds': 3.0, 'queries': 1},
+            {'movies': 1000, 'seconds': 9.0, 'queries': 1}]}
+        path = os.path.join(tempfile.mkdtemp(), 'results.json')
+        self.addCleanup(os.remove, path)
+
+        report.save(path, previous)
+
+        with open(path) as saved:
+            self.assertIn('commit', json.load(saved))
+        self.assertEqual(
+            list(report.compare(report.load(path), current)),
+            [('top', (('movies', 100),), 'seconds', 2.0, 3.0, 50.0)])
@@ -0,0 +1,112 @@
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+from ..models import Movie, MovieComment
+from .test_api import COMMENTS_ENDPOINT_URL, MOVIES_ENDPOINT_URL, \
+    TOP_ENDPOINT_URL
+
+api = APIClient()
+
+
+def comment_counts():
+    return dict(Movie.objects.values_list('title', 'comment_count'))
+
+
+class TestCommentCount(TestCase):
+    def setUp(self):
+        self.avatar = Movie.objects.create(
+            title='Avatar', year_of_production=2009)
+        self.karate = Movie.objects.create(
+            title='Karate Kids', year_of_production=1990)
+
+    def comment(self, movie, count=1):
+        MovieComment.objects.bulk_create(
+            MovieComment(movie=movie, comment_content='test')
+            for _ in range(count))
+
+    def test_created_comments_are_counted(self):
+        MovieComment.objects.create(movie=self.avatar, comment_content='a')
+        api.post(
+            COMMENTS_ENDPOINT_URL,
+            {'movie': 'karate kids', 'comment_content': 'b'})
+        self.comment(self.karate, 2)
+
+        self.assertEqual(comment_counts(), {'Avatar': 1, 'Karate Kids': 3})
+
+    def test_deleted_comments_are_uncounted(self):
+        self.comment(self.avatar, 3)
+        self.comment(self.karate, 2)
+
+        MovieComment.objects.filter(movie=self.avatar).first().delete()
+        MovieComment.objects.filter(movie=self.karate).delete()
+
+        self.assertEqual(comment_counts(), {'Avatar': 2, 'Karate Kids': 0})
+
+    def test_moved_comment_changes_both_counters(self):
+        self.comment(self.avatar, 2)
+        comment = MovieComment.objects.first()
+        comment.movie = self.karate
+        comment.save()
+
+        self.assertEqual(comment_counts(), {'Avatar': 1, 'Karate Kids': 1})
+
+    def test_cascade_delete(self):
+        self.comment(self.avatar, 2)
+        self.avatar.delete()
+
+        self.assertEqual(comment_counts(), {'Karate Kids': 0})
+
+    def test_reconcile_fixes_drift(self):
+        self.comment(self.avatar, 3)
+        Movie.objects.update(comment_count=7)
+        out = StringIO()
+
+        call_command('reconcile_comment_counts', stdout=out)
+
+        self.assertIn('2 movies fixed', out.getvalue())
+        self.assertEqual(comment_counts(), {'Avatar': 3, 'Karate Kids': 0})
+        self.assertEqual(Movie.objects.reconcile_comment_counts(), 0)
+
+
+class TestCommentCountAPI(TestCase):
+    def setUp(self):
+        for title, comments in [('A', 1), ('B', 3), ('C', 0)]:
+            movie = Movie.objects.create(title=title, year_of_production=2000)
+            MovieComment.objects.bulk_create(
+                MovieComment(movie=movie, comment_content='test')
+                for _ in range(comments))
+
+    def test_movies_ordered_by_comments(self):
+        response = api.get(MOVIES_ENDPOINT_URL, {'ordering': '-comments'})
+
+        self.assertEqual(
+            [(movie['title'], movie['comment_count'])
+             for movie in response.data],
+            [('B', 3), ('A', 1), ('C', 0)])
+
+    def test_paginated_movies_ordered_by_comments(self):
+        first = api.get(
+            MOVIES_ENDPOINT_URL, {'ordering': 'comments', 'page_size': 2})
+        second = api.get(first['Link'][1:first['Link'].index('>')])
+
+        self.assertEqual(
+            [movie['title'] for movie in first.data + second.data],
+            ['C', 'A', 'B'])
+
+    def test_invalid_ordering(self):
+        response = api.get(MOVIES_ENDPOINT_URL, {'ordering': 'votes'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_top_does_not_aggregate_comments(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = api.get(TOP_ENDPOINT_URL)
+
+        self.assertEqual(
+            [row['total_comments'] for row in response.data], [3, 1, 0])
+        self.assertFalse(any(
+            MovieComment._meta.db_table in query['sql']
+            for query in queries))
@@ -0,0 +1,185 @@
+import json
+from datetime import date
+from types import SimpleNamespace
+from unittest import mock
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from .. import comment_importer
+from ..comment_importer import (
+    REQUIRED,
+    UnknownIds,
+    assign_ids,
+    import_comments,
+)
+from ..models import Movie, MovieComment
+from .test_api import COMMENTS_ENDPOINT_URL
+from .test_rollup import daily_counts
+
+api = APIClient()
+
+
+def ndjson(items):
+    return '\n'.join(json.dumps(item) for item in items)
+
+
+class TestCommentImporter(TestCase):
+    def setUp(self):
+        self.avatar = Movie.objects.create(
+            title='Avatar', year_of_production=2009)
+        self.karate = Movie.objects.create(
+            title='Karate Kids', year_of_production=1990)
+
+    def test_import_reports_every_item(self):
+        report = import_comments([
+            {'movie': self.avatar.id, 'comment_content': 'by id'},
+            {'movie': str(self.karate.id), 'comment_content': 'by digits'},
+            {'movie': ' karate KIDS', 'comment_content': 'by title'},
+            {'movie': 'Unknown', 'comment_content': 'lost'},
+            {'movie': self.avatar.id},
+            'not an object',
+        ])
+        comments = list(MovieComment.objects.order_by('id'))
+
+        self.assertEqual(report[:3], [
+            {'id': comment.id,
+             'movie': comment.movie_id,
+             'comment_content': comment.comment_content}
+            for comment in comments])
+        self.assertEqual(
+            [comment.movie_id for comment in comments],
+            [self.avatar.id, self.karate.id, self.karate.id])
+        self.assertEqual(list(report[3]), ['errors'])
+        self.assertEqual(
+            report[4], {'errors': {'comment_content': [REQUIRED]}})
+        self.assertIn('non_field_errors', report[5]['errors'])
+
+    def test_unusable_movie_ids_are_reported(self):
+        report = import_comments([
+            {'movie': movie, 'comment_content': 'lost'}
+            for movie in ['\u00b2', 10 ** 30, '9' * 30, 0, -1, 2.0]]
+            + [{'movie': self.avatar.id, 'comment_content': 'kept'}])
+
+        self.assertEqual(
+            [list(result) for result in report], [['errors']] * 6 + [
+                ['id', 'movie', 'comment_content']])
+        self.assertEqual(
+            list(MovieComment.objects.values_list(
+                'comment_content', flat=True)),
+            ['kept'])
+
+    def test_ids_of_bulk_inserted_comments(self):
+        # SQLite returns no ids, they are read back as the newest rows
+        MovieComment.objects.create(
+            movie=self.karate, comment_content='earlier')
+        report = import_comments([
+            {'movie': self.avatar.id, 'comment_content': str(i)}
+            for i in range(5)])
+
+        self.assertEqual(
+            [MovieComment.objects.get(id=result['id']).comment_content
+             for result in report],
+            [str(i) for i in range(5)])
+
+    def test_ids_are_checked_against_inserted_comments(self):
+        comments = [
+            MovieComment(movie=self.avatar, comment_content=str(i))
+            for i in range(3)]
+        MovieComment.objects.bulk_create(comments)
+        MovieComment.objects.create(
+            movie=self.karate, comment_content='later')
+
+        with self.assertRaises(UnknownIds):
+            assign_ids(comments)
+
+        self.assertIsNone(comments[0].pk)
+
+    def test_ids_are_read_back_on_sqlite_only(self):
+        comment = MovieComment(movie=self.avatar, comment_content='x')
+
+        with mock.patch.object(comment_importer, 'connections', {
+                'default': SimpleNamespace(vendor='postgresql')}):
+            with self.assertNumQueries(0):
+                assign_ids([comment])
+
+        self.assertIsNone(comment.pk)
+
+    def test_import_updates_rollup(self):
+        import_comments([
+            {'movie': self.avatar.id, 'comment_content': 'first'},
+            {'movie': self.avatar.id, 'comment_content': 'second'},
+            {'movie': self.karate.id, 'comment_content': 'third'}])
+        today = timezone.localdate()
+
+        self.assertEqual(daily_counts(), {
+            (self.avatar.id, today): 2, (self.karate.id, today): 1})
+        self.assertIsInstance(today, date)
+
+    def test_queries_do_not_grow_with_items(self):
+        items = [
+            {'movie': movie, 'comment_content': str(i)}
+            for i in range(200)
+            for movie in (self.avatar.id, 'Karate Kids')]
+
+        with CaptureQueriesContext(connection) as queries:
+            import_comments(items, batch_size=100)
+
+        self.assertEqual(MovieComment.objects.count(), 400)
+        self.assertLessEqual(len(queries), 14)
+
+
+class TestBulkCommentsAPI(TestCase):
+    def setUp(self):
+        self.movie = Movie.objects.create(
+            title='Avatar', year_of_production=2009)
+
+    def test_post_json_array(self):
+        response = api.post(
+            COMMENTS_ENDPOINT_URL,
+            [{'movie': self.movie.id, 'comment_content': 'first'},
+             {'movie': 'avatar', 'comment_content': 'second'}],
+            format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [comment['comment_content'] for comment in response.data],
+            ['first', 'second'])
+        self.assertEqual(MovieComment.objects.count(), 2)
+
+    def test_post_ndjson(self):
+        response = api.post(
+            COMMENTS_ENDPOINT_URL,
+            ndjson([{'movie': self.movie.id, 'comment_content': 'first'},
+                    {'movie': 0, 'comment_content': 'lost'}]) + '\n\n',
+            content_type='application/x-ndjson')
+
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(response.data[0]['id'], MovieComment.objects.get().id)
+        self.assertIn('errors', response.data[1])
+
+    def test_post_malformed_ndjson(self):
+        response = api.post(
+            COMMENTS_ENDPOINT_URL,
+            '{"movie": 1, "comment_content": "ok"}\n{"movie": ',
+            content_type='application/x-ndjson')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('line 2', response.data['detail'])
+        self.assertFalse(MovieComment.objects.exists())
+
+    def test_post_only_invalid_items(self):
+        response = api.post(
+            COMMENTS_ENDPOINT_URL, [{'movie': 'unknown'}], format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(MovieComment.objects.exists())
+
+    @override_settings(BULK_COMMENTS={'MAX_ITEMS': 2})
+    def test_post_too_many_or_no_items(self):
+        for items in ([], [{'movie': self.movie.id}] * 3):
+            response = api.post(COMMENTS_ENDPOINT_URL, items, format='json')
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST)
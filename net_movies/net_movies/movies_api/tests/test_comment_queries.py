@@ -0,0 +1,100 @@
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from .. import rollup
+from ..models import Movie, MovieComment, MovieCommentDailyCount
+from .test_api import COMMENTS_ENDPOINT_URL, MOVIES_ENDPOINT_URL
+
+COMMENTS = 10000
+MOVIES = 10
+
+api = APIClient()
+
+
+def daily_total(movie):
+    return sum(MovieCommentDailyCount.objects.filter(movie=movie)
+               .values_list('comment_count', flat=True))
+
+
+class TestCommentQueries(TestCase):
+    # Query counts of paths listing, printing and deleting many comments
+    # must not grow with the number of comments
+    @classmethod
+    def setUpTestData(cls):
+        cls.movies = [
+            Movie.objects.create(
+                title='Movie {0}'.format(i), year_of_production=2000 + i)
+            for i in range(MOVIES)]
+        now = timezone.now()
+        MovieComment.objects.bulk_create(
+            MovieComment(
+                movie=cls.movies[i % MOVIES], comment_content=str(i),
+                created_at=now - timedelta(days=i % 30))
+            for i in range(COMMENTS))
+        rollup.rebuild()
+
+    def test_list_endpoint(self):
+        with self.assertNumQueries(1):
+            response = api.get(COMMENTS_ENDPOINT_URL)
+
+        self.assertEqual(len(response.json()), COMMENTS)
+
+    def test_printing_comments(self):
+        with self.assertNumQueries(1):
+            labels = [str(comment) for comment in MovieComment.objects.all()]
+
+        self.assertEqual(len(labels), COMMENTS)
+        self.assertEqual(labels[0], 'MovieComment (Movie 0): 0')
+
+        with self.assertNumQueries(1):
+            labels = [repr(comment)
+                      for comment in MovieComment.objects.for_display()]
+
+        self.assertEqual(len(labels), COMMENTS)
+
+    def test_printing_without_movie(self):
+        comment = MovieComment._base_manager.get(comment_content='1')
+
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                str(comment),
+                'MovieComment (movie {0}): 1'.format(self.movies[1].id))
+
+    def test_admin_changelist(self):
+        self.client.force_login(User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'))
+
+        # Session, user, the page of comments and its count
+        with self.assertNumQueries(4):
+            response = self.client.get(
+                '/admin/movies_api/moviecomment/')
+
+        self.assertContains(response, 'Movie 0')
+
+    def test_delete_movie(self):
+        # Lookup, comments, five related tables, one DELETE per 1000
+        # comments, the movie and the ranking state. Comments are not
+        # counted one by one
+        with self.assertNumQueries(19):
+            response = api.delete(
+                MOVIES_ENDPOINT_URL, {'title': 'Movie 0'}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            MovieComment.objects.count(), COMMENTS - COMMENTS // MOVIES)
+
+    def test_delete_comments(self):
+        movie = self.movies[3]
+
+        # Collecting, one DELETE, the daily counters, their movie counter,
+        # the ranking state and savepoints
+        with self.assertNumQueries(9):
+            MovieComment.objects.filter(movie=movie, id__gt=5000).delete()
+
+        movie.refresh_from_db()
+        remaining = MovieComment.objects.filter(movie=movie).count()
+        self.assertLess(remaining, COMMENTS // MOVIES)
+        self.assertEqual(movie.comment_count, remaining)
+        self.assertEqual(daily_total(movie), remaining)
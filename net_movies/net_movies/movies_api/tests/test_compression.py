@@ -0,0 +1,107 @@
+import gzip
+import json
+import unittest
+from unittest import mock
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from .. import compression
+from ..compression import accepted_encodings, negotiate
+from ..models import Movie
+from .test_api import MOVIES_ENDPOINT_URL
+
+api = APIClient()
+
+
+class Request(object):
+    def __init__(self, accept_encoding):
+        self.META = {'HTTP_ACCEPT_ENCODING': accept_encoding}
+
+
+class TestNegotiation(TestCase):
+    def test_accepted_encodings(self):
+        self.assertEqual(
+            accepted_encodings('gzip;q=0.5, br , identity;q=x'),
+            {'gzip': 0.5, 'br': 1.0, 'identity': 0.0})
+
+    def test_negotiate(self):
+        with mock.patch.object(compression, 'brotli', object()):
+            self.assertEqual(negotiate(Request('gzip, br')), 'br')
+            self.assertEqual(negotiate(Request('gzip, br;q=0.1')), 'gzip')
+            self.assertEqual(negotiate(Request('*')), 'br')
+
+        with mock.patch.object(compression, 'brotli', None):
+            self.assertEqual(negotiate(Request('br, gzip;q=0.1')), 'gzip')
+            self.assertIsNone(negotiate(Request('br')))
+
+        self.assertIsNone(negotiate(Request('gzip;q=0, *')))
+        self.assertIsNone(negotiate(Request('')))
+
+
+@override_settings(COMPRESSION={'MIN_SIZE': 1024})
+class TestCompressionMiddleware(TestCase):
+    def setUp(self):
+        cache.clear()
+        Movie.objects.bulk_create(
+            Movie(title='Movie {0}'.format(i), year_of_production=2000)
+            for i in range(100))
+
+    def test_large_responses_are_gzipped(self):
+        plain = api.get(MOVIES_ENDPOINT_URL)
+        response = api.get(MOVIES_ENDPOINT_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertEqual(
+            int(response['Content-Length']), len(response.content))
+        self.assertLess(len(response.content), len(plain.content) / 4)
+
+    def test_small_responses_are_not_compressed(self):
+        response = api.get(
+            MOVIES_ENDPOINT_URL, {'page_size': 2},
+            HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_streamed_responses_are_gzipped(self):
+        response = api.get(
+            MOVIES_ENDPOINT_URL, {'stream': 'ndjson'},
+            HTTP_ACCEPT_ENCODING='gzip')
+        lines = gzip.decompress(
+            b''.join(response.streaming_content)).splitlines()
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(len(lines), 100)
+        self.assertEqual(json.loads(lines[0])['title'], 'Movie 0')
+
+    @override_settings(RESPONSE_CACHE={'ENABLED': True})
+    def test_cached_responses_keep_conditional_requests(self):
+        response = api.get(MOVIES_ENDPOINT_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertTrue(response['ETag'].startswith('W/"'))
+        self.assertEqual(
+            api.get(MOVIES_ENDPOINT_URL, HTTP_ACCEPT_ENCODING='gzip',
+                    HTTP_IF_NONE_MATCH=response['ETag']).status_code,
+            304)
+
+    @override_settings(COMPRESSION={'ENABLED': False})
+    def test_disabled(self):
+        response = api.get(MOVIES_ENDPOINT_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+
+@unittest.skipIf(compression.brotli is None, 'brotli is not installed')
+class TestBrotli(TestCase):
+    def test_brotli_is_preferred(self):
+        Movie.objects.bulk_create(
+            Movie(title='Movie {0}'.format(i), year_of_production=2000)
+            for i in range(100))
+        plain = api.get(MOVIES_ENDPOINT_URL)
+        response = api.get(
+            MOVIES_ENDPOINT_URL, HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(
+            compression.brotli.decompress(response.content), plain.content)
@@ -0,0 +1,178 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from unittest import mock
+from django.db import connections, router
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+from .. import db_routing
+from ..models import Movie, MovieComment
+from .test_api import COMMENTS_ENDPOINT_URL, MOVIES_ENDPOINT_URL, \
+    TOP_ENDPOINT_URL
+
+REPLICA = 'replica'
+
+
+def titles(response):
+    return [movie['title'] for movie in response.json()]
+
+
+@override_settings(DATABASE_ROUTING={'REPLICAS': [REPLICA]})
+class TestReplicaRouting(TestCase):
+    # A second SQLite database stands in for a replica. It is not
+    # replicated, so rows show where reads were served from
+    multi_db = True
+
+    @classmethod
+    def setUpClass(cls):
+        # The replica starts as a copy of the migrated primary
+        cls.directory = tempfile.mkdtemp()
+        path = os.path.join(cls.directory, 'replica.sqlite3')
+        primary = connections['default']
+        primary.ensure_connection()
+
+        with sqlite3.connect(path) as replica:
+            primary.connection.backup(replica)
+
+        connections.databases[REPLICA] = dict(
+            connections.databases['default'], NAME=path, TEST={})
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA].close()
+        del connections.databases[REPLICA]
+        delattr(connections._connections, REPLICA)
+        shutil.rmtree(cls.directory)
+
+    def setUp(self):
+        self.api = APIClient()
+        self.primary_movie = Movie.objects.create(
+            title='Avatar', year_of_production=2009)
+        Movie.objects.using(REPLICA).create(
+            title='Karate Kids', year_of_production=1990)
+
+    def test_reads_go_to_replica(self):
+        self.assertEqual(
+            titles(self.api.get(MOVIES_ENDPOINT_URL)), ['Karate Kids'])
+
+    def test_writes_go_to_primary(self):
+        response = self.api.post(
+            COMMENTS_ENDPOINT_URL,
+            {'movie': str(self.primary_movie.id), 'comment_content': 'a'})
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(MovieComment.objects.count(), 1)
+        self.assertEqual(MovieComment.objects.using(REPLICA).count(), 0)
+        self.assertIn('primary_until', response.cookies)
+
+    def test_client_sticks_to_primary_after_write(self):
+        self.api.post(
+            COMMENTS_ENDPOINT_URL,
+            {'movie': str(self.primary_movie.id), 'comment_content': 'a'})
+
+        self.assertEqual(len(self.api.get(COMMENTS_ENDPOINT_URL).json()), 1)
+        self.assertEqual(len(APIClient().get(COMMENTS_ENDPOINT_URL).json()), 0)
+
+    def test_streams_read_from_replica(self):
+        response = self.api.get(MOVIES_ENDPOINT_URL, {'stream': 'ndjson'})
+
+        self.assertIn(
+            b'Karate Kids', b''.join(response.streaming_content))
+
+    @override_settings(RESPONSE_CACHE={'ENABLED': True})
+    def test_pinned_client_bypasses_response_cache(self):
+        self.assertEqual(
+            titles(APIClient().get(MOVIES_ENDPOINT_URL)), ['Karate Kids'])
+
+        self.api.cookies['primary_until'] = str(time.time() + 5)
+
+        self.assertEqual(
+            titles(self.api.get(MOVIES_ENDPOINT_URL)), ['Avatar'])
+        self.assertEqual(
+            titles(APIClient().get(MOVIES_ENDPOINT_URL)), ['Karate Kids'])
+
+    def test_pin_expires(self):
+        self.api.cookies['primary_until'] = str(time.time() - 1)
+
+        self.assertEqual(
+            titles(self.api.get(MOVIES_ENDPOINT_URL)), ['Karate Kids'])
+
+    def test_failed_write_does_not_pin(self):
+        response = self.api.post(COMMENTS_ENDPOINT_URL, {'movie': ''})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn('primary_until', response.cookies)
+
+    def test_refreshed_top_is_read_from_primary(self):
+        response = self.api.get(TOP_ENDPOINT_URL)
+
+        self.assertEqual(
+            [row['movie_id'] for row in response.json()],
+            [self.primary_movie.id])
+
+    def test_migrations_skip_replicas(self):
+        self.assertTrue(router.allow_migrate('default', 'movies_api'))
+        self.assertFalse(router.allow_migrate(REPLICA, 'movies_api'))
+
+    @override_settings(DATABASE_ROUTING={'REPLICAS': []})
+    def test_without_replicas(self):
+        response = self.api.post(
+            COMMENTS_ENDPOINT_URL,
+            {'movie': str(self.primary_movie.id), 'comment_content': 'a'})
+
+        self.assertNotIn('primary_until', response.cookies)
+        self.assertEqual(
+            titles(self.api.get(MOVIES_ENDPOINT_URL)), ['Avatar'])
+
+
+class TestHealthChecks(SimpleTestCase):
+    def setUp(self):
+        db_routing._local.idle_since = {}
+
+    def connection(self, usable, alias='default'):
+        return mock.Mock(
+            alias=alias, connection=object(), in_atomic_block=False,
+            is_usable=mock.Mock(return_value=usable))
+
+    def test_dropped_connections_are_closed(self):
+        dropped, alive = self.connection(False), self.connection(True)
+
+        with mock.patch.object(db_routing, 'connections') as handler:
+            handler.all.return_value = [dropped, alive]
+            db_routing.check_connections()
+
+        dropped.close.assert_called_once_with()
+        alive.close.assert_not_called()
+
+    def test_recently_used_connections_are_not_checked(self):
+        used, idle = self.connection(False), self.connection(False, 'idle')
+
+        with mock.patch.object(db_routing, 'connections') as handler:
+            handler.all.return_value = [used]
+            db_routing.mark_connections_idle()
+            handler.all.return_value = [used, idle]
+            db_routing.check_connections()
+
+        used.is_usable.assert_not_called()
+        idle.close.assert_called_once_with()
+
+        with mock.patch.object(db_routing, 'connections') as handler, \
+                self.settings(DATABASE_ROUTING={'HEALTH_CHECK_IDLE': 0}):
+            handler.all.return_value = [used]
+            db_routing.check_connections()
+
+        used.close.assert_called_once_with()
+
+    @override_settings(DATABASE_ROUTING={'HEALTH_CHECKS': False})
+    def test_disabled(self):
+        dropped = self.connection(False)
+
+        with mock.patch.object(db_routing, 'connections') as handler:
+            handler.all.return_value = [dropped]
+            db_routing.check_connections()
+
+        dropped.is_usable.assert_not_called()
@@ -0,0 +1,187 @@
+import unittest
+from django.db import connection
+from django.http import QueryDict
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+from ..filters import filter_movies
+from ..models import Movie, MovieGenre
+from ..pagination import keyset_filter, segments
+from ..views import MOVIE_ORDERINGS
+from .test_api import MOVIES_ENDPOINT_URL
+
+api = APIClient()
+
+MOVIES = [
+    ('Avatar', 2009, 'Action, Adventure, Fantasy', '7.8', 'movie'),
+    ('Alien', 1979, 'Horror, Sci-Fi', '8.5', 'movie'),
+    ('Friends', 1994, 'Comedy, Romance', '8.9', 'series'),
+    ('Karate Kids', 1990, 'Animation, Short', 'N/A', 'movie'),
+]
+
+# GET /movies filters checked against every ordering
+FILTERS = [
+    '', 'type=movie', 'year=1990', 'genre=drama', 'year_from=1990',
+    'year_from=1990&year_to=2000', 'rating_from=7', 'rating_to=5',
+    'type=movie&year_from=1990', 'type=series&rating_to=5',
+    'type=movie&genre=drama', 'year_from=1990&rating_from=7',
+]
+
+
+def titles(response):
+    return [movie['title'] for movie in response.data]
+
+
+def create_movie(title, year, genre, rating, kind):
+    movie = Movie(title=title, year_of_production=year)
+    movie.omdb_data = {
+        'Title': title, 'Genre': genre, 'imdbRating': rating, 'Type': kind}
+    movie.save()
+    return movie
+
+
+class TestMovieFilters(TestCase):
+    def setUp(self):
+        for movie in MOVIES:
+            create_movie(*movie)
+
+    def test_year_range(self):
+        response = api.get(
+            MOVIES_ENDPOINT_URL, {'year_from': 1980, 'year_to': 2000})
+
+        self.assertEqual(titles(response), ['Friends', 'Karate Kids'])
+
+    def test_rating_range(self):
+        response = api.get(MOVIES_ENDPOINT_URL, {'rating_from': '8'})
+
+        self.assertEqual(titles(response), ['Alien', 'Friends'])
+
+    def test_genre_and_type(self):
+        self.assertEqual(
+            titles(api.get(MOVIES_ENDPOINT_URL, {'genre': ' sci-fi'})),
+            ['Alien'])
+        self.assertEqual(
+            titles(api.get(MOVIES_ENDPOINT_URL, {'type': 'Series'})),
+            ['Friends'])
+        self.assertEqual(
+            titles(api.get(
+                MOVIES_ENDPOINT_URL, {'type': 'movie', 'genre': 'comedy'})),
+            [])
+
+    def test_invalid_filters(self):
+        for params in [
+                {'year_from': 'x'}, {'year_from': 2000, 'year_to': 1990},
+                {'rating_to': 11}, {'rating_from': 'nan'},
+                {'genre': 'Comedy, Drama'}]:
+            response = api.get(MOVIES_ENDPOINT_URL, params)
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+    def test_orderings(self):
+        self.assertEqual(
+            titles(api.get(MOVIES_ENDPOINT_URL, {'ordering': 'title'})),
+            ['Alien', 'Avatar', 'Friends', 'Karate Kids'])
+        self.assertEqual(
+            titles(api.get(MOVIES_ENDPOINT_URL, {'ordering': '-year'})),
+            ['Avatar', 'Friends', 'Karate Kids', 'Alien'])
+
+    def test_rating_orderings_put_unrated_movies_last(self):
+        create_movie('Up', 2009, 'Animation', 'N/A', 'movie')
+
+        # Unrated movies follow the id ordering of the rating ordering
+        for ordering, expected in [
+                ('-rating', ['Friends', 'Alien', 'Avatar', 'Up',
+                             'Karate Kids']),
+                ('rating', ['Avatar', 'Alien', 'Friends', 'Karate Kids',
+                            'Up'])]:
+            self.assertEqual(
+                titles(api.get(MOVIES_ENDPOINT_URL, {'ordering': ordering})),
+                expected)
+            self.assertEqual(b''.join(api.get(
+                MOVIES_ENDPOINT_URL,
+                {'ordering': ordering, 'stream': 'ndjson'})
+                .streaming_content).count(b'\n'), 5)
+
+            for size in [1, 2, 3]:
+                rows, response = [], api.get(
+                    MOVIES_ENDPOINT_URL,
+                    {'ordering': ordering, 'page_size': size})
+
+                while True:
+                    rows += titles(response)
+
+                    if not response.has_header('Link'):
+                        break
+
+                    response = api.get(
+                        response['Link'][1:response['Link'].index('>')])
+
+                self.assertEqual(rows, expected, (ordering, size))
+
+    def test_genres_follow_omdb_data(self):
+        movie = Movie.objects.get(title='Avatar')
+        movie.omdb_data = {'Genre': 'Drama'}
+        Movie.objects.bulk_update([movie], ['genre'])
+
+        self.assertEqual(
+            list(MovieGenre.objects.filter(movie=movie)
+                 .values_list('genre', flat=True)),
+            ['drama'])
+
+        movie = Movie(title='Up', year_of_production=2009)
+        movie.omdb_data = {'Genre': 'Animation, Comedy'}
+        Movie.objects.bulk_create([movie])
+
+        self.assertEqual(
+            titles(api.get(MOVIES_ENDPOINT_URL, {'genre': 'animation'})),
+            ['Karate Kids', 'Up'])
+
+
+@unittest.skipUnless(
+    connection.vendor == 'sqlite', 'plans are checked on SQLite')
+class TestMovieFilterPlans(TestCase):
+    def plan(self, params, ordering, cursor=False):
+        # Plans of every part the list is read in, see pagination.segments
+        plans = []
+
+        for movies, part_ordering in segments(
+                filter_movies(Movie.objects.all(), QueryDict(params)),
+                ordering):
+            if cursor:
+                movies = movies.filter(keyset_filter(part_ordering, [
+                    'M' if field.lstrip('-') == 'title' else 5
+                    for field in part_ordering]))
+
+            plans.append(movies.order_by(*part_ordering).values('id')[:101]
+                         .explain())
+
+        return '\n'.join(plans)
+
+    def test_filters_read_indexes(self):
+        # A table scan is only used to read rows in the requested order,
+        # never followed by a sort of every row
+        for params in FILTERS:
+            for name, (ordering, _) in MOVIE_ORDERINGS.items():
+                plan = self.plan(params, ordering)
+
+                self.assertFalse(
+                    'SCAN' in plan and 'TEMP B-TREE' in plan,
+                    '{0} {1}: {2}'.format(params, name, plan))
+
+    def test_pages_seek_to_cursor(self):
+        for params in FILTERS:
+            for name, (ordering, _) in MOVIE_ORDERINGS.items():
+                plan = self.plan(params, ordering, cursor=True)
+
+                self.assertNotIn(
+                    'SCAN', plan, '{0} {1}: {2}'.format(params, name, plan))
+
+    def test_orderings_read_composite_indexes(self):
+        # Listings filtered by type, or not filtered, are never sorted
+        for params in ['', 'type=movie', 'type=movie&genre=drama']:
+            for name, (ordering, _) in MOVIE_ORDERINGS.items():
+                plan = self.plan(params, ordering)
+
+                self.assertNotIn(
+                    'TEMP B-TREE', plan,
+                    '{0} {1}: {2}'.format(params, name, plan))
@@ -0,0 +1,167 @@
+import tempfile
+import time
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+from .. import importer
+from ..models import Movie
+from .test_api import MOVIE_TITLES, UNKNOWN_TITLE
+from .test_omdb import OMDbStubTestCase
+
+BULK_ENDPOINT_URL = '/movies/bulk'
+
+api = APIClient()
+
+
+class TestImportTitles(OMDbStubTestCase):
+    def setUp(self):
+        super().setUp()
+        settings = self.settings(OMDB_CLIENT={
+            'URL': self.stub.url, 'RETRIES': 0, 'BACKOFF': 0.01})
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_statuses(self):
+        existing = Movie.objects.create(
+            title=MOVIE_TITLES[1], year_of_production=1990)
+
+        report = importer.import_titles(
+            [MOVIE_TITLES[0], MOVIE_TITLES[1], UNKNOWN_TITLE, 'AVATAR'])
+        avatar = Movie.objects.get(title=MOVIE_TITLES[0])
+
+        self.assertEqual(report, [
+            {'title': 'Avatar', 'status': 'created', 'movie_id': avatar.id},
+            {'title': 'Karate Kids', 'status': 'exists',
+             'movie_id': existing.id},
+            {'title': UNKNOWN_TITLE, 'status': 'not_found', 'movie_id': None},
+            {'title': 'AVATAR', 'status': 'duplicate', 'movie_id': avatar.id},
+        ])
+        self.assertEqual(avatar.omdb_data['Title'], 'Avatar')
+        self.assertEqual(self.stub.requests, 3)
+
+    def test_failed_lookups_are_reported(self):
+        self.stub.fail_next(1)
+        report = importer.import_titles([MOVIE_TITLES[0]])
+
+        self.assertEqual(report[0]['status'], 'failed')
+        self.assertIn('error', report[0])
+        self.assertFalse(Movie.objects.exists())
+
+    def test_titles_without_year_are_reported(self):
+        self.stub.movies = dict(self.stub.movies, **{
+            'no year': {'Title': 'No Year', 'Year': 'N/A',
+                        'Response': 'True'}})
+        report = importer.import_titles(['No Year', MOVIE_TITLES[0]])
+
+        self.assertEqual(report[0]['status'], 'failed')
+        self.assertEqual(report[1]['status'], 'created')
+        self.assertEqual(
+            list(Movie.objects.values_list('title', flat=True)),
+            [MOVIE_TITLES[0]])
+
+    def test_concurrently_inserted_titles_exist(self):
+        # The first existence check runs before another import inserts
+        # the movie
+        existing = Movie.objects.create(
+            title=MOVIE_TITLES[0], year_of_production=2009)
+        existing_movies = importer.existing_movies
+        checks = []
+
+        def check_before_insert(keys, batch_size):
+            checks.append(keys)
+            return existing_movies(keys, batch_size) if len(checks) > 1 \
+                else {}
+
+        with mock.patch.object(
+                importer, 'existing_movies', check_before_insert):
+            report = importer.import_titles(MOVIE_TITLES)
+
+        self.assertEqual(
+            [result['status'] for result in report], ['exists', 'created'])
+        self.assertEqual(report[0]['movie_id'], existing.id)
+        self.assertEqual(len(checks), 2)
+        self.assertEqual(Movie.objects.count(), 2)
+
+
+class TestImportManyTitles(OMDbStubTestCase):
+    stub_options = {'generate': True, 'delay': 0.1}
+
+    def import_titles(self, start, stop, **options):
+        with self.settings(OMDB_CLIENT={'URL': self.stub.url}):
+            with CaptureQueriesContext(connection) as queries:
+                report = importer.import_titles(
+                    ['Movie {0}'.format(i) for i in range(start, stop)],
+                    **options)
+
+        self.assertEqual(
+            {result['status'] for result in report}, {'created'})
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_titles(self):
+        self.assertEqual(
+            self.import_titles(0, 2, workers=4),
+            self.import_titles(2, 14, workers=4))
+        self.assertEqual(Movie.objects.count(), 14)
+
+    def test_lookups_run_concurrently(self):
+        start = time.perf_counter()
+        self.import_titles(0, 8, workers=8)
+
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertEqual(self.stub.requests, 8)
+
+
+class TestBulkImportAPI(OMDbStubTestCase):
+    def test_post_titles(self):
+        with self.settings(OMDB_CLIENT={'URL': self.stub.url}):
+            response = api.post(
+                BULK_ENDPOINT_URL,
+                data={'titles': MOVIE_TITLES},
+                format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [result['status'] for result in response.data],
+            ['created', 'created'])
+        self.assertEqual(Movie.objects.count(), 2)
+
+    def test_post_list_of_titles(self):
+        with self.settings(OMDB_CLIENT={'URL': self.stub.url}):
+            response = api.post(
+                BULK_ENDPOINT_URL, data=MOVIE_TITLES, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Movie.objects.count(), 2)
+
+    def test_post_invalid_titles(self):
+        for data in [{}, {'titles': 'Avatar'}, {'titles': ['Avatar', '']},
+                     [], ['Avatar', 1], 'Avatar', 1]:
+            response = api.post(BULK_ENDPOINT_URL, data=data, format='json')
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_post_too_many_titles(self):
+        with self.settings(BULK_IMPORT={'MAX_TITLES': 1}):
+            response = api.post(
+                BULK_ENDPOINT_URL,
+                data={'titles': MOVIE_TITLES},
+                format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.stub.requests, 0)
+
+    def test_import_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.txt') as titles:
+            titles.write('# titles\nAvatar\n\nKarate Kids\navatar\n')
+            titles.flush()
+            out = StringIO()
+
+            with self.settings(OMDB_CLIENT={'URL': self.stub.url}):
+                call_command('import_movies', titles.name, stdout=out)
+
+        self.assertIn('2 created, 1 duplicate', out.getvalue())
+        self.assertEqual(Movie.objects.count(), 2)
@@ -0,0 +1,123 @@
+import json
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework.test import APIClient
+from ..instrumentation import InstrumentationMiddleware, metrics
+from ..models import Movie
+from .test_api import COMMENTS_ENDPOINT_URL, MOVIE_TITLES, \
+    MOVIES_ENDPOINT_URL
+from .test_omdb import OMDbStubTestCase
+
+LOGGER = 'net_movies.movies_api.instrumentation'
+
+api = APIClient()
+
+
+def log_lines(logs):
+    return [json.loads(record.getMessage()) for record in logs.records]
+
+
+class TestInstrumentation(TestCase):
+    def setUp(self):
+        metrics.clear()
+        self.movie = Movie.objects.create(
+            title='Avatar', year_of_production=2009)
+
+    def test_server_timing(self):
+        response = api.get(MOVIES_ENDPOINT_URL)
+
+        self.assertRegex(
+            response['Server-Timing'],
+            r'^db;dur=[\d.]+;desc="1 queries", serialize;dur=[\d.]+, '
+            r'compress;dur=[\d.]+, omdb;dur=0\.0, total;dur=[\d.]+$')
+
+    def test_log_line(self):
+        with self.assertLogs(LOGGER, 'INFO') as logs:
+            response = api.get(MOVIES_ENDPOINT_URL, {'year': 2009})
+
+        line, = log_lines(logs)
+
+        self.assertEqual(line['view'], 'Movies')
+        self.assertEqual(line['status'], 200)
+        self.assertEqual(line['db_queries'], 1)
+        self.assertEqual(line['response_bytes'], len(response.content))
+        self.assertNotIn('query_threshold_exceeded', line)
+
+    @override_settings(INSTRUMENTATION={'QUERY_THRESHOLD': 5})
+    def test_query_threshold(self):
+        def n_plus_one(request):
+            for movie_id in range(10):
+                Movie.objects.filter(id=movie_id).first()
+            return HttpResponse()
+
+        with self.assertLogs(LOGGER, 'WARNING') as logs:
+            InstrumentationMiddleware(n_plus_one)(
+                RequestFactory().get(MOVIES_ENDPOINT_URL))
+
+        line, = log_lines(logs)
+
+        self.assertTrue(line['query_threshold_exceeded'])
+        self.assertEqual(line['db_queries'], 10)
+        self.assertEqual(line['most_repeated_count'], 10)
+        self.assertIn('"movies_api_movie"', line['most_repeated_sql'])
+
+    def test_metrics(self):
+        api.get(MOVIES_ENDPOINT_URL)
+        api.get(COMMENTS_ENDPOINT_URL)
+        response = api.get('/metrics')
+        text = response.content.decode()
+
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertIn('# TYPE http_request_duration_seconds histogram', text)
+        self.assertIn(
+            'http_request_duration_seconds_count'
+            '{method="GET",view="Movies"} 1', text)
+        self.assertIn(
+            'http_request_db_queries_bucket'
+            '{method="GET",view="Comments",le="1"} 1', text)
+        self.assertIn('http_response_size_bytes_sum', text)
+
+    def test_unknown_methods_share_a_label(self):
+        api.generic('FOO', MOVIES_ENDPOINT_URL)
+        text = api.get('/metrics').content.decode()
+
+        self.assertIn(
+            'http_request_duration_seconds_count'
+            '{method="other",view="Movies"} 1', text)
+        self.assertNotIn('FOO', text)
+
+    def test_metrics_allowed_addresses(self):
+        self.assertEqual(
+            api.get('/metrics', REMOTE_ADDR='10.0.0.1').status_code, 404)
+
+        with self.settings(INSTRUMENTATION={
+                'METRICS_ALLOWED_IPS': ['10.0.0.1']}):
+            self.assertEqual(
+                api.get('/metrics', REMOTE_ADDR='10.0.0.1').status_code,
+                200)
+            self.assertEqual(api.get('/metrics').status_code, 404)
+
+    @override_settings(INSTRUMENTATION={
+        'METRICS_ALLOWED_IPS': [], 'METRICS_TOKEN': 'secret'})
+    def test_metrics_token(self):
+        self.assertEqual(api.get('/metrics').status_code, 404)
+        self.assertEqual(api.get(
+            '/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 404)
+        self.assertEqual(api.get(
+            '/metrics', HTTP_AUTHORIZATION='Bearer secret').status_code, 200)
+
+    @override_settings(INSTRUMENTATION={'ENABLED': False})
+    def test_disabled(self):
+        self.assertFalse(
+            api.get(MOVIES_ENDPOINT_URL).has_header('Server-Timing'))
+
+
+class TestOMDbTiming(OMDbStubTestCase):
+    stub_options = {'delay': 0.05}
+
+    def test_omdb_time(self):
+        with self.settings(OMDB_CLIENT={'URL': self.stub.url}), \
+                self.assertLogs(LOGGER, 'INFO') as logs:
+            api.post(MOVIES_ENDPOINT_URL, {'title': MOVIE_TITLES[0]})
+
+        self.assertGreaterEqual(log_lines(logs)[0]['omdb_ms'], 50)
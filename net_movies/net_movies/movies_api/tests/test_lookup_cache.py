@@ -0,0 +1,203 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from ..lookup_cache import OMDbLookupCache, get_lookup_cache
+from ..models import Movie
+from ..omdb import OMDbUnavailable, get_client
+from ..titles import normalize_title
+from ..utils import get_movie
+from .test_api import MOVIE_TITLES, UNKNOWN_TITLE
+from .test_omdb import OMDbStubTestCase
+
+
+class CountingFetch(object):
+    def __init__(self, data, delay=0, error=None):
+        self.data = data
+        self.delay = delay
+        self.error = error
+        self.calls = []
+
+    def __call__(self, title):
+        self.calls.append(title)
+        time.sleep(self.delay)
+
+        if self.error:
+            raise self.error
+
+        return self.data
+
+
+def run_together(func, times):
+    # Method that starts func in times threads at once and returns results
+    # or raised exceptions
+    barrier = threading.Barrier(times)
+
+    def call(_):
+        barrier.wait()
+
+        try:
+            return func()
+        except Exception as error:
+            return error
+
+    with ThreadPoolExecutor(times) as executor:
+        return list(executor.map(call, range(times)))
+
+
+def lookup_cache(**options):
+    options = dict({
+        'cache_alias': 'default',
+        'ttl': 60,
+        'negative_ttl': 60,
+        'local_size': 10,
+        'local_ttl': 60}, **options)
+    return OMDbLookupCache(**options)
+
+
+class TestNormalizeTitle(TestCase):
+    def test_case_and_whitespace_are_folded(self):
+        self.assertEqual(
+            normalize_title('  The  KARATE\tKid '), 'the karate kid')
+
+
+class TestOMDbLookupCache(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_normalised_titles_share_entry(self):
+        fetch = CountingFetch({'Title': 'Avatar'})
+        lookups = lookup_cache()
+
+        for title in ['Avatar', 'avatar ', '  AVATAR']:
+            self.assertEqual(
+                lookups.get_or_fetch(title, fetch), {'Title': 'Avatar'})
+
+        self.assertEqual(fetch.calls, ['Avatar'])
+        self.assertEqual(lookups.stats()['hit_ratio'], 0.6667)
+
+    def test_not_found_is_cached(self):
+        fetch = CountingFetch(None)
+        lookups = lookup_cache()
+
+        for _ in range(2):
+            self.assertIsNone(lookups.get_or_fetch(UNKNOWN_TITLE, fetch))
+
+        self.assertEqual(len(fetch.calls), 1)
+
+    def test_negative_entries_expire_sooner(self):
+        lookups = lookup_cache(negative_ttl=0.05)
+        lookups.set(MOVIE_TITLES[0], {'Title': MOVIE_TITLES[0]})
+        lookups.set(UNKNOWN_TITLE, None)
+        time.sleep(0.1)
+
+        self.assertEqual(lookups.get(MOVIE_TITLES[0])[0], True)
+        self.assertEqual(lookups.get(UNKNOWN_TITLE), (False, None))
+
+    def test_shared_tier_serves_other_processes(self):
+        lookup_cache().set(MOVIE_TITLES[0], {'Title': MOVIE_TITLES[0]})
+        other = lookup_cache()
+
+        self.assertEqual(other.get(MOVIE_TITLES[0])[0], True)
+        self.assertEqual(other.get(MOVIE_TITLES[0])[0], True)
+        self.assertEqual(other.stats()['shared_hits'], 1)
+        self.assertEqual(other.stats()['local_hits'], 1)
+
+    def test_local_tier_is_bounded(self):
+        lookups = lookup_cache(local_size=2)
+
+        for title in MOVIE_TITLES + [UNKNOWN_TITLE]:
+            lookups.set(title, None)
+
+        self.assertEqual(len(lookups.local), 2)
+        self.assertNotIn(lookups.key(MOVIE_TITLES[0]), lookups.local)
+
+    def test_invalidate_title(self):
+        fetch = CountingFetch({'Title': 'Avatar'})
+        lookups = lookup_cache()
+        lookups.get_or_fetch('Avatar', fetch)
+        lookups.invalidate('AVATAR')
+        lookups.get_or_fetch('Avatar', fetch)
+
+        self.assertEqual(len(fetch.calls), 2)
+
+
+class TestSingleFlight(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_concurrent_misses_share_fetch(self):
+        fetch = CountingFetch({'Title': 'Avatar'}, delay=0.2)
+        lookups = lookup_cache()
+        results = run_together(
+            lambda: lookups.get_or_fetch('Avatar', fetch), 10)
+
+        self.assertEqual(results, [{'Title': 'Avatar'}] * 10)
+        self.assertEqual(len(fetch.calls), 1)
+        self.assertEqual(lookups.stats()['coalesced'], 9)
+
+    def test_processes_share_fetch_through_lock(self):
+        fetch = CountingFetch({'Title': 'Avatar'}, delay=0.2)
+        processes = [lookup_cache(poll_interval=0.01) for _ in range(5)]
+        results = run_together(
+            lambda: processes.pop().get_or_fetch('Avatar', fetch), 5)
+
+        self.assertEqual(results, [{'Title': 'Avatar'}] * 5)
+        self.assertEqual(len(fetch.calls), 1)
+
+    def test_errors_reach_waiting_calls(self):
+        error = OMDbUnavailable('down')
+        fetch = CountingFetch(None, delay=0.2, error=error)
+        lookups = lookup_cache()
+        results = run_together(
+            lambda: lookups.get_or_fetch('Avatar', fetch), 5)
+
+        self.assertEqual(results, [error] * 5)
+        self.assertEqual(len(fetch.calls), 1)
+        self.assertTrue(lookups.lock_title('Avatar'))
+
+    def test_waiting_for_other_process_times_out(self):
+        fetch = CountingFetch({'Title': 'Avatar'})
+        lookups = lookup_cache(lock_wait=0.1, poll_interval=0.01)
+        lookup_cache().lock_title('Avatar')
+
+        self.assertEqual(
+            lookups.get_or_fetch('Avatar', fetch), {'Title': 'Avatar'})
+        self.assertEqual(len(fetch.calls), 1)
+
+
+class TestGetMovieLookups(OMDbStubTestCase):
+    stub_options = {'delay': 0.2}
+
+    def test_concurrent_lookups_query_omdb_once(self):
+        with self.settings(OMDB_CLIENT={'URL': self.stub.url}):
+            client = get_client()
+            results = run_together(
+                lambda: get_lookup_cache().get_or_fetch(
+                    MOVIE_TITLES[0], client.fetch), 10)
+
+        self.assertEqual(
+            [data['Title'] for data in results], [MOVIE_TITLES[0]] * 10)
+        self.assertEqual(self.stub.requests, 1)
+
+    def test_repeated_posts_query_omdb_once(self):
+        with self.settings(OMDB_CLIENT={'URL': self.stub.url}):
+            for title in [MOVIE_TITLES[0], MOVIE_TITLES[0].upper()]:
+                self.assertEqual(get_movie(title), Movie.objects.get())
+            for _ in range(2):
+                self.assertIsNone(get_movie(UNKNOWN_TITLE))
+
+        self.assertEqual(self.stub.requests, 2)
+
+    def test_invalidate_command(self):
+        with self.settings(OMDB_CLIENT={'URL': self.stub.url}):
+            get_movie(MOVIE_TITLES[0])
+            call_command(
+                'invalidate_omdb_lookups', MOVIE_TITLES[0], stdout=StringIO())
+            get_movie(MOVIE_TITLES[0])
+
+        self.assertEqual(self.stub.requests, 2)
+        self.assertFalse(get_lookup_cache().get(MOVIE_TITLES[1])[0])
@@ -1,5 +1,16 @@
+from django.db import connection
 from django.test import TestCase
-from ..models import Movie, MovieComment
+from django.test.utils import CaptureQueriesContext
+from ..models import Movie, MovieComment, MovieOMDbData, omdb_columns
+
+OMDB_DATA = {
+    'Title': 'Avatar',
+    'Year': '2009',
+    'imdbRating': '7.8',
+    'Genre': 'Action, Adventure, Fantasy',
+    'Runtime': '162 min',
+    'Type': 'movie',
+}
 
 
 class TestMovieModel(TestCase):
@@ -15,6 +26,54 @@ class TestMovieModel(TestCase):
         self.assertEqual(movie.__repr__(), 'Karate Kids (1990)')
 
 
+class TestMovieOMDbData(TestCase):
+    def test_promoted_columns(self):
+        self.assertEqual(omdb_columns(OMDB_DATA), {
+            'imdb_rating': 7.8,
+            'genre': 'Action, Adventure, Fantasy',
+            'runtime_minutes': 162,
+            'type': 'movie'})
+
+    def test_promoted_columns_not_available(self):
+        self.assertEqual(
+            omdb_columns({'imdbRating': 'N/A', 'Runtime': 'N/A'}), {
+                'imdb_rating': None,
+                'genre': '',
+                'runtime_minutes': None,
+                'type': ''})
+
+    def test_create_stores_payload_in_side_table(self):
+        movie = Movie.objects.create(
+            title='Avatar', year_of_production=2009, omdb_data=OMDB_DATA)
+        movie = Movie.objects.get(id=movie.id)
+
+        self.assertEqual(movie.imdb_rating, 7.8)
+        self.assertEqual(movie.runtime_minutes, 162)
+        self.assertEqual(movie.omdb_data, OMDB_DATA)
+        self.assertEqual(MovieOMDbData.objects.get().data, OMDB_DATA)
+
+    def test_bulk_create_stores_payloads(self):
+        movies = Movie.objects.bulk_create(
+            Movie(title='Movie {0}'.format(i), year_of_production=2000,
+                  omdb_data=dict(OMDB_DATA, Title='Movie {0}'.format(i)))
+            for i in range(3))
+
+        self.assertTrue(all(movie.pk for movie in movies))
+        self.assertEqual(
+            [omdb.data for omdb in MovieOMDbData.objects.order_by('movie')],
+            [movie.omdb_data for movie in movies])
+
+    def test_list_query_does_not_read_payload(self):
+        Movie.objects.create(
+            title='Avatar', year_of_production=2009, omdb_data=OMDB_DATA)
+
+        with CaptureQueriesContext(connection) as queries:
+            list(Movie.objects.all())
+
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn(MovieOMDbData._meta.db_table, queries[0]['sql'])
+
+
 class TestMovieCommentModel(TestCase):
     def setUp(self):
         movie = Movie.objects.create(
@@ -0,0 +1,151 @@
+import threading
+import time
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+from ..lookup_cache import get_lookup_cache
+from ..models import Movie
+from ..omdb import (
+    CircuitBreaker,
+    OMDbClient,
+    OMDbError,
+    OMDbUnavailable,
+    get_client,
+)
+from ..omdb_stub import OMDbStub
+from ..utils import get_movie
+from .test_api import MOVIE_TITLES, MOVIES_ENDPOINT_URL, UNKNOWN_TITLE
+
+api = APIClient()
+
+
+class OMDbStubTestCase(TestCase):
+    stub_options = {}
+
+    def setUp(self):
+        cache.clear()
+        get_lookup_cache().clear()
+        self.stub = OMDbStub(**self.stub_options).start()
+        self.addCleanup(self.stub.stop)
+
+    def omdb_client(self, **options):
+        options = dict({'BACKOFF': 0.01, 'READ_TIMEOUT': 1}, **options)
+        return OMDbClient(self.stub.url, 'test', **options)
+
+
+class TestOMDbClient(OMDbStubTestCase):
+    def test_fetch_known_title(self):
+        data = self.omdb_client().fetch(MOVIE_TITLES[0])
+        self.assertEqual(data['Title'], MOVIE_TITLES[0])
+
+    def test_fetch_unknown_title(self):
+        self.assertIsNone(self.omdb_client().fetch(UNKNOWN_TITLE))
+
+    def test_connection_is_reused(self):
+        client = self.omdb_client()
+
+        for title in MOVIE_TITLES * 2:
+            client.fetch(title)
+
+        self.assertEqual(self.stub.requests, 4)
+        self.assertEqual(self.stub.connections, 1)
+
+    def test_retries_server_errors(self):
+        client = self.omdb_client(RETRIES=2)
+        self.stub.fail_next(2)
+
+        self.assertEqual(client.fetch(MOVIE_TITLES[0])['Title'], 'Avatar')
+        self.assertEqual(client.stats()['retries'], 2)
+        self.assertEqual(client.stats()['errors'], 2)
+
+    def test_gives_up_after_retries(self):
+        client = self.omdb_client(RETRIES=1)
+        self.stub.fail_next(3)
+
+        with self.assertRaises(OMDbUnavailable):
+            client.fetch(MOVIE_TITLES[0])
+        self.assertEqual(self.stub.requests, 2)
+
+    def test_retries_timeouts(self):
+        client = self.omdb_client(RETRIES=1, READ_TIMEOUT=0.1)
+        self.stub.fail_next(1, status=200, delay=0.5)
+
+        self.assertEqual(client.fetch(MOVIE_TITLES[0])['Title'], 'Avatar')
+        self.assertEqual(client.stats()['timeouts'], 1)
+
+    def test_client_errors_are_not_retried(self):
+        client = self.omdb_client(RETRIES=2)
+        self.stub.fail_next(1, status=401)
+
+        with self.assertRaises(OMDbError):
+            client.fetch(MOVIE_TITLES[0])
+        self.assertEqual(self.stub.requests, 1)
+
+    def test_open_circuit_rejects_without_calling_server(self):
+        client = self.omdb_client(RETRIES=0, FAILURE_THRESHOLD=2)
+        self.stub.fail_next(2)
+
+        for _ in range(2):
+            with self.assertRaises(OMDbUnavailable):
+                client.fetch(MOVIE_TITLES[0])
+
+        with self.assertRaises(OMDbUnavailable):
+            client.fetch(MOVIE_TITLES[0])
+        self.assertEqual(self.stub.requests, 2)
+        self.assertEqual(client.stats()['rejected'], 1)
+        self.assertEqual(client.stats()['circuit'], CircuitBreaker.OPEN)
+
+    def test_circuit_closes_after_successful_trial(self):
+        client = self.omdb_client(
+            RETRIES=0, FAILURE_THRESHOLD=1, RESET_TIMEOUT=0.05)
+        self.stub.fail_next(1)
+
+        with self.assertRaises(OMDbUnavailable):
+            client.fetch(MOVIE_TITLES[0])
+        time.sleep(0.1)
+
+        self.assertTrue(client.fetch(MOVIE_TITLES[0]))
+        self.assertEqual(client.stats()['circuit'], CircuitBreaker.CLOSED)
+
+    def test_in_flight_limit(self):
+        client = self.omdb_client(MAX_IN_FLIGHT=1, ACQUIRE_TIMEOUT=0.05)
+        self.stub.fail_next(1, status=200, delay=0.3)
+        slow = threading.Thread(target=client.fetch, args=[MOVIE_TITLES[0]])
+        slow.start()
+        time.sleep(0.1)
+
+        with self.assertRaises(OMDbUnavailable):
+            client.fetch(MOVIE_TITLES[1])
+
+        slow.join()
+        self.assertEqual(self.stub.requests, 1)
+
+    def test_latency_is_recorded(self):
+        client = self.omdb_client()
+        client.fetch(MOVIE_TITLES[0])
+        stats = client.stats()
+
+        self.assertEqual(stats['latency_count'], 1)
+        self.assertGreater(stats['latency_sum'], 0)
+
+
+class TestOMDbSettings(OMDbStubTestCase):
+    def test_client_follows_settings(self):
+        with self.settings(OMDB_CLIENT={'URL': self.stub.url}):
+            self.assertEqual(get_client().url, self.stub.url)
+            self.assertEqual(get_movie(MOVIE_TITLES[1]), Movie.objects.last())
+
+    def test_post_movie_when_omdb_is_down(self):
+        self.stub.fail_next(3)
+
+        with self.settings(OMDB_CLIENT={
+                'URL': self.stub.url, 'RETRIES': 2, 'BACKOFF': 0.01}):
+            response = api.post(
+                MOVIES_ENDPOINT_URL,
+                data={'title': MOVIE_TITLES[0]},
+                format='json')
+
+        self.assertEqual(
+            response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertFalse(Movie.objects.exists())
@@ -0,0 +1,169 @@
+import json
+import re
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+from ..models import Movie, MovieComment
+from ..pagination import InvalidPage, encode_cursor, json_chunks, paginate
+from .test_api import (
+    COMMENTS_ENDPOINT_URL,
+    MOVIES_ENDPOINT_URL,
+    TEST_COMMENT_CONTENT,
+)
+
+api = APIClient()
+
+
+def next_link(response):
+    match = re.match(r'<(.*)>; rel="next"', response.get('Link', ''))
+    return match.group(1) if match else None
+
+
+def streamed(response):
+    return b''.join(response.streaming_content).decode()
+
+
+class TestKeysetPagination(TestCase):
+    def setUp(self):
+        self.movies = [
+            Movie.objects.create(
+                title='Movie {0}'.format(i), year_of_production=2000 + i % 2)
+            for i in range(5)]
+
+    def test_unpaginated_list_is_unchanged(self):
+        response = api.get(MOVIES_ENDPOINT_URL)
+
+        self.assertEqual(len(response.data), 5)
+        self.assertNotIn('Link', response)
+
+    def test_following_next_links(self):
+        pages = []
+        response = api.get(MOVIES_ENDPOINT_URL, data={'page_size': 2})
+
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages.append([movie['id'] for movie in response.data])
+            if not next_link(response):
+                break
+            response = api.get(next_link(response))
+
+        ids = [movie.id for movie in self.movies]
+        self.assertEqual(pages, [ids[:2], ids[2:4], ids[4:]])
+
+    def test_filters_are_kept_in_next_link(self):
+        response = api.get(
+            MOVIES_ENDPOINT_URL, data={'page_size': 1, 'year': 2001})
+        response = api.get(next_link(response))
+
+        self.assertEqual(
+            [movie['id'] for movie in response.data], [self.movies[3].id])
+        self.assertIsNone(next_link(response))
+
+    @override_settings(PAGINATION={'MAX_PAGE_SIZE': 3})
+    def test_page_size_is_capped(self):
+        response = api.get(MOVIES_ENDPOINT_URL, data={'page_size': 100})
+
+        self.assertEqual(len(response.data), 3)
+        self.assertIn('page_size=3', next_link(response))
+
+    def test_invalid_parameters(self):
+        for data in [
+                {'page_size': 'all'},
+                {'page_size': 0},
+                {'cursor': 'not-a-cursor'},
+                {'cursor': encode_cursor([1, 2])},
+                {'cursor': encode_cursor(['abc'])},
+                {'cursor': encode_cursor([None])},
+                {'cursor': encode_cursor([{}])},
+                {'cursor': encode_cursor([True])},
+                {'cursor': encode_cursor([10 ** 30])},
+                {'cursor': encode_cursor(['x', 1]), 'ordering': '-comments'},
+                {'cursor': encode_cursor([1, 1]), 'ordering': 'title'},
+                {'cursor': encode_cursor([float('nan'), 1]),
+                 'ordering': 'rating'},
+                {'stream': 'xml'}]:
+            response = api.get(MOVIES_ENDPOINT_URL, data=data)
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_descending_keyset(self):
+        request = RequestFactory().get('/movies', {'page_size': 2})
+        ordering = ['-year_of_production', 'id']
+        rows, next_url = paginate(request, Movie.objects.all(), ordering)
+        cursor = next_url.split('cursor=')[1].split('&')[0]
+        request = RequestFactory().get(
+            '/movies', {'page_size': 10, 'cursor': cursor})
+        rest, next_url = paginate(request, Movie.objects.all(), ordering)
+
+        self.assertEqual(
+            [movie.id for movie in rows + rest],
+            [self.movies[i].id for i in [1, 3, 0, 2, 4]])
+        self.assertIsNone(next_url)
+
+    def test_cursor_for_wrong_ordering(self):
+        request = RequestFactory().get(
+            '/movies', {'cursor': encode_cursor([1])})
+
+        with self.assertRaises(InvalidPage):
+            paginate(
+                request, Movie.objects.all(), ['-year_of_production', 'id'])
+
+    def test_comments_pages(self):
+        for movie in self.movies[:3]:
+            MovieComment.objects.create(
+                movie=movie, comment_content=TEST_COMMENT_CONTENT)
+
+        response = api.get(COMMENTS_ENDPOINT_URL, data={'page_size': 2})
+        rest = api.get(next_link(response))
+
+        self.assertEqual(
+            [comment['movie'] for comment in response.data + rest.data],
+            [movie.id for movie in self.movies[:3]])
+
+
+class TestStreaming(TestCase):
+    def setUp(self):
+        for i in range(3):
+            movie = Movie.objects.create(
+                title='Movie {0}'.format(i), year_of_production=2000)
+            MovieComment.objects.create(
+                movie=movie, comment_content=TEST_COMMENT_CONTENT)
+
+    def test_stream_json_array(self):
+        response = api.get(MOVIES_ENDPOINT_URL, data={'stream': 'json'})
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(
+            json.loads(streamed(response)),
+            api.get(MOVIES_ENDPOINT_URL).json())
+
+    def test_stream_ndjson(self):
+        response = api.get(
+            COMMENTS_ENDPOINT_URL, data={'stream': 'ndjson'})
+        lines = streamed(response).splitlines()
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(
+            [json.loads(line) for line in lines],
+            api.get(COMMENTS_ENDPOINT_URL).json())
+
+    def test_stream_in_several_chunks(self):
+        chunks = list(json_chunks(({'id': i} for i in range(5)), 'json', 2))
+
+        self.assertEqual(len(chunks), 5)
+        self.assertEqual(
+            json.loads(b''.join(chunks).decode()),
+            [{'id': i} for i in range(5)])
+
+    def test_stream_empty_list(self):
+        Movie.objects.all().delete()
+        response = api.get(MOVIES_ENDPOINT_URL, data={'stream': 'json'})
+
+        self.assertEqual(json.loads(streamed(response)), [])
+
+    def test_stream_with_filter(self):
+        response = api.get(
+            MOVIES_ENDPOINT_URL, data={'stream': 'json', 'title': 'Movie 1'})
+
+        self.assertEqual(len(json.loads(streamed(response))), 1)
@@ -0,0 +1,135 @@
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+from .. import top_snapshot
+from ..models import Movie, MovieComment
+from ..ranking import RANK_CURSOR, dense_rank, rank_movies, ranked
+from .test_api import TOP_ENDPOINT_URL
+
+api = APIClient()
+
+
+def create_movies(comment_counts):
+    movies = []
+    offset = Movie.objects.count()
+
+    for i, comments_count in enumerate(comment_counts, offset):
+        movie = Movie.objects.create(
+            title='Movie {0}'.format(i), year_of_production=2000)
+        MovieComment.objects.bulk_create(
+            MovieComment(movie=movie, comment_content='test')
+            for _ in range(comments_count))
+        movies.append(movie)
+
+    return movies
+
+
+class TestDenseRank(TestCase):
+    def test_empty_rows(self):
+        self.assertEqual(list(dense_rank([])), [])
+
+    def test_ties_share_rank(self):
+        self.assertEqual(
+            [row['rank'] for row in dense_rank(
+                [(2, 4), (3, 2), (4, 2), (1, 0)])],
+            [1, 2, 2, 3])
+
+
+class TestRankMovies(TestCase):
+    def test_ranking_payload(self):
+        movies = create_movies([0, 4, 2, 2])
+
+        self.assertEqual(rank_movies(Movie.objects.all()), [
+            {'movie_id': movies[1].id, 'total_comments': 4, 'rank': 1},
+            {'movie_id': movies[2].id, 'total_comments': 2, 'rank': 2},
+            {'movie_id': movies[3].id, 'total_comments': 2, 'rank': 2},
+            {'movie_id': movies[0].id, 'total_comments': 0, 'rank': 3},
+        ])
+
+    def test_query_count_does_not_grow_with_catalogue(self):
+        for size in [1, 10, 30]:
+            create_movies(range(size))
+
+            with self.assertNumQueries(1):
+                rank_movies(Movie.objects.all())
+
+
+class TestRankedPages(TestCase):
+    def setUp(self):
+        self.movies = create_movies([0, 4, 2, 2, 2, 1])
+        self.expected = rank_movies(Movie.objects.all())
+
+    def test_limit_keeps_ties(self):
+        self.assertEqual(
+            ranked(Movie.objects.all(), F('comment_count'), limit=2),
+            self.expected[:4])
+
+    def test_pages_continue_dense_ranks(self):
+        pages, after = [], None
+
+        while True:
+            page = ranked(
+                Movie.objects.all(), F('comment_count'), after=after, size=2)
+            if not page:
+                break
+            pages.append(page)
+            after = [page[-1][field] for field in RANK_CURSOR]
+
+        self.assertEqual(len(pages), 3)
+        self.assertEqual(sum(pages, []), self.expected)
+
+
+class TestTopAPI(TestCase):
+    def setUp(self):
+        self.movies = create_movies([0, 4, 2, 2, 2, 1])
+
+    def get_all(self, params):
+        rows, url = [], TOP_ENDPOINT_URL
+        response = api.get(url, params)
+
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            rows += response.data
+
+            if not response.has_header('Link'):
+                return rows
+
+            link = response['Link']
+            response = api.get(link[1:link.index('>')])
+
+    def test_limit(self):
+        response = api.get(TOP_ENDPOINT_URL, {'limit': 2})
+
+        self.assertEqual(
+            [(row['total_comments'], row['rank']) for row in response.data],
+            [(4, 1), (2, 2), (2, 2), (2, 2)])
+
+    def test_paginated_ranking(self):
+        self.assertEqual(
+            self.get_all({'page_size': 2}),
+            api.get(TOP_ENDPOINT_URL).data)
+
+    def test_paginated_date_range_ranking(self):
+        params = {'date_from': '2000-01-01'}
+
+        self.assertEqual(
+            self.get_all(dict(params, page_size=2, limit=3)),
+            api.get(TOP_ENDPOINT_URL, dict(params, limit=3)).data)
+
+    def test_invalid_parameters(self):
+        for params in [{'limit': '0'}, {'limit': 'x'}, {'cursor': 'x'},
+                       {'cursor': 'WyJhIiwgMSwgMl0='}]:
+            response = api.get(TOP_ENDPOINT_URL, params)
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_limit_reads_few_snapshot_rows(self):
+        top_snapshot.refresh()
+
+        with CaptureQueriesContext(connection) as queries:
+            api.get(TOP_ENDPOINT_URL, {'limit': 1})
+
+        self.assertIn('"rank" <= 1', queries[-1]['sql'])
@@ -0,0 +1,195 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from .. import refresh, response_cache
+from ..models import Movie, MovieOMDbData, OMDbRefreshJob
+from ..omdb_stub import MOVIES
+from .test_api import MOVIE_TITLES
+from .test_omdb import OMDbStubTestCase
+
+
+def create_movie(title, fetched_days_ago=None, data=None):
+    movie = Movie.objects.create(title=title, year_of_production=2000)
+    fetched_at = timezone.now() - timedelta(days=fetched_days_ago)\
+        if fetched_days_ago is not None else None
+    Movie.objects.filter(id=movie.id).update(omdb_fetched_at=fetched_at)
+
+    if data is not None:
+        MovieOMDbData.objects.create(movie=movie, data=data)
+
+    return movie
+
+
+def limiter(rate=1000, daily_quota=1000):
+    return refresh.RateLimiter(rate, daily_quota, 'default')
+
+
+class TestBulkUpdate(TestCase):
+    def test_updates_fields_in_one_query(self):
+        movies = [create_movie('Movie {0}'.format(i)) for i in range(3)]
+
+        for i, movie in enumerate(movies):
+            movie.year_of_production = 1990 + i
+            movie.imdb_rating = i or None
+
+        with self.assertNumQueries(1):
+            updated = Movie.objects.bulk_update(
+                movies, ['year_of_production', 'imdb_rating'])
+
+        self.assertEqual(updated, 3)
+        self.assertEqual(
+            list(Movie.objects.order_by('id')
+                 .values_list('year_of_production', 'imdb_rating')),
+            [(1990, None), (1991, 1.0), (1992, 2.0)])
+
+    def test_stores_assigned_omdb_data(self):
+        stored = create_movie('Avatar', data={'Title': 'Avatar'})
+        missing = create_movie('Karate Kids')
+        stored.omdb_data = MOVIES['avatar']
+        missing.omdb_data = MOVIES['karate kids']
+
+        Movie.objects.bulk_update(
+            [stored, missing], refresh.UPDATED_FIELDS)
+
+        self.assertEqual(
+            Movie.objects.get(id=stored.id).omdb_data, MOVIES['avatar'])
+        self.assertEqual(Movie.objects.get(id=stored.id).runtime_minutes, 162)
+        self.assertEqual(
+            Movie.objects.get(id=missing.id).omdb_data,
+            MOVIES['karate kids'])
+
+
+class TestRefreshQueue(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_new_movies_are_fresh(self):
+        movie = Movie.objects.create(
+            title='Avatar', year_of_production=2009,
+            omdb_data=MOVIES['avatar'])
+
+        self.assertIsNotNone(movie.omdb_fetched_at)
+        self.assertEqual(refresh.enqueue_stale(max_age_days=1), 0)
+
+    def test_enqueue_stale_movies_once(self):
+        never = create_movie('Never fetched')
+        old = create_movie('Old', fetched_days_ago=40)
+        create_movie('Fresh', fetched_days_ago=1)
+
+        self.assertEqual(refresh.enqueue_stale(max_age_days=30), 2)
+        self.assertEqual(refresh.enqueue_stale(max_age_days=30), 0)
+        self.assertEqual(
+            set(OMDbRefreshJob.objects.values_list('movie_id', flat=True)),
+            {never.id, old.id})
+
+    def test_enqueue_limit(self):
+        for i in range(3):
+            create_movie('Movie {0}'.format(i))
+
+        self.assertEqual(refresh.enqueue_stale(limit=2), 2)
+
+    def test_workers_claim_different_jobs(self):
+        for i in range(3):
+            create_movie('Movie {0}'.format(i))
+        refresh.enqueue_stale()
+
+        first = refresh.claim_jobs('first', 2, 60)
+        second = refresh.claim_jobs('second', 2, 60)
+
+        self.assertEqual(len(first), 2)
+        self.assertEqual(len(second), 1)
+        self.assertFalse(
+            {job.id for job in first} & {job.id for job in second})
+
+    def test_expired_lease_is_claimed_again(self):
+        create_movie('Movie')
+        refresh.enqueue_stale()
+        refresh.claim_jobs('first', 1, -1)
+
+        self.assertEqual(len(refresh.claim_jobs('second', 1, 60)), 1)
+
+    def test_daily_quota(self):
+        quota = limiter(daily_quota=2)
+
+        self.assertEqual([quota.acquire() for _ in range(3)],
+                         [True, True, False])
+        self.assertFalse(limiter(daily_quota=2).acquire())
+
+
+class TestRefreshJobs(OMDbStubTestCase):
+    def test_refresh_updates_stale_movies(self):
+        avatar = create_movie('Avatar', 40, data={'Title': 'Avatar'})
+        unknown = create_movie('Unknown', 40, data={'Title': 'Unknown'})
+        refresh.enqueue_stale()
+
+        result = refresh.refresh_jobs(
+            refresh.claim_jobs('worker', 10, 60), self.omdb_client(),
+            limiter())
+        avatar = Movie.objects.get(id=avatar.id)
+
+        self.assertEqual(
+            result, {'refreshed': 2, 'failed': 0, 'deferred': 0})
+        self.assertEqual(avatar.omdb_data, MOVIES['avatar'])
+        self.assertEqual(avatar.imdb_rating, 7.8)
+        self.assertGreater(
+            avatar.omdb_fetched_at, timezone.now() - timedelta(minutes=1))
+        self.assertEqual(
+            Movie.objects.get(id=unknown.id).omdb_data, {'Title': 'Unknown'})
+        self.assertFalse(OMDbRefreshJob.objects.exists())
+        self.assertFalse(refresh.stale_movies().exists())
+
+    def test_refresh_invalidates_movie_responses(self):
+        create_movie(MOVIE_TITLES[0], 40)
+        refresh.enqueue_stale()
+
+        with mock.patch.object(response_cache, 'bump') as bump:
+            refresh.refresh_jobs(
+                refresh.claim_jobs('worker', 10, 60), self.omdb_client(),
+                limiter())
+
+        bump.assert_called_once_with(response_cache.MOVIES)
+
+    def test_quota_defers_jobs(self):
+        for title in MOVIE_TITLES:
+            create_movie(title)
+        refresh.enqueue_stale()
+
+        result = refresh.refresh_jobs(
+            refresh.claim_jobs('worker', 10, 60), self.omdb_client(),
+            limiter(daily_quota=1))
+
+        self.assertEqual(
+            result, {'refreshed': 1, 'failed': 0, 'deferred': 1})
+        self.assertEqual(self.stub.requests, 1)
+        self.assertEqual(len(refresh.claim_jobs('other', 10, 60)), 1)
+
+    def test_unavailable_omdb_retries_later(self):
+        create_movie(MOVIE_TITLES[0])
+        refresh.enqueue_stale()
+        self.stub.fail_next(1)
+
+        result = refresh.refresh_jobs(
+            refresh.claim_jobs('worker', 10, 60),
+            self.omdb_client(RETRIES=0), limiter())
+        job = OMDbRefreshJob.objects.get()
+
+        self.assertEqual(
+            result, {'refreshed': 0, 'failed': 1, 'deferred': 0})
+        self.assertEqual(job.attempts, 1)
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertEqual(refresh.claim_jobs('worker', 10, 60), [])
+
+    def test_command_once(self):
+        create_movie(MOVIE_TITLES[0])
+        out = StringIO()
+
+        with self.settings(OMDB_CLIENT={'URL': self.stub.url}):
+            call_command('refresh_omdb', once=True, stdout=out)
+
+        self.assertIn('1 refreshed', out.getvalue())
+        self.assertEqual(
+            Movie.objects.get().omdb_data['Title'], MOVIE_TITLES[0])
@@ -0,0 +1,140 @@
+import datetime
+import json
+import unittest
+from unittest import mock
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import renderers, status
+from rest_framework.test import APIClient
+from .. import rendering
+from ..encoded_cache import Encoded
+from ..lookup_cache import get_lookup_cache
+from ..models import Movie, MovieComment, MovieOMDbData
+from ..rendering import JSONRenderer, MessagePackRenderer, dumps, values_rows
+from .test_api import COMMENTS_ENDPOINT_URL, MOVIES_ENDPOINT_URL
+
+api = APIClient()
+DATA = {
+    'title': 'Zażółć  ',
+    'day': datetime.date(2019, 3, 1),
+    'ids': [1, 2],
+}
+
+
+class TestDumps(TestCase):
+    def test_same_output_as_drf(self):
+        self.assertEqual(dumps(DATA), renderers.JSONRenderer().render(DATA))
+
+    def test_same_output_without_orjson(self):
+        with mock.patch.object(rendering, 'orjson', None):
+            self.assertEqual(
+                dumps(DATA), renderers.JSONRenderer().render(DATA))
+
+    def test_indented_output_is_rendered_by_drf(self):
+        content = JSONRenderer().render(
+            DATA, 'application/json; indent=2', {})
+
+        self.assertEqual(
+            content,
+            renderers.JSONRenderer().render(
+                DATA, 'application/json; indent=2', {}))
+        self.assertIn(b'\n  ', content)
+
+
+class TestValuesRows(TestCase):
+    def setUp(self):
+        movie = Movie.objects.create(title='Avatar', year_of_production=2009)
+        MovieComment.objects.create(movie=movie, comment_content='test')
+
+    def test_rows_are_dicts_of_fields(self):
+        movie = Movie.objects.get()
+
+        self.assertEqual(
+            values_rows(Movie.objects.all(), ['id', 'title']),
+            [{'id': movie.id, 'title': 'Avatar'}])
+
+    def test_list_responses_use_one_query(self):
+        for url in (MOVIES_ENDPOINT_URL, COMMENTS_ENDPOINT_URL):
+            with CaptureQueriesContext(connection) as queries:
+                response = api.get(url)
+
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(queries), 1)
+
+    def test_list_response_content(self):
+        movie = Movie.objects.get()
+        response = api.get(COMMENTS_ENDPOINT_URL)
+
+        self.assertEqual(json.loads(response.content.decode()), [{
+            'id': MovieComment.objects.get().id,
+            'movie': movie.id,
+            'comment_content': 'test'}])
+
+
+@unittest.skipIf(rendering.msgpack is None, 'msgpack is not installed')
+class TestMessagePack(TestCase):
+    def test_lists_negotiated_by_accept(self):
+        Movie.objects.create(title='Avatar', year_of_production=2009)
+        response = api.get(
+            MOVIES_ENDPOINT_URL, HTTP_ACCEPT='application/msgpack')
+
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(
+            rendering.msgpack.unpackb(response.content, raw=False),
+            json.loads(api.get(MOVIES_ENDPOINT_URL).content.decode()))
+
+    def test_values_without_msgpack_type(self):
+        self.assertEqual(
+            rendering.msgpack.unpackb(
+                MessagePackRenderer().render(DATA), raw=False),
+            json.loads(dumps(DATA).decode()))
+
+
+class TestNegotiation(TestCase):
+    def test_json_is_the_default(self):
+        response = api.get(MOVIES_ENDPOINT_URL, HTTP_ACCEPT='*/*')
+
+        self.assertEqual(response['Content-Type'], 'application/json')
+
+    def test_msgpack_is_not_acceptable_without_msgpack(self):
+        with mock.patch.object(rendering, 'msgpack', None):
+            response = api.get(
+                MOVIES_ENDPOINT_URL, HTTP_ACCEPT='application/msgpack')
+
+        self.assertEqual(
+            response.status_code, status.HTTP_406_NOT_ACCEPTABLE)
+
+
+class TestEncodedPayload(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.data = {'Title': 'Avatar', 'Year': '2009', 'Genre': 'Action'}
+        movie = Movie(title='Avatar', year_of_production=2009)
+        movie.omdb_data = self.data
+        movie.save()
+        get_lookup_cache().set('Avatar', self.data)
+
+    def test_stored_omdb_data_is_encoded_once(self):
+        api.post(MOVIES_ENDPOINT_URL, {'title': 'Avatar'})
+
+        with CaptureQueriesContext(connection) as queries:
+            response = api.post(MOVIES_ENDPOINT_URL, {'title': 'Avatar'})
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(json.loads(response.content.decode()), self.data)
+        self.assertFalse(any(
+            MovieOMDbData._meta.db_table in query['sql']
+            for query in queries))
+
+    def test_key_is_rendered_per_format(self):
+        loads = []
+        data = Encoded('test', lambda: loads.append(1) or self.data)
+
+        self.assertEqual(JSONRenderer().render(data), dumps(self.data))
+        self.assertEqual(JSONRenderer().render(data), dumps(self.data))
+        self.assertEqual(len(loads), 1)
+        self.assertIn(
+            b'\n', JSONRenderer().render(
+                data, 'application/json; indent=2', {}))
@@ -0,0 +1,148 @@
+import threading
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+from .. import response_cache
+from ..models import Movie, MovieComment
+from .test_api import (
+    COMMENTS_ENDPOINT_URL,
+    MOVIES_ENDPOINT_URL,
+    REAL_YEAR,
+    TEST_COMMENT_CONTENT,
+    TOP_ENDPOINT_URL,
+)
+
+api = APIClient()
+
+
+@override_settings(RESPONSE_CACHE={'ENABLED': True, 'LOCK_WAIT': 1})
+class TestResponseCache(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.movie = Movie.objects.create(
+            title='Karate Kids', year_of_production=REAL_YEAR)
+
+    def test_second_read_is_served_from_cache(self):
+        first = api.get(MOVIES_ENDPOINT_URL)
+
+        with self.assertNumQueries(0):
+            second = api.get(MOVIES_ENDPOINT_URL)
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_query_string_is_part_of_key(self):
+        api.get(MOVIES_ENDPOINT_URL)
+        response = api.get(MOVIES_ENDPOINT_URL, data={'year': 1800})
+
+        self.assertEqual(response.json(), [])
+
+    def test_conditional_request_is_not_modified(self):
+        etag = api.get(TOP_ENDPOINT_URL)['ETag']
+        response = api.get(TOP_ENDPOINT_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+
+    def test_if_modified_since(self):
+        last_modified = api.get(TOP_ENDPOINT_URL)['Last-Modified']
+        response = api.get(
+            TOP_ENDPOINT_URL, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_link_header_is_cached(self):
+        Movie.objects.create(title='Avatar', year_of_production=2009)
+        link = api.get(MOVIES_ENDPOINT_URL, data={'page_size': 1})['Link']
+
+        with self.assertNumQueries(0):
+            response = api.get(MOVIES_ENDPOINT_URL, data={'page_size': 1})
+
+        self.assertEqual(response['Link'], link)
+
+    def test_streams_are_not_cached(self):
+        response = api.get(MOVIES_ENDPOINT_URL, data={'stream': 'json'})
+
+        self.assertTrue(response.streaming)
+        self.assertNotIn('ETag', response)
+
+    def test_errors_are_not_cached(self):
+        api.get(TOP_ENDPOINT_URL, data={'date_from': 'x'})
+
+        with self.assertNumQueries(0):
+            response = api.get(TOP_ENDPOINT_URL, data={'date_from': 'x'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertNotIn('ETag', response)
+
+    def test_follower_waits_for_leader_entry(self):
+        api.get(MOVIES_ENDPOINT_URL)
+        key = response_cache.response_key(
+            MOVIES_ENDPOINT_URL, 'application/json', [response_cache.MOVIES])
+        entry = dict(cache.get(key), content=b'["from leader"]')
+        cache.delete(key)
+        cache.add(key + ':lock', 1)
+        leader = threading.Timer(0.2, cache.set, [key, entry])
+        leader.start()
+
+        with self.assertNumQueries(0):
+            response = api.get(MOVIES_ENDPOINT_URL)
+
+        leader.join()
+        self.assertEqual(response.content, b'["from leader"]')
+
+    @override_settings(RESPONSE_CACHE={'ENABLED': True, 'LOCK_WAIT': 0.1})
+    def test_follower_rebuilds_after_waiting(self):
+        api.get(MOVIES_ENDPOINT_URL)
+        key = response_cache.response_key(
+            MOVIES_ENDPOINT_URL, 'application/json', [response_cache.MOVIES])
+        cache.delete(key)
+        cache.add(key + ':lock', 1)
+
+        response = api.get(MOVIES_ENDPOINT_URL)
+
+        self.assertEqual(len(response.json()), 1)
+        self.assertTrue(cache.get(key + ':lock'))
+
+
+@override_settings(RESPONSE_CACHE={'ENABLED': True})
+class TestInvalidation(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.movie = Movie.objects.create(
+            title='Karate Kids', year_of_production=REAL_YEAR)
+
+    def test_model_write_invalidates_cached_responses(self):
+        api.get(COMMENTS_ENDPOINT_URL)
+        etag = api.get(TOP_ENDPOINT_URL)['ETag']
+        MovieComment.objects.create(
+            movie=self.movie, comment_content=TEST_COMMENT_CONTENT)
+
+        self.assertEqual(len(api.get(COMMENTS_ENDPOINT_URL).json()), 1)
+        response = api.get(TOP_ENDPOINT_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()[0]['total_comments'], 1)
+
+    def test_post_handler_invalidates_cached_responses(self):
+        api.get(COMMENTS_ENDPOINT_URL)
+        api.post(
+            COMMENTS_ENDPOINT_URL,
+            data={
+                'movie': self.movie.id,
+                'comment_content': TEST_COMMENT_CONTENT})
+
+        self.assertEqual(len(api.get(COMMENTS_ENDPOINT_URL).json()), 1)
+
+    def test_generation_changes_after_commit(self):
+        resources = [response_cache.COMMENTS]
+        before = response_cache.generations(resources)
+
+        with transaction.atomic():
+            MovieComment.objects.create(
+                movie=self.movie, comment_content=TEST_COMMENT_CONTENT)
+            self.assertEqual(response_cache.generations(resources), before)
+
+        self.assertNotEqual(response_cache.generations(resources), before)
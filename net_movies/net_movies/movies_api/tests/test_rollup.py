@@ -0,0 +1,115 @@
+from datetime import date, datetime
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from .. import rollup
+from ..models import Movie, MovieComment, MovieCommentDailyCount
+
+FIRST_DAY = timezone.make_aware(datetime(2019, 2, 1, 12))
+SECOND_DAY = timezone.make_aware(datetime(2019, 2, 2, 12))
+
+
+def daily_counts():
+    return {
+        (row.movie_id, row.day): row.comment_count
+        for row in MovieCommentDailyCount.objects.exclude(comment_count=0)}
+
+
+class TestCommentRollup(TestCase):
+    def setUp(self):
+        self.movie = Movie.objects.create(
+            title='Karate Kids', year_of_production=1990)
+
+    def comment(self, created_at, movie=None):
+        return MovieComment.objects.create(
+            movie=movie or self.movie,
+            comment_content='test',
+            created_at=created_at)
+
+    def test_created_comments_are_counted_per_day(self):
+        self.comment(FIRST_DAY)
+        self.comment(FIRST_DAY)
+        self.comment(SECOND_DAY)
+
+        self.assertEqual(daily_counts(), {
+            (self.movie.id, date(2019, 2, 1)): 2,
+            (self.movie.id, date(2019, 2, 2)): 1})
+
+    def test_deleted_comment_is_uncounted(self):
+        self.comment(FIRST_DAY)
+        self.comment(FIRST_DAY).delete()
+
+        self.assertEqual(daily_counts(), {
+            (self.movie.id, date(2019, 2, 1)): 1})
+
+    def test_bulk_created_comments_are_counted(self):
+        self.comment(FIRST_DAY)
+        MovieComment.objects.bulk_create(
+            MovieComment(
+                movie=self.movie, comment_content='test', created_at=day)
+            for day in [FIRST_DAY, SECOND_DAY, SECOND_DAY])
+
+        self.assertEqual(daily_counts(), {
+            (self.movie.id, date(2019, 2, 1)): 2,
+            (self.movie.id, date(2019, 2, 2)): 2})
+        self.assertEqual(
+            Movie.objects.get(id=self.movie.id).comment_count, 4)
+
+    def test_bulk_delete_is_uncounted(self):
+        self.comment(FIRST_DAY)
+        self.comment(SECOND_DAY)
+        MovieComment.objects.all().delete()
+
+        self.assertEqual(daily_counts(), {})
+
+    def test_moved_comment_is_recounted(self):
+        other = Movie.objects.create(title='Avatar', year_of_production=2009)
+        comment = self.comment(FIRST_DAY)
+        comment.movie = other
+        comment.created_at = SECOND_DAY
+        comment.save()
+
+        self.assertEqual(daily_counts(), {
+            (other.id, date(2019, 2, 2)): 1})
+
+    def test_many_counters_are_added_at_once(self):
+        other = Movie.objects.create(title='Avatar', year_of_production=2009)
+        self.comment(FIRST_DAY)
+        comments = [
+            MovieComment(movie=movie, created_at=created_at)
+            for movie in (self.movie, other)
+            for created_at in (FIRST_DAY, SECOND_DAY, SECOND_DAY)]
+
+        # SELECT, UPDATE and INSERT, the INSERT wrapped in a savepoint
+        with self.assertNumQueries(5):
+            rollup.add_comments(comments)
+
+        self.assertEqual(daily_counts(), {
+            (self.movie.id, date(2019, 2, 1)): 2,
+            (self.movie.id, date(2019, 2, 2)): 2,
+            (other.id, date(2019, 2, 1)): 1,
+            (other.id, date(2019, 2, 2)): 2})
+
+    def test_rebuild_matches_incremental_counts(self):
+        self.comment(FIRST_DAY)
+        self.comment(SECOND_DAY)
+        self.comment(SECOND_DAY)
+        expected = daily_counts()
+
+        MovieCommentDailyCount.objects.update(comment_count=42)
+        call_command('rebuild_comment_rollup', stdout=StringIO())
+
+        self.assertEqual(daily_counts(), expected)
+
+    def test_total_comments_in_range(self):
+        self.comment(FIRST_DAY)
+        self.comment(SECOND_DAY)
+        self.comment(SECOND_DAY)
+        empty = Movie.objects.create(title='Avatar', year_of_production=2009)
+
+        totals = dict(Movie.objects.annotate(
+            total=rollup.total_comments(date(2019, 2, 2), None))
+            .values_list('id', 'total'))
+
+        self.assertEqual(totals, {self.movie.id: 2, empty.id: 0})
@@ -0,0 +1,95 @@
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+from .. import search
+from ..models import Movie
+from .test_api import MOVIES_ENDPOINT_URL
+
+api = APIClient()
+
+TITLES = ['Avatar', 'Karate Kids', 'The Karate Kid', 'Alien']
+
+
+def found(text):
+    return sorted(
+        search.filter_title(Movie.objects.all(), text)
+        .values_list('title', flat=True))
+
+
+class TestTitleSearch(TestCase):
+    def setUp(self):
+        Movie.objects.bulk_create(
+            Movie(title=title, year_of_production=2000) for title in TITLES)
+
+    def test_index_is_installed(self):
+        self.assertTrue(search.available(connection))
+
+    def test_substring_ignoring_case(self):
+        self.assertEqual(found('arate ki'), ['Karate Kids', 'The Karate Kid'])
+        self.assertEqual(found('VATA'), ['Avatar'])
+        self.assertEqual(found('Kids'), ['Karate Kids'])
+        self.assertEqual(found('"quoted"'), [])
+
+    def test_search_uses_index(self):
+        with CaptureQueriesContext(connection) as queries:
+            found('Karate')
+
+        self.assertIn('MATCH', queries[-1]['sql'])
+
+    def test_short_text_falls_back_to_scan(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(found('al'), ['Alien'])
+
+        self.assertNotIn('MATCH', queries[-1]['sql'])
+
+    def test_index_follows_updates_and_deletes(self):
+        movie = Movie.objects.get(title='Alien')
+        movie.title = 'Aliens'
+        movie.save()
+        Movie.objects.filter(title='Avatar').delete()
+
+        self.assertEqual(found('liens'), ['Aliens'])
+        self.assertEqual(found('Avatar'), [])
+
+    def test_install_rebuilds_after_losing_triggers(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER {0}_insert'.format(search.FTS_TABLE))
+        Movie.objects.create(title='Aliens', year_of_production=1986)
+
+        search.install(connection)
+
+        self.assertEqual(found('Aliens'), ['Aliens'])
+
+    def test_get_movies_by_title_part(self):
+        response = api.get(MOVIES_ENDPOINT_URL, data={'title': 'karate'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 2)
+
+
+class TestNormalizedTitle(TestCase):
+    def test_titles_differing_in_case_are_unique(self):
+        Movie.objects.create(title='Avatar', year_of_production=2009)
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Movie.objects.create(title=' AVATAR', year_of_production=2009)
+
+    def test_delete_movie_ignoring_case(self):
+        Movie.objects.create(title='Avatar', year_of_production=2009)
+        response = api.delete(
+            MOVIES_ENDPOINT_URL, data={'title': 'avatar'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(Movie.objects.exists())
+
+    def test_year_is_indexed(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, Movie._meta.db_table)
+
+        self.assertTrue(any(
+            constraint['index'] and
+            constraint['columns'] == ['year_of_production']
+            for constraint in constraints.values()))
@@ -0,0 +1,62 @@
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+from django.db import connection
+from django.db.utils import load_backend
+from django.test import SimpleTestCase, override_settings
+from .. import sqlite_profile
+
+
+def pragma(wrapper, name):
+    return wrapper.connection.execute('PRAGMA {0}'.format(name)).fetchone()[0]
+
+
+class TestSQLiteProfile(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        settings_dict = dict(
+            connection.settings_dict,
+            NAME=os.path.join(directory, 'profile.sqlite3'))
+        self.wrapper = load_backend(settings_dict['ENGINE'])\
+            .DatabaseWrapper(settings_dict, 'profile')
+        self.addCleanup(self.wrapper.close)
+
+    @override_settings(SQLITE_PROFILE={'ENABLED': True})
+    def test_pragmas_are_applied_to_new_connections(self):
+        self.wrapper.ensure_connection()
+
+        self.assertEqual(pragma(self.wrapper, 'journal_mode'), 'wal')
+        # NORMAL
+        self.assertEqual(pragma(self.wrapper, 'synchronous'), 1)
+        self.assertEqual(pragma(self.wrapper, 'busy_timeout'), 5000)
+        self.assertEqual(pragma(self.wrapper, 'cache_size'), -64000)
+        # MEMORY
+        self.assertEqual(pragma(self.wrapper, 'temp_store'), 2)
+        self.assertEqual(
+            pragma(self.wrapper, 'mmap_size'), 256 * 1024 * 1024)
+
+    def test_disabled_by_default(self):
+        self.wrapper.ensure_connection()
+
+        self.assertEqual(pragma(self.wrapper, 'journal_mode'), 'delete')
+        self.assertFalse(hasattr(self.wrapper, 'sqlite_optimized_at'))
+
+    @override_settings(
+        SQLITE_PROFILE={'ENABLED': True, 'OPTIMIZE_INTERVAL': 60})
+    def test_optimize_runs_once_per_interval(self):
+        self.wrapper.ensure_connection()
+        optimized_at = self.wrapper.sqlite_optimized_at
+
+        with mock.patch.object(sqlite_profile, 'connections') as handler:
+            handler.all.return_value = [self.wrapper]
+            sqlite_profile.optimize_connections()
+
+            self.assertEqual(self.wrapper.sqlite_optimized_at, optimized_at)
+
+            self.wrapper.sqlite_optimized_at = time.monotonic() - 61
+            sqlite_profile.optimize_connections()
+
+        self.assertGreater(self.wrapper.sqlite_optimized_at, optimized_at)
@@ -0,0 +1,131 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from ..models import Movie
+from ..title_index import TitleIndex, get_title_index
+from .test_api import COMMENTS_ENDPOINT_URL, MOVIES_ENDPOINT_URL
+
+api = APIClient()
+
+
+@override_settings(TITLE_INDEX={'ENABLED': True})
+class TestTitleIndex(TestCase):
+    def setUp(self):
+        cache.clear()
+        get_title_index().clear()
+        self.avatar = Movie.objects.create(
+            title='Avatar', year_of_production=2009)
+        self.karate = Movie.objects.create(
+            title='Karate Kids', year_of_production=1990)
+
+    def index(self, size=100, check_interval=0):
+        return TitleIndex('default', size, check_interval)
+
+    def test_comments_by_title_skip_lookup(self):
+        api.get(COMMENTS_ENDPOINT_URL, {'movie': 'avatar'})
+
+        with self.assertNumQueries(1):
+            response = api.get(COMMENTS_ENDPOINT_URL, {'movie': ' AVATAR '})
+
+        self.assertEqual(response.status_code, 200)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = api.post(
+                COMMENTS_ENDPOINT_URL,
+                {'movie': 'Avatar', 'comment_content': 'a'})
+
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(any(
+            '"title_normalized" =' in query['sql'] for query in queries))
+
+    def test_unknown_titles_are_not_kept(self):
+        index = self.index()
+
+        self.assertIsNone(index.movie_id('Unknown'))
+        Movie.objects.create(title='Unknown', year_of_production=2000)
+
+        self.assertIsNotNone(index.movie_id('unknown'))
+        self.assertEqual(index.stats()['misses'], 2)
+
+    def test_edited_and_deleted_movies_are_dropped(self):
+        get_title_index().movie_id('Avatar')
+        self.avatar.title = 'Avatar 2'
+        self.avatar.save()
+
+        self.assertEqual(
+            api.get(COMMENTS_ENDPOINT_URL, {'movie': 'Avatar'}).status_code,
+            404)
+
+        get_title_index().movie_id('Karate Kids')
+        api.delete(MOVIES_ENDPOINT_URL, {'title': 'Karate Kids'},
+                   format='json')
+
+        self.assertEqual(
+            api.get(COMMENTS_ENDPOINT_URL,
+                    {'movie': 'Karate Kids'}).status_code,
+            404)
+
+    def test_other_processes_drop_entries_on_version_change(self):
+        index, other = self.index(), self.index()
+        index.movie_id('Avatar')
+        Movie.objects.filter(id=self.avatar.id).delete()
+
+        # Stands in for the commit of the delete in another process
+        other.bump()
+
+        self.assertIsNone(index.movie_id('Avatar'))
+
+    def test_version_is_checked_once_per_interval(self):
+        index = self.index(check_interval=60)
+        index.movie_id('Avatar')
+        index.bump()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(index.movie_id('Avatar'), self.avatar.id)
+
+    def test_least_recently_used_titles_are_evicted(self):
+        index = self.index(size=1)
+        index.movie_id('Avatar')
+        index.movie_id('Karate Kids')
+
+        with self.assertNumQueries(1):
+            index.movie_id('Avatar')
+
+        self.assertEqual(index.stats()['size'], 1)
+
+    def test_hit_ratio(self):
+        index = self.index()
+
+        for _ in range(4):
+            index.movie_id('Avatar')
+
+        stats = index.stats()
+
+        self.assertEqual((stats['hits'], stats['misses']), (3, 1))
+        self.assertEqual(stats['hit_ratio'], 0.75)
+
+    def test_metrics(self):
+        get_title_index().movie_id('Avatar')
+        get_title_index().movie_id('Avatar')
+        stats = get_title_index().stats()
+        text = api.get('/metrics').content.decode()
+
+        self.assertIn('# TYPE movie_title_index_hits_total counter', text)
+        self.assertIn(
+            'movie_title_index_hits_total {0}\n'.format(stats['hits']), text)
+        self.assertIn(
+            'movie_title_index_hit_ratio {0}\n'.format(stats['hit_ratio']),
+            text)
+
+    @override_settings(TITLE_INDEX={})
+    def test_disabled_by_default(self):
+        get_title_index().movie_id('Avatar')
+
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                get_title_index().movie_id('Avatar'), self.avatar.id)
+
+        self.assertNotIn(
+            'movie_title_index', api.get('/metrics').content.decode())
@@ -0,0 +1,187 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.test import APIClient
+from .. import response_cache, top_snapshot
+from ..models import Movie, MovieComment, MovieRank, TopSnapshotState
+from ..ranking import rank_movies
+from .test_api import TOP_ENDPOINT_URL
+from .test_ranking import create_movies
+
+api = APIClient()
+
+
+def totals():
+    ranking, _ = top_snapshot.get_ranking()
+    return [row['total_comments'] for row in ranking]
+
+
+@override_settings(
+    TOP_SNAPSHOT={'MAX_STALENESS': 0, 'REFRESH_ON_READ': True})
+class TestTopSnapshot(TestCase):
+    def setUp(self):
+        self.movies = create_movies([0, 4, 2, 2])
+
+    def test_snapshot_matches_ranking(self):
+        ranking, computed_at = top_snapshot.get_ranking()
+
+        self.assertEqual(ranking, rank_movies(Movie.objects.all()))
+        self.assertGreater(computed_at, timezone.now() - timedelta(minutes=1))
+
+    def test_fresh_snapshot_is_read_with_two_queries(self):
+        top_snapshot.get_ranking()
+
+        with self.assertNumQueries(2):
+            top_snapshot.get_ranking()
+
+    def test_changes_mark_snapshot_out_of_date(self):
+        top_snapshot.get_ranking()
+        MovieComment.objects.create(movie=self.movies[0], comment_content='a')
+
+        self.assertIsNotNone(top_snapshot.get_state().changed_at)
+        self.assertEqual(totals(), [4, 2, 2, 1])
+        self.assertIsNone(top_snapshot.get_state().changed_at)
+
+    def test_deleted_movie_leaves_snapshot(self):
+        top_snapshot.get_ranking()
+        self.movies[1].delete()
+        ranking, _ = top_snapshot.get_ranking()
+
+        self.assertEqual(
+            [(row['movie_id'], row['rank']) for row in ranking],
+            [(self.movies[2].id, 1), (self.movies[3].id, 1),
+             (self.movies[0].id, 2)])
+
+    def test_stale_snapshot_is_served_within_bound(self):
+        top_snapshot.get_ranking()
+        self.movies[1].comments.all().delete()
+
+        self.assertEqual(
+            top_snapshot.get_ranking(max_staleness=60)[0][0]
+            ['total_comments'], 4)
+
+        TopSnapshotState.objects.update(
+            changed_at=timezone.now() - timedelta(seconds=61))
+
+        self.assertEqual(
+            top_snapshot.get_ranking(max_staleness=60)[0][0]
+            ['total_comments'], 2)
+
+    def test_refresh_writes_changed_rows_only(self):
+        top_snapshot.get_ranking()
+        MovieComment.objects.create(movie=self.movies[1], comment_content='a')
+
+        with CaptureQueriesContext(connection) as queries:
+            top_snapshot.refresh()
+        writes = [
+            query['sql'] for query in queries
+            if MovieRank._meta.db_table in query['sql'] and
+            not query['sql'].startswith('SELECT')]
+
+        self.assertEqual(len(writes), 1)
+        self.assertIn('IN ({0})'.format(self.movies[1].id), writes[0])
+
+    def test_refresh_takes_write_lock_first(self):
+        with CaptureQueriesContext(connection) as queries:
+            top_snapshot.refresh()
+        statements = [query['sql'] for query in queries
+                      if 'SAVEPOINT' not in query['sql']]
+
+        self.assertTrue(statements[0].startswith(
+            'UPDATE "{0}"'.format(TopSnapshotState._meta.db_table)))
+
+    def test_command_once(self):
+        out = StringIO()
+        call_command('refresh_top_snapshot', once=True, stdout=out)
+
+        self.assertIn('Ranking computed at', out.getvalue())
+        self.assertEqual(totals(), [4, 2, 2, 0])
+
+    def test_command_reports_refreshes_only(self):
+        call_command('refresh_top_snapshot', once=True, stdout=StringIO())
+        out = StringIO()
+
+        with mock.patch.object(response_cache, 'bump') as bump:
+            call_command('refresh_top_snapshot', once=True, stdout=out)
+
+        self.assertEqual(out.getvalue(), '')
+        bump.assert_not_called()
+
+    def test_change_during_refresh_keeps_snapshot_stale(self):
+        top_snapshot.get_ranking()
+        MovieComment.objects.create(movie=self.movies[0], comment_content='a')
+        changed_at = top_snapshot.get_state().changed_at
+        MovieComment.objects.create(movie=self.movies[0], comment_content='b')
+        state = top_snapshot.get_state()
+
+        # The second change writes the row although it was out of date
+        self.assertEqual(state.changed_at, changed_at)
+        self.assertEqual(state.version, state.computed_version + 2)
+        self.assertTrue(top_snapshot.is_stale(state, 0))
+
+        state = top_snapshot.refresh()
+
+        self.assertTrue(state.is_current())
+        self.assertFalse(top_snapshot.is_stale(state, 0))
+
+
+class TestReadOnlyTop(TestCase):
+    def setUp(self):
+        self.movies = create_movies([0, 4, 2, 2])
+
+    @override_settings(TOP_SNAPSHOT={})
+    def test_top_reads_snapshot_after_comments(self):
+        top_snapshot.refresh()
+        MovieComment.objects.create(movie=self.movies[0], comment_content='a')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = api.get(TOP_ENDPOINT_URL)
+
+        self.assertEqual(
+            [row['total_comments'] for row in response.data], [4, 2, 2, 0])
+        self.assertTrue(any(
+            MovieRank._meta.db_table in query['sql'] for query in queries))
+        self.assertFalse(any(
+            '"{0}"'.format(Movie._meta.db_table) in query['sql']
+            for query in queries))
+
+    @override_settings(TOP_SNAPSHOT={'MAX_STALENESS': 0})
+    def test_stale_snapshot_is_not_rewritten_by_reads(self):
+        top_snapshot.refresh()
+        MovieComment.objects.create(movie=self.movies[0], comment_content='a')
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(totals(), [4, 2, 2, 1])
+
+        self.assertTrue(all(
+            query['sql'].startswith('SELECT') for query in queries))
+        self.assertTrue(top_snapshot.is_stale(top_snapshot.get_state(), 0))
+        self.assertEqual(
+            list(MovieRank.objects.order_by('rank', 'movie_id')
+                 .values_list('total_comments', flat=True)),
+            [4, 2, 2, 0])
+
+    def test_fresh_snapshot_is_served(self):
+        top_snapshot.refresh()
+
+        with self.assertNumQueries(2):
+            self.assertEqual(totals(), [4, 2, 2, 0])
+
+    @override_settings(
+        TOP_SNAPSHOT={'MAX_STALENESS': 3600, 'REFRESH_ON_READ': True})
+    def test_top_exposes_computed_at(self):
+        api.get(TOP_ENDPOINT_URL)
+        MovieComment.objects.create(movie=self.movies[0], comment_content='a')
+        response = api.get(TOP_ENDPOINT_URL)
+
+        self.assertEqual(
+            parse_datetime(response['X-Computed-At']),
+            top_snapshot.get_state().computed_at)
+        self.assertEqual(
+            [row['total_comments'] for row in response.data], [4, 2, 2, 0])
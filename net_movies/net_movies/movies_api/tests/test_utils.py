@@ -1,10 +1,12 @@
+from datetime import date
 from django.test import TestCase
 from net_movies.movies_api.utils import (
     MovieSerializer,
     MovieCommentSerializer,
     movie_as_dict,
     comment_as_dict,
-    get_movie
+    get_movie,
+    parse_date_range
 )
 from net_movies.movies_api.models import Movie, MovieComment
 from .test_api import (
@@ -93,3 +95,15 @@ class TestUtils(TestCase):
     def test_comment_as_dict_unknown_comment(self):
         comment = MovieComment.objects.last()
         self.assertFalse(comment_as_dict(comment))
+
+    def test_parse_date_range(self):
+        self.assertEqual(
+            parse_date_range('2019-02-01', '2019-02-28'),
+            (date(2019, 2, 1), date(2019, 2, 28)))
+        self.assertEqual(
+            parse_date_range(None, '2019-02-28'), (None, date(2019, 2, 28)))
+
+    def test_parse_invalid_date_range(self):
+        self.assertIsNone(parse_date_range('2019-02-28', '2019-02-01'))
+        self.assertIsNone(parse_date_range('2019-02-30', None))
+        self.assertIsNone(parse_date_range('2019-02-01', 'tomorrow'))
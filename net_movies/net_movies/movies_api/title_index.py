@@ -0,0 +1,212 @@
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from .instrumentation import metrics
+from .models import Movie
+from .titles import normalize_title
+
+DEFAULTS = {
+    # Off by default: processes only see each other's edits through a
+    # shared CACHE, with LocMemCache they would keep renamed titles
+    'ENABLED': False,
+    'CACHE': 'default',
+    'SIZE': 10000,
+    'CHECK_INTERVAL': 0,
+}
+
+VERSION_KEY = 'title-index:version'
+
+
+class TitleIndex(object):
+    # Process local LRU map of normalised titles to movie ids, so requests
+    # naming a movie by title skip the lookup query. Only found titles are
+    # kept. Edited and deleted movies bump a version in the shared cache
+    # once their transaction commits. Every process compares it with the
+    # version its entries were read under, at most once per check_interval
+    # seconds, and drops all entries when it changed
+    def __init__(self, cache_alias, size, check_interval):
+        self.cache_alias = cache_alias
+        self.size = size
+        self.check_interval = check_interval
+        self.local = OrderedDict()
+        self.lock = threading.Lock()
+        self.version = None
+        self.checked_at = None
+        self.counters = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    @property
+    def shared(self):
+        return caches[self.cache_alias]
+
+    def shared_version(self):
+        version = self.shared.get(VERSION_KEY)
+
+        if version is None:
+            # Versions start from the clock, so an evicted counter never
+            # comes back with a value some process already holds
+            self.shared.add(VERSION_KEY, int(time.time() * 1000000), None)
+            version = self.shared.get(VERSION_KEY)
+
+        return version
+
+    def check_version(self):
+        # Method that drops local entries read under an older version and
+        # returns the current one
+        now = time.monotonic()
+
+        with self.lock:
+            if self.checked_at is not None and \
+                    now - self.checked_at < self.check_interval:
+                return self.version
+
+        version = self.shared_version()
+
+        with self.lock:
+            if version != self.version:
+                self.local.clear()
+                self.version = version
+
+            self.checked_at = now
+
+        return version
+
+    def movie_id(self, title):
+        # Method that returns the id of the movie with given title, None
+        # when there is no such movie
+        key = normalize_title(title)
+        version = self.check_version()
+
+        with self.lock:
+            movie_id = self.local.get(key, None)
+
+            if movie_id is not None:
+                self.local.move_to_end(key)
+                self.counters['hits'] += 1
+                return movie_id
+
+            self.counters['misses'] += 1
+
+        movie_id = Movie.objects.filter(title_normalized=key)\
+            .values_list('id', flat=True).first()
+
+        if movie_id is not None:
+            with self.lock:
+                # An entry read under an older version may be stale
+                if version == self.version:
+                    self.local[key] = movie_id
+
+                    while len(self.local) > self.size:
+                        self.local.popitem(last=False)
+
+        return movie_id
+
+    def bump(self):
+        try:
+            self.shared.incr(VERSION_KEY)
+        except ValueError:
+            self.shared.set(VERSION_KEY, int(time.time() * 1000000), None)
+
+    def invalidate(self, using=None):
+        # Method that drops local entries now and makes every process drop
+        # theirs once the current transaction commits, a process reading
+        # before the commit could keep the old id otherwise
+        with self.lock:
+            self.local.clear()
+            self.counters['invalidations'] += 1
+
+        transaction.on_commit(self.bump, using=using)
+
+    def clear(self):
+        # Method that empties the in-process map only
+        with self.lock:
+            self.local.clear()
+            self.version = None
+            self.checked_at = None
+
+    def stats(self):
+        with self.lock:
+            counters = dict(self.counters, size=len(self.local))
+
+        lookups = counters['hits'] + counters['misses']
+
+        return dict(
+            counters,
+            hit_ratio=round(counters['hits'] / lookups, 4) if lookups
+            else 0.0)
+
+
+class UncachedTitleIndex(object):
+    # Stand-in used when TITLE_INDEX['ENABLED'] is off
+    def movie_id(self, title):
+        return Movie.objects.filter(title_normalized=normalize_title(title))\
+            .values_list('id', flat=True).first()
+
+    def invalidate(self, using=None):
+        pass
+
+    def clear(self):
+        pass
+
+    def stats(self):
+        return {}
+
+
+_title_index = None
+_title_index_lock = threading.Lock()
+
+
+def get_config():
+    return dict(DEFAULTS, **getattr(settings, 'TITLE_INDEX', {}))
+
+
+def get_title_index():
+    global _title_index
+
+    if _title_index is None:
+        with _title_index_lock:
+            if _title_index is None:
+                config = get_config()
+                _title_index = TitleIndex(
+                    config['CACHE'], config['SIZE'],
+                    config['CHECK_INTERVAL']) if config['ENABLED'] \
+                    else UncachedTitleIndex()
+
+    return _title_index
+
+
+@receiver(setting_changed)
+def reset_title_index(setting, **kwargs):
+    global _title_index
+
+    if setting == 'TITLE_INDEX':
+        _title_index = None
+
+
+def collect_metrics():
+    stats = get_title_index().stats()
+
+    if not stats:
+        return []
+
+    return [
+        ('movie_title_index_hits_total', 'counter',
+         'Titles resolved from the process local index', stats['hits']),
+        ('movie_title_index_misses_total', 'counter',
+         'Titles resolved with a database query', stats['misses']),
+        ('movie_title_index_invalidations_total', 'counter',
+         'Times the process local index was emptied by a movie change',
+         stats['invalidations']),
+        ('movie_title_index_size', 'gauge',
+         'Titles held by the process local index', stats['size']),
+        ('movie_title_index_hit_ratio', 'gauge',
+         'Share of title lookups answered from the index',
+         stats['hit_ratio']),
+    ]
+
+
+metrics.register(collect_metrics)
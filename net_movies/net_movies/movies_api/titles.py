@@ -0,0 +1,4 @@
+def normalize_title(title):
+    # Method that folds case and whitespace, so that titles differing only
+    # in those map to the same key
+    return ' '.join(title.casefold().split())
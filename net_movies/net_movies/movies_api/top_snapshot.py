@@ -0,0 +1,142 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from .db_routing import primary
+from .models import Movie, MovieRank, TopSnapshotState
+from .ranking import rank_movies, ranked as ranked_live
+
+DEFAULTS = {
+    # Comments keep the snapshot out of date between worker runs, /top
+    # serves it meanwhile instead of ranking every movie on each read
+    'MAX_STALENESS': 60,
+    'REFRESH_INTERVAL': 10,
+    'REFRESH_ON_READ': False,
+}
+
+
+def get_config():
+    return dict(DEFAULTS, **getattr(settings, 'TOP_SNAPSHOT', {}))
+
+
+def get_state():
+    return TopSnapshotState.objects\
+        .filter(id=TopSnapshotState.SINGLETON_ID).first()
+
+
+def is_stale(state, max_staleness):
+    # The snapshot is served until it has been out of date for more than
+    # max_staleness seconds
+    return state is None or state.computed_at is None or (
+        not state.is_current() and
+        state.changed_at <= timezone.now() - timedelta(seconds=max_staleness))
+
+
+def refresh():
+    # Method that recomputes the ranking from Movie.comment_count and writes
+    # only rows whose total or rank changed. Returns the new state
+    with primary(), transaction.atomic():
+        # A write first takes the database write lock, waiting for the busy
+        # timeout, on SQLite where select_for_update() is a no-op. Reading
+        # first would fail to upgrade to a write when another writer is
+        # active
+        TopSnapshotState.objects.filter(id=TopSnapshotState.SINGLETON_ID)\
+            .update(changed_at=F('changed_at'))
+        state, _ = TopSnapshotState.objects.select_for_update()\
+            .get_or_create(id=TopSnapshotState.SINGLETON_ID)
+        computed_at = timezone.now()
+        stored = {
+            movie_id: (total, rank) for movie_id, total, rank
+            in MovieRank.objects.values_list(
+                'movie_id', 'total_comments', 'rank')}
+        changed, created = [], []
+
+        for row in rank_movies(Movie.objects.all()):
+            previous = stored.pop(row['movie_id'], None)
+            rank = MovieRank(**row)
+
+            if previous is None:
+                created.append(rank)
+            elif previous != (row['total_comments'], row['rank']):
+                changed.append(rank)
+
+        removed = list(stored)
+
+        for start in range(0, len(removed), 500):
+            MovieRank.objects\
+                .filter(movie_id__in=removed[start:start + 500]).delete()
+
+        MovieRank.objects.bulk_update(
+            changed, ['total_comments', 'rank'], batch_size=500)
+        MovieRank.objects.bulk_create(created, batch_size=500)
+
+        # Changes wait for the row lock taken above, so none was made
+        # since version was read
+        state.computed_at = computed_at
+        state.computed_version = state.version
+        state.changed_at = None
+        state.save()
+
+    return state
+
+
+def refresh_if_stale(max_staleness=None):
+    # Method that refreshes the snapshot when it is stale, returns the new
+    # state or None when the snapshot was fresh enough
+    if max_staleness is None:
+        max_staleness = get_config()['MAX_STALENESS']
+
+    return refresh() if is_stale(get_state(), max_staleness) else None
+
+
+def ranked(limit=None, after=None, size=None):
+    # Method that reads up to size snapshot rows ranked at most limit,
+    # after a (total_comments, movie_id, rank) cursor, with one query on
+    # the rank index
+    rows = MovieRank.objects.order_by('rank', 'movie_id')
+
+    if limit:
+        rows = rows.filter(rank__lte=limit)
+
+    if after:
+        _, movie_id, rank = after
+        rows = rows.filter(
+            Q(rank__gt=rank) | Q(rank=rank, movie_id__gt=movie_id))
+
+    rows = rows.values_list('movie_id', 'total_comments', 'rank')
+
+    return [
+        {'movie_id': movie_id, 'total_comments': total, 'rank': rank}
+        for movie_id, total, rank in (rows[:size] if size else rows)]
+
+
+def get_ranking(max_staleness=None, refresh_on_read=None, **options):
+    # Method that returns the overall ranking and the time it was computed,
+    # read from the snapshot with one indexed query when it is fresh enough.
+    # A stale snapshot is recomputed only with refresh_on_read, otherwise
+    # the ranking is read from the comment_count counters and reads never
+    # write. Options are passed to ranked()
+    config = get_config()
+
+    if max_staleness is None:
+        max_staleness = config['MAX_STALENESS']
+
+    if refresh_on_read is None:
+        refresh_on_read = config['REFRESH_ON_READ']
+
+    state = get_state()
+
+    if not is_stale(state, max_staleness):
+        return ranked(**options), state.computed_at
+
+    if not refresh_on_read:
+        computed_at = timezone.now()
+        return ranked_live(
+            Movie.objects.all(), F('comment_count'), **options), computed_at
+
+    # Rows just written are read back from the primary, replicas may not
+    # have them yet
+    with primary():
+        state = refresh()
+        return ranked(**options), state.computed_at
@@ -1,23 +1,33 @@
-import requests
-from net_movies import settings
+from django.utils.dateparse import parse_date
 from rest_framework import serializers
+from .lookup_cache import get_lookup_cache
 from .models import Movie, MovieComment
+from .omdb import get_client
+from .titles import normalize_title
 
 
-def get_movie(title):
-    # Method that retrieves movie object from OMBD API data for given title
-    response = requests.get(
-        'http://www.omdbapi.com/',
-        params={'t': title, 'apikey': settings.OMDB_API_KEY})
+def year_of_production(data):
+    return ''.join(c for c in data['Year'] if c.isdigit())
 
-    if response.status_code == 200:
-        data = response.json()
 
-        return Movie.objects.get_or_create(
-            title=data["Title"],
-            year_of_production=''.join(c for c in data['Year'] if c.isdigit()),
-            omdb_data=data)[0]\
-            if data.get('Title', None) else None
+def save_movie(data):
+    # Method that returns the movie object for given OMDb data, creating it
+    # when the title is not stored yet
+    return Movie.objects.get_or_create(
+        title_normalized=normalize_title(data["Title"]),
+        defaults={
+            'title': data["Title"],
+            'year_of_production': year_of_production(data),
+            'omdb_data': data})[0]
+
+
+def get_movie(title, fetch=None):
+    # Method that retrieves movie object from OMBD API data for given title,
+    # raises OMDbError when OMDb can not be reached. fetch replaces the
+    # OMDb client lookup
+    data = get_lookup_cache().get_or_fetch(title, fetch or get_client().fetch)
+
+    return save_movie(data) if data else None
 
 
 class MovieSerializer(serializers.ModelSerializer):
@@ -47,6 +57,24 @@ def movie_as_dict(movie):
 def comment_as_dict(comment):
     return {
         'id': comment.id,
-        'movie': comment.movie.id,
+        'movie': comment.movie_id,
         'comment_content': comment.comment_content
     } if comment else None
+
+
+def parse_date_range(date_from, date_to):
+    # Method that parses optional ISO dates into a (date_from, date_to)
+    # tuple, returns None when a given value is invalid or range is reversed
+    try:
+        date_range = tuple(
+            parse_date(value) if value else None
+            for value in (date_from, date_to))
+    except ValueError:
+        return None
+
+    if any(value and not parsed
+           for value, parsed in zip((date_from, date_to), date_range)):
+        return None
+
+    return date_range if None in date_range or \
+        date_range[0] <= date_range[1] else None
@@ -1,19 +1,112 @@
 from django.shortcuts import get_object_or_404
-from django.http import HttpResponse
-from django.db.models import Count
+from django.http import Http404, HttpResponse
 from rest_framework import status
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
+from . import (
+    comment_importer,
+    filters,
+    importer,
+    instrumentation,
+    response_cache,
+    rollup,
+    top_snapshot,
+)
+from .db_routing import replica_reads
+from .encoded_cache import Encoded
+from .filters import InvalidFilter
 from .models import Movie, MovieComment
+from .asgi import PREFETCHED_OMDB
+from .omdb import OMDbError, get_client
+from .pagination import (
+    InvalidPage,
+    link_header,
+    list_response,
+    next_page_url,
+    page_size,
+)
+from .parsers import NDJSONParser
+from .ranking import RANK_CURSOR, decode_rank_cursor, ranked
+from .response_cache import cached_response
+from .title_index import get_title_index
+from .titles import normalize_title
 from .utils import (
-    MovieSerializer,
     MovieCommentSerializer,
     get_movie,
     movie_as_dict,
     comment_as_dict,
+    parse_date_range,
 )
 
 
+MOVIE_FIELDS = ['id', 'title', 'year_of_production']
+
+# ?ordering values of GET /movies mapped to (ordering, extra fields). Each
+# is read from an index, descending ones scan it backwards. The comment
+# orderings read the indexed Movie.comment_count counter. Movies without a
+# rating come last in both rating orderings, see pagination.segments
+MOVIE_ORDERINGS = {
+    'id': (('id',), []),
+    '-id': (('-id',), []),
+    'title': (('title', 'id'), []),
+    '-title': (('-title', '-id'), []),
+    'year': (('year_of_production', 'id'), []),
+    '-year': (('-year_of_production', '-id'), []),
+    'rating': (('imdb_rating', 'id'), ['imdb_rating']),
+    '-rating': (('-imdb_rating', '-id'), ['imdb_rating']),
+    'comments': (('comment_count', 'id'), ['comment_count']),
+    '-comments': (('-comment_count', '-id'), ['comment_count']),
+}
+
+
+def movie_id_or_404(title):
+    # Id of the movie with given title, read from the process local title
+    # index instead of querying on every request
+    movie_id = get_title_index().movie_id(title)
+
+    if movie_id is None:
+        raise Http404('No Movie matches the given query.')
+
+    return movie_id
+
+
+def omdb_payload(movie):
+    # Stored OMDb data of movie, encoded once per fetch. The key changes
+    # whenever the data is fetched again, and on hits the data is not read
+    if movie.omdb_fetched_at is None:
+        return movie.omdb_data
+
+    return Encoded(
+        'omdb:{0}:{1}'.format(movie.id, movie.omdb_fetched_at.timestamp()),
+        lambda: movie.omdb_data)
+
+
+def prefetched_fetch(request):
+    # OMDb lookup of POST /movies returning data the ASGI application
+    # already fetched on its event loop, see movies_api.asgi. Other titles
+    # are fetched with the OMDb client
+    prefetched = request.META.get(PREFETCHED_OMDB, None)
+
+    if not prefetched:
+        return None
+
+    def fetch(title):
+        key = normalize_title(title)
+
+        if key not in prefetched:
+            return get_client().fetch(title)
+
+        data, error = prefetched[key]
+
+        if error is not None:
+            raise error
+
+        return data
+
+    return fetch
+
+
 def home(request):
     return HttpResponse(
         '''
@@ -30,75 +123,130 @@ def home(request):
     )
 
 
+def metrics(request):
+    if not instrumentation.metrics_allowed(request):
+        raise Http404()
+
+    return HttpResponse(
+        instrumentation.metrics.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 class Movies(APIView):
+    @replica_reads
+    @cached_response(response_cache.MOVIES)
     def get(self, request, format=None):
-        movies = Movie.objects.all()
-        year_of_production = request.GET.get('year', None)
-        title_part = request.GET.get('title', None)
+        if request.GET.get('ordering', 'id') not in MOVIE_ORDERINGS:
+            return Response(
+                "Invalid ordering", status=status.HTTP_400_BAD_REQUEST)
 
-        if year_of_production:
-            movies = movies.filter(year_of_production=year_of_production)\
-                if year_of_production.isdigit() else movies
+        ordering, extra_fields = MOVIE_ORDERINGS[
+            request.GET.get('ordering', 'id')]
 
-        if title_part:
-            movies = movies.filter(title__contains=title_part)
-
-        return Response(MovieSerializer(movies, many=True).data)
+        try:
+            movies = filters.filter_movies(Movie.objects.all(), request.GET)
+            return list_response(
+                request, movies, MOVIE_FIELDS + extra_fields, ordering)
+        except (InvalidFilter, InvalidPage) as error:
+            return Response(str(error), status=status.HTTP_400_BAD_REQUEST)
 
     def post(self, request, format=None):
         title = request.data.get('title', None)
 
-        movie = get_movie(title) if title else None
+        try:
+            movie = get_movie(title, prefetched_fetch(request)) \
+                if title else None
+        except OMDbError:
+            return Response(
+                "OMDb service unavailable",
+                status=status.HTTP_503_SERVICE_UNAVAILABLE)
 
         if movie:
-            serializer = MovieSerializer(data=movie_as_dict(movie))
-
-            if serializer.is_valid():
-                return Response(
-                    movie.omdb_data, status=status.HTTP_201_CREATED)
+            response_cache.bump(response_cache.MOVIES, response_cache.TOP)
+            return Response(
+                omdb_payload(movie), status=status.HTTP_201_CREATED)
 
         return Response(
-            serializer.errors if movie else "Movie not found",
-            status=status.HTTP_400_BAD_REQUEST)
+            "Movie not found", status=status.HTTP_400_BAD_REQUEST)
 
     def delete(self, request, format=None):
         title = request.data.get('title', None)
         if title:
+            # The row is loaded anyway, so the title index would not save
+            # a query here
             movie = get_object_or_404(
-                Movie, title=title)
-            serializer = MovieSerializer(data=movie_as_dict(movie))
-
-            if serializer.is_valid():
-                movie.delete()
-                return Response(
-                    serializer.data, status=status.HTTP_200_OK)
+                Movie, title_normalized=normalize_title(title))
+            data = movie_as_dict(movie)
+            movie.delete()
+            response_cache.bump(
+                response_cache.MOVIES,
+                response_cache.COMMENTS,
+                response_cache.TOP)
+            return Response(data, status=status.HTTP_200_OK)
 
         return Response(
-            serializer.errors if title else "Movie not found",
-            status=status.HTTP_400_BAD_REQUEST)
+            "Movie not found", status=status.HTTP_400_BAD_REQUEST)
+
+
+class MoviesBulk(APIView):
+    def post(self, request, format=None):
+        # A JSON array is taken as the titles themselves
+        if isinstance(request.data, list):
+            titles = request.data
+        elif hasattr(request.data, 'getlist'):
+            titles = request.data.getlist('titles')
+        elif isinstance(request.data, dict):
+            titles = request.data.get('titles', None)
+        else:
+            titles = None
+
+        max_titles = importer.get_config()['MAX_TITLES']
+
+        if not titles or not isinstance(titles, list) or not all(
+                isinstance(title, str) and title.strip() for title in titles):
+            return Response(
+                "Titles must be a list of movie titles",
+                status=status.HTTP_400_BAD_REQUEST)
+
+        if len(titles) > max_titles:
+            return Response(
+                "At most {0} titles can be imported at once".format(
+                    max_titles),
+                status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(importer.import_titles(titles))
 
 
 class Comments(APIView):
+    parser_classes = api_settings.DEFAULT_PARSER_CLASSES + [NDJSONParser]
+
+    @replica_reads
+    @cached_response(response_cache.COMMENTS)
     def get(self, request, format=None):
         comments = MovieComment.objects.all()
         movie_id = request.GET.get('movie', None)
 
         if movie_id:
-            comments = comments.filter(movie=int(movie_id))\
-                if movie_id.isdigit() else comments.filter(
-                    movie=get_object_or_404(Movie, title=movie_id).id)
-
-        serializer = MovieCommentSerializer(comments, many=True)
+            comments = comments.filter(
+                movie=int(movie_id) if movie_id.isdigit()
+                else movie_id_or_404(movie_id))
 
-        return Response(serializer.data)
+        try:
+            return list_response(
+                request, comments, ['id', 'movie', 'comment_content'])
+        except InvalidPage as error:
+            return Response(str(error), status=status.HTTP_400_BAD_REQUEST)
 
     def post(self, request, format=None):
+        if isinstance(request.data, list):
+            return self.post_many(request.data)
+
         data = request.data
         movie_id = request.data.get('movie', None)
 
         if movie_id:
             movie_id = movie_id if movie_id.isdigit()\
-                else get_object_or_404(Movie, title=movie_id).id
+                else movie_id_or_404(movie_id)
             data = {
                 'movie': movie_id,
                 'comment_content': request.data.get(
@@ -108,43 +256,86 @@ class Comments(APIView):
 
         if serializer.is_valid():
             serializer.save()
+            response_cache.bump(response_cache.COMMENTS, response_cache.TOP)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def post_many(self, items):
+        # Stores a JSON array or NDJSON stream of comments, answers with the
+        # stored comment or the errors of every item in input order
+        max_items = comment_importer.get_config()['MAX_ITEMS']
+
+        if not items or len(items) > max_items:
+            return Response(
+                "Expected between 1 and {0} comments".format(max_items),
+                status=status.HTTP_400_BAD_REQUEST)
+
+        report = comment_importer.import_comments(items)
+        failed = sum('errors' in result for result in report)
+
+        return Response(
+            report,
+            status=status.HTTP_201_CREATED if not failed
+            else status.HTTP_207_MULTI_STATUS if failed < len(report)
+            else status.HTTP_400_BAD_REQUEST)
+
     def delete(self, request, format=None):
         comment_id = request.data.get('id', None)
 
         if comment_id:
             comment = get_object_or_404(
                 MovieComment, id=int(comment_id))
-
-            serializer = MovieCommentSerializer(data=comment_as_dict(comment))
-
-            if serializer.is_valid():
-                comment.delete()
-                return Response(
-                    serializer.data, status=status.HTTP_200_OK)
+            data = comment_as_dict(comment)
+            comment.delete()
+            response_cache.bump(response_cache.COMMENTS, response_cache.TOP)
+            return Response(data, status=status.HTTP_200_OK)
 
         return Response(
-            serializer.errors if comment_id else "Comment not found",
-            status=status.HTTP_400_BAD_REQUEST)
+            "Comment not found", status=status.HTTP_400_BAD_REQUEST)
 
 
 class Top(APIView):
+    @replica_reads
+    @cached_response(response_cache.TOP)
     def get(self, request, format=None):
-        response_data = []
-        movies = Movie.objects.all().annotate(Count('comments'))
+        date_from = request.GET.get('date_from', None)
+        date_to = request.GET.get('date_to', None)
+        limit = request.GET.get('limit', None)
+        cursor = request.GET.get('cursor', None)
+        headers = {}
+
+        if limit is not None and not (limit.isdigit() and int(limit)):
+            return Response(
+                "Invalid limit", status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            size = page_size(request)
+            options = {
+                'limit': int(limit) if limit else None,
+                'after': decode_rank_cursor(cursor) if cursor else None,
+                'size': size + 1 if size else None}
+        except InvalidPage as error:
+            return Response(str(error), status=status.HTTP_400_BAD_REQUEST)
+
+        if not (date_from or date_to):
+            ranking, computed_at = top_snapshot.get_ranking(**options)
+            headers['X-Computed-At'] = computed_at.isoformat()
+        else:
+            date_range = parse_date_range(date_from, date_to)
+
+            if not date_range:
+                return Response(
+                    "Invalid date range", status=status.HTTP_400_BAD_REQUEST)
 
-        if movies:
-            ranks = enumerate(
-                list(set([m.comments__count for m in movies]))[::-1], 1)
+            ranking = ranked(
+                Movie.objects.all(), rollup.total_comments(*date_range),
+                **options)
 
-            for rank, comments_count in ranks:
-                for movie in movies.filter(comments__count=comments_count):
-                    response_data.append({
-                        'movie_id': movie.id,
-                        'total_comments': comments_count,
-                        'rank': rank})
+        if size and len(ranking) > size:
+            ranking = ranking[:size]
+            headers.update(link_header(next_page_url(
+                request, [ranking[-1][field] for field in RANK_CURSOR],
+                size)))
 
-        return Response(response_data)
+        return Response(ranking, headers=headers)
@@ -43,6 +43,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'net_movies.movies_api.instrumentation.InstrumentationMiddleware',
+    'net_movies.movies_api.compression.CompressionMiddleware',
+    'net_movies.movies_api.db_routing.PrimaryPinningMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -80,9 +83,208 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Connections are kept open between requests and checked before
+        # they are reused, see DATABASE_ROUTING['HEALTH_CHECKS']
+        'CONN_MAX_AGE': 60,
     }
 }
 
+# Reads of GET /movies, /comments and /top go to one of REPLICAS, aliases of
+# read-only copies of 'default' added to DATABASES. Writes and migrations go
+# to 'default'. A client that wrote reads from 'default' for STICKY_SECONDS
+# (COOKIE holds until when) and bypasses the response cache. Open
+# connections idle for HEALTH_CHECK_IDLE seconds are checked before they are
+# reused, see movies_api.db_routing
+
+DATABASE_ROUTERS = ['net_movies.movies_api.db_routing.PrimaryReplicaRouter']
+
+DATABASE_ROUTING = {
+    'REPLICAS': [],
+    'STICKY_SECONDS': 5,
+    'COOKIE': 'primary_until',
+    'HEALTH_CHECKS': True,
+    'HEALTH_CHECK_IDLE': 5,
+}
+
+
+# SQLite settings applied to every new connection when ENABLED: WAL journal
+# (readers and the writer no longer block each other), synchronous=NORMAL
+# (no fsync per commit, a power loss may drop the last commits), busy
+# timeout in milliseconds, memory mapped I/O and page cache sizes (negative
+# cache_size is in KiB) and in-memory temporary tables. PRAGMA optimize runs
+# every OPTIMIZE_INTERVAL seconds on open connections, see
+# movies_api.sqlite_profile
+
+SQLITE_PROFILE = {
+    'ENABLED': False,
+    'JOURNAL_MODE': 'WAL',
+    'SYNCHRONOUS': 'NORMAL',
+    'BUSY_TIMEOUT': 5000,
+    'MMAP_SIZE': 256 * 1024 * 1024,
+    'CACHE_SIZE': -64000,
+    'TEMP_STORE': 'MEMORY',
+    'OPTIMIZE_INTERVAL': 60 * 60,
+}
+
+# Per-request timing (Server-Timing header, JSON log lines of the
+# net_movies.movies_api.instrumentation logger, histograms at /metrics),
+# see movies_api.instrumentation. /metrics answers METRICS_ALLOWED_IPS, or
+# requests with "Authorization: Bearer <METRICS_TOKEN>", and 404 otherwise
+
+INSTRUMENTATION = {
+    'ENABLED': True,
+    'QUERY_THRESHOLD': 50,
+    'METRICS_ALLOWED_IPS': ['127.0.0.1', '::1'],
+    'METRICS_TOKEN': None,
+}
+
+# Cache
+# https://docs.djangoproject.com/en/2.1/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Cached GET /movies, /comments and /top responses, invalidated on writes.
+# Use a shared cache backend (e.g. memcached) when running several workers.
+
+RESPONSE_CACHE = {
+    'ENABLED': False,
+    'CACHE': 'default',
+    'TIMEOUT': 300,
+}
+
+
+# OMDb client, options missing here fall back to movies_api.omdb.DEFAULTS
+
+OMDB_CLIENT = {
+    'URL': 'http://www.omdbapi.com/',
+    'CONNECT_TIMEOUT': 3.05,
+    'READ_TIMEOUT': 10,
+    'RETRIES': 2,
+    'MAX_IN_FLIGHT': 10,
+    'ASYNC_POOL_SIZE': 100,
+    'ASYNC_MAX_IN_FLIGHT': 500,
+}
+
+# Cached OMDb answers by normalised title, see movies_api.lookup_cache. A
+# worker waits at most LOCK_WAIT seconds for another process's lookup of the
+# same title, then queries OMDb itself
+
+OMDB_LOOKUP_CACHE = {
+    'CACHE': 'default',
+    'TTL': 7 * 24 * 60 * 60,
+    'NEGATIVE_TTL': 60 * 60,
+    'LOCAL_SIZE': 1024,
+    'LOCK_TIMEOUT': 60,
+    'LOCK_WAIT': 3,
+}
+
+# Process local map of movie titles to ids used by /comments?movie=<title>
+# and POST /comments, see movies_api.title_index. Movie edits bump a version
+# in CACHE, each process checks it at most every CHECK_INTERVAL seconds.
+# Enable only with a shared cache backend (e.g. memcached) as CACHE when
+# running several workers, other processes never see LocMemCache versions
+
+TITLE_INDEX = {
+    'ENABLED': False,
+    'CACHE': 'default',
+    'SIZE': 10000,
+    'CHECK_INTERVAL': 0,
+}
+
+# Background refresh of stale OMDb data (manage.py refresh_omdb), see
+# movies_api.refresh. DAILY_QUOTA is counted in the CACHE alias: it is shared
+# by all workers only with a shared backend, LocMemCache counts per process
+
+OMDB_REFRESH = {
+    'MAX_AGE_DAYS': 30,
+    'BATCH_SIZE': 50,
+    'REQUESTS_PER_SECOND': 1,
+    'DAILY_QUOTA': 500,
+}
+
+# Materialised /top ranking, see movies_api.top_snapshot, recomputed by
+# manage.py refresh_top_snapshot every REFRESH_INTERVAL seconds. A changed
+# ranking is served for up to MAX_STALENESS seconds, keep it above the
+# interval. After that /top ranks the comment_count counters itself.
+# REFRESH_ON_READ makes that request recompute the snapshot instead, so
+# GET /top writes to the database
+
+TOP_SNAPSHOT = {
+    'MAX_STALENESS': 60,
+    'REFRESH_INTERVAL': 10,
+    'REFRESH_ON_READ': False,
+}
+
+# POST /movies/bulk and manage.py import_movies, see movies_api.importer
+
+BULK_IMPORT = {
+    'WORKERS': 8,
+    'BATCH_SIZE': 500,
+    'MAX_TITLES': 1000,
+}
+
+# POST /comments with a JSON array or NDJSON body, see
+# movies_api.comment_importer
+
+BULK_COMMENTS = {
+    'BATCH_SIZE': 500,
+    'MAX_ITEMS': 10000,
+}
+
+# Keyset pagination and streaming of GET /movies and /comments
+
+PAGINATION = {
+    'PAGE_SIZE': 100,
+    'MAX_PAGE_SIZE': 1000,
+    'CHUNK_SIZE': 2000,
+}
+
+# ASGI mode (net_movies.asgi), see movies_api.asgi. OMDb lookup cache calls
+# of POST /movies run on CACHE_THREADS, requests on WSGI_THREADS
+
+ASGI = {
+    'CACHE_THREADS': 4,
+    'WSGI_THREADS': 10,
+}
+
+# JSON is rendered with orjson when it is installed, MessagePack is offered
+# for Accept: application/msgpack when msgpack is installed, see
+# movies_api.rendering
+
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': (
+        'net_movies.movies_api.rendering.JSONRenderer',
+        'net_movies.movies_api.rendering.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_CONTENT_NEGOTIATION_CLASS':
+        'net_movies.movies_api.rendering.ContentNegotiation',
+}
+
+# Responses of at least MIN_SIZE bytes and streamed lists are compressed
+# with brotli (when installed) or gzip, as Accept-Encoding allows, see
+# movies_api.compression
+
+COMPRESSION = {
+    'ENABLED': True,
+    'MIN_SIZE': 1024,
+    'GZIP_LEVEL': 1,
+    'BROTLI_QUALITY': 5,
+}
+
+# Encoded and compressed bytes of payloads that never change, like stored
+# OMDb data echoed by POST /movies, see movies_api.encoded_cache
+
+ENCODED_CACHE = {
+    'ENABLED': True,
+    'CACHE': 'default',
+    'TIMEOUT': 24 * 60 * 60,
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
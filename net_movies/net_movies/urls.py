@@ -21,8 +21,10 @@ from .movies_api import views
 urlpatterns = [
     path('admin/', admin.site.urls),
     url(r'^api-auth/', include('rest_framework.urls')),
+    url(r'^movies/bulk', views.MoviesBulk.as_view()),
     url(r'^movies', views.Movies.as_view()),
     url(r'^comments', views.Comments.as_view()),
     url(r'^top', views.Top.as_view()),
+    url(r'^metrics$', views.metrics),
     url(r'^$', views.home),
 ]